@@ -0,0 +1,31 @@
+# Ad-hoc benchmarks for the slower parts of the data pipeline. They are not part of
+# the test suite; run them individually with `python -m benchmarks.<name>`.
+
+import time
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+
+def measure(fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, float, int]:
+    """Call fn(*args, **kwargs) and return (result, wall seconds, peak bytes
+    allocated according to tracemalloc). fn is called twice, since tracing
+    allocations slows it down too much to time it at the same time."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    try:
+        result = fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report(label: str, elapsed: float, peak: int, items: int = 0) -> None:
+    line = f"{label:<32} {elapsed:8.3f}s {peak / 2**20:10.1f} MiB"
+    if items:
+        line += f" {items / elapsed:14,.0f} items/s"
+    print(line)
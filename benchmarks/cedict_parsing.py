@@ -0,0 +1,73 @@
+# Compare the line-by-line CEDICT parser with the original readlines/split parser.
+#
+# usage: python -m benchmarks.cedict_parsing [path/to/cedict_ts.u8]
+
+import sys
+from pathlib import Path
+
+from benchmarks import measure, report
+from uniunihan_db.data.archive import open_text
+from uniunihan_db.data.datasets import iter_cedict
+from uniunihan_db.data.paths import CEDICT_FILE, CEDICT_ZIP, TEST_CORPUS_DIR
+from uniunihan_db.data.types import ZhWord
+
+
+def parse_split(file):
+    """The original parser from get_cedict"""
+    words = []
+    with open_text(file) as f:
+        for i, line in enumerate(f.readlines()):
+            try:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                remaining, en = line.split("/", 1)
+                en = en.rstrip("/")
+                if (
+                    en.startswith("variant of")
+                    or en.startswith("see ")
+                    or en.startswith("surname")
+                    or en.startswith("(old)")
+                ):
+                    continue
+                remaining, pron = remaining.split("[")
+                trad, simp = remaining.rstrip().split(" ")
+                if len(trad) != len(simp):
+                    raise ValueError()
+                pron = pron.lstrip("[").rstrip("] ").lower()
+                words.append(ZhWord(trad, f"cedict-{i+1}", pron, en, -1, simp))
+            except Exception:
+                pass
+    return words
+
+
+def parse_stream(file):
+    return list(iter_cedict(file))
+
+
+def count_lines(file):
+    with open_text(file) as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    if len(sys.argv) > 1:
+        file = Path(sys.argv[1])
+    elif CEDICT_ZIP.exists():
+        file = CEDICT_FILE
+    else:
+        file = TEST_CORPUS_DIR / "cedict_sample.u8"
+    print(f"Reading {file}")
+    num_lines = count_lines(file)
+
+    for label, fn in [
+        ("readlines + split", parse_split),
+        ("iter_cedict", parse_stream),
+    ]:
+        words, elapsed, peak = measure(fn, file)
+        report(label, elapsed, peak, num_lines)
+    assert parse_split(file) == words
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Compare the heap-based cluster ordering of component groups with the original
+# repeated min() search, on synthetic groups with hundreds of characters and
+# pronunciations.
+#
+# usage: python -m benchmarks.cluster_ordering
+
+import random
+
+from benchmarks import measure, report
+from tests.reference import random_group_prons, reference_ordered_clusters
+from uniunihan_db.component.group import ComponentGroup
+
+
+def order_all(order, groups):
+    return [order(g) for g in groups]
+
+
+def main():
+    rng = random.Random(0)
+    for num_chars, num_prons, num_groups in [(20, 10, 2000), (300, 200, 20)]:
+        groups = [
+            ComponentGroup("x", random_group_prons(rng, num_chars, num_prons))
+            for _ in range(num_groups)
+        ]
+        size = f"{num_groups} groups of {num_chars} chars/{num_prons} prons"
+        for label, order in [
+            ("min search", reference_ordered_clusters),
+            ("heap", ComponentGroup.get_ordered_clusters),
+        ]:
+            _, elapsed, peak = measure(order_all, order, groups)
+            report(f"{label}, {size}", elapsed, peak, num_groups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Compare grouping a language's characters by phonetic component using the reverse
+# component index with the original scan over the whole component table, on the
+# ytenx components or, if ytenx has not been downloaded, a generated table of the
+# same size.
+#
+# usage: python -m benchmarks.component_grouping
+
+import random
+
+from benchmarks import measure, report
+from tests.reference import (
+    random_char_to_prons,
+    random_component_table,
+    reference_find_component_groups,
+)
+from uniunihan_db.component.index import find_component_groups, index_components
+from uniunihan_db.data.datasets import get_phonetic_components
+from uniunihan_db.data.paths import YTENX_ZIP_FILE
+
+
+def main():
+    rng = random.Random(0)
+    if YTENX_ZIP_FILE.exists():
+        comp_to_char = get_phonetic_components()
+    else:
+        comp_to_char = random_component_table(rng, 60_000, 12_000)
+    all_chars = sorted({c for chars in comp_to_char.values() for c in chars})
+    char_to_prons = random_char_to_prons(rng, rng.sample(all_chars, 3000), 1000)
+
+    char_to_comps, elapsed, peak = measure(index_components, comp_to_char)
+    report("reverse index (once)", elapsed, peak, len(all_chars))
+    for label, fn, args in [
+        ("table scan", reference_find_component_groups, ()),
+        ("reverse index", find_component_groups, (char_to_comps,)),
+    ]:
+        _, elapsed, peak = measure(fn, char_to_prons, comp_to_char, *args)
+        report(label, elapsed, peak, len(char_to_prons))
+
+
+if __name__ == "__main__":
+    main()
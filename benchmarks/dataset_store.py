@@ -0,0 +1,92 @@
+# Compare the memory and time needed by worker processes to get their own unpickled
+# copy of a dictionary and a component table with attaching to a shared dataset
+# store. Uses CEDICT if it has been downloaded, or else a generated dictionary.
+#
+# usage: python -m benchmarks.dataset_store [workers]
+
+import pickle
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from uniunihan_db.data.datasets import iter_cedict
+from uniunihan_db.data.paths import CEDICT_ZIP
+from uniunihan_db.data.store import DatasetStore, write_store
+from uniunihan_db.data.types import Word, WordTable
+
+
+def private_memory() -> int:
+    """Bytes of memory not shared with other processes (Linux only)"""
+    with open("/proc/self/smaps_rollup") as f:
+        return sum(
+            int(line.split()[1]) * 1024
+            for line in f
+            if line.startswith(("Private_Clean:", "Private_Dirty:"))
+        )
+
+
+def use(words, components):
+    # what a pipeline does with them: scan the surfaces and look things up
+    return sum(map(len, words.surfaces)), sum(len(components[c]) for c in "一二三")
+
+
+def worker(mode, data):
+    before = private_memory()
+    start = time.perf_counter()
+    if mode == "pickle":
+        words, components = pickle.loads(data)
+    else:
+        store = DatasetStore(data)
+        words, components = store["words"], store["components"]
+    loaded = time.perf_counter() - start
+    use(words, components)
+    return loaded, time.perf_counter() - start, private_memory() - before
+
+
+def generated_words(count):
+    rng = random.Random(0)
+    chars = [chr(0x4E00 + i) for i in range(5000)]
+    return WordTable(
+        Word(
+            "".join(rng.choices(chars, k=rng.randint(1, 4))),
+            f"gen-{i}",
+            "a b",
+            "gloss",
+            i,
+        )
+        for i in range(count)
+    )
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    words = (
+        WordTable(iter_cedict()) if CEDICT_ZIP.exists() else generated_words(120_000)
+    )
+    rng = random.Random(0)
+    components = {
+        chr(0x4E00 + i): [chr(0x4E00 + rng.randrange(20_000)) for _ in range(5)]
+        for i in range(12_000)
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = Path(tmp) / "datasets.store"
+        write_store(store_path, {"words": words, "components": components})
+        pickled = pickle.dumps((words, components), pickle.HIGHEST_PROTOCOL)
+        for mode, data in [("pickle", pickled), ("store", store_path)]:
+            with ProcessPoolExecutor(workers) as executor:
+                results = list(executor.map(worker, [mode] * workers, [data] * workers))
+            load = max(r[0] for r in results)
+            total = max(r[1] for r in results)
+            memory = sum(r[2] for r in results)
+            print(
+                f"{mode:<8} load {load:7.3f}s  load+use {total:7.3f}s  "
+                f"private memory of {workers} workers {memory / 2**20:8.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
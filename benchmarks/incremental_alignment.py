@@ -0,0 +1,44 @@
+# Time building the Japanese vocabulary alignments from scratch, reloading them
+# unchanged, and updating them after one Joyo reading changes. The alignment store
+# is written to a temporary directory.
+#
+# usage: python -m benchmarks.incremental_alignment
+
+import tempfile
+from pathlib import Path
+
+from benchmarks import measure, report
+from benchmarks.jp_alignment import generated_words, joyo_char_to_prons
+from uniunihan_db.data import cache
+from uniunihan_db.data.alignments import align_words
+from uniunihan_db.data.datasets import iter_edict_freq
+from uniunihan_db.data.paths import EDICT_FREQ_TARBALL
+from uniunihan_db.data.types import WordTable
+from uniunihan_db.lingua.aligner import JpAligner
+
+
+def main():
+    char_to_prons = joyo_char_to_prons()
+    if EDICT_FREQ_TARBALL.exists():
+        words = WordTable(iter_edict_freq())
+    else:
+        words = WordTable(generated_words(char_to_prons, 200_000))
+
+    changed = dict(char_to_prons)
+    changed["生"] = sorted(changed["生"]) + ["ナマ"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache.CACHE_DIR = Path(tmp)
+        for label, readings in [
+            ("full alignment", char_to_prons),
+            ("unchanged", char_to_prons),
+            ("one reading added", changed),
+        ]:
+            _, elapsed, peak = measure(align_words, words, JpAligner(readings))
+            report(label, elapsed, peak, len(words))
+            # measure runs the function twice; restore the store it started from
+            align_words(words, JpAligner(char_to_prons))
+
+
+if __name__ == "__main__":
+    main()
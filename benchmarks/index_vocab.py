@@ -0,0 +1,36 @@
+# Time index_vocab with the Japanese aligner using different numbers of worker
+# processes.
+#
+# usage: python -m benchmarks.index_vocab [max workers]
+
+import os
+import sys
+import time
+
+from benchmarks.jp_alignment import generated_words, joyo_char_to_prons
+from uniunihan_db.data.datasets import index_vocab, iter_edict_freq
+from uniunihan_db.data.paths import EDICT_FREQ_TARBALL
+from uniunihan_db.lingua.aligner import JpAligner
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    char_to_prons = joyo_char_to_prons()
+    if EDICT_FREQ_TARBALL.exists():
+        words = list(iter_edict_freq())
+    else:
+        words = generated_words(char_to_prons, 200_000)
+    aligner = JpAligner(char_to_prons)
+
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        index_vocab(words, aligner, workers=workers)
+        elapsed = time.perf_counter() - start
+        rate = len(words) / elapsed
+        print(f"{workers:>2} workers {elapsed:8.3f}s {rate:12,.0f} words/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
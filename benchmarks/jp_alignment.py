@@ -0,0 +1,57 @@
+# Compare the speed of the memoized JpAligner with the original recursive
+# backtracking aligner on EDICT, using the Joyo readings as select_vocab_jp does.
+# Falls back to words generated from the Joyo readings when EDICT has not been
+# downloaded.
+#
+# usage: python -m benchmarks.jp_alignment
+
+import random
+
+from benchmarks import measure, report
+from tests.reference import reference_jp_align
+from uniunihan_db.data.datasets import get_joyo, iter_edict_freq
+from uniunihan_db.data.paths import EDICT_FREQ_TARBALL
+from uniunihan_db.data.types import Word
+from uniunihan_db.lingua.aligner import JpAligner
+
+
+def joyo_char_to_prons():
+    return {info["new"]: info["readings"] for info in get_joyo().values()}
+
+
+def generated_words(char_to_prons, count=100_000):
+    rng = random.Random(0)
+    chars = [c for c, prons in char_to_prons.items() if prons]
+    words = []
+    for i in range(count):
+        surface = "".join(rng.choices(chars, k=rng.randint(1, 4)))
+        pron = "".join(rng.choice(sorted(char_to_prons[c])) for c in surface)
+        words.append(Word(surface, f"generated-{i}", pron, "", 0))
+    return words
+
+
+def align_all(align, words):
+    return sum(1 for w in words if align(w.surface, w.pron))
+
+
+def main():
+    char_to_prons = joyo_char_to_prons()
+    if EDICT_FREQ_TARBALL.exists():
+        print("Aligning EDICT")
+        words = list(iter_edict_freq())
+    else:
+        print("Aligning generated words")
+        words = generated_words(char_to_prons)
+
+    aligner = JpAligner(char_to_prons)
+    for label, align in [
+        ("recursive", lambda s, p: reference_jp_align(char_to_prons, s, p)),
+        ("memoized", aligner.align),
+    ]:
+        aligned, elapsed, peak = measure(align_all, align, words)
+        report(label, elapsed, peak, len(words))
+    print(f"{aligned} of {len(words)} words aligned")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Compare the trie transducers for romaji/kana conversion with the original
+# str.replace-based functions, on the EDICT readings or, if EDICT has not been
+# downloaded, on generated words.
+#
+# usage: python -m benchmarks.kana_conversion
+
+import jaconv
+
+from benchmarks import measure, report
+from tests.reference import (
+    random_words,
+    reference_alpha_to_kana,
+    reference_kana_to_alpha,
+)
+from uniunihan_db.data.datasets import iter_edict_freq
+from uniunihan_db.data.paths import EDICT_FREQ_TARBALL
+from uniunihan_db.lingua.japanese import (
+    NIHONSIKI_COMPOUND,
+    NIHONSIKI_TRIGRAPH,
+    VOWELS,
+    alpha_to_kana,
+    alpha_to_kana_many,
+    kana_to_alpha,
+    kana_to_alpha_many,
+)
+
+
+def convert_each(convert, words):
+    return [convert(w) for w in words]
+
+
+def main():
+    if EDICT_FREQ_TARBALL.exists():
+        kana = [jaconv.kata2hira(w.pron) for w in iter_edict_freq()]
+    else:
+        units = {
+            *NIHONSIKI_TRIGRAPH.values(),
+            *NIHONSIKI_COMPOUND.values(),
+            *VOWELS.values(),
+            "ん",
+            "っ",
+        }
+        kana = random_words(units, 200_000)
+    romaji = [kana_to_alpha(w) for w in kana]
+
+    for label, fn, args in [
+        ("kana->romaji replace", convert_each, (reference_kana_to_alpha, kana)),
+        ("kana->romaji trie", convert_each, (kana_to_alpha, kana)),
+        ("kana->romaji batch", kana_to_alpha_many, (kana,)),
+        ("romaji->kana replace", convert_each, (reference_alpha_to_kana, romaji)),
+        ("romaji->kana trie", convert_each, (alpha_to_kana, romaji)),
+        ("romaji->kana batch", alpha_to_kana_many, (romaji,)),
+    ]:
+        _, elapsed, peak = measure(fn, *args)
+        report(label, elapsed, peak, len(kana))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Compare the table-based pinyin tone conversion with the original regex-based
+# functions, on the CC-CEDICT pronunciations or, if CC-CEDICT has not been
+# downloaded, on generated pinyin.
+#
+# usage: python -m benchmarks.pinyin_conversion
+
+import random
+
+from benchmarks import measure, report
+from tests.reference import (
+    reference_numbers_to_tone_marks,
+    reference_tone_marks_to_numbers,
+)
+from uniunihan_db.data.datasets import iter_cedict
+from uniunihan_db.data.paths import CEDICT_ZIP
+from uniunihan_db.lingua.mandarin import (
+    FINALS,
+    ToneFormat,
+    convert_many,
+    pinyin_numbers_to_tone_marks,
+    pinyin_tone_marks_to_numbers,
+)
+
+
+def generated_pinyin(count):
+    rng = random.Random(0)
+    syllables = [o + f for o in ["", "zh", "sh", "b", "l", "n", "y"] for f in FINALS]
+    return [
+        " ".join(rng.choice(syllables) + rng.choice("12345") for _ in range(length))
+        for length in rng.choices(range(1, 5), k=count)
+    ]
+
+
+def convert_each(convert, strings):
+    return [convert(s) for s in strings]
+
+
+def main():
+    if CEDICT_ZIP.exists():
+        numbered = [w.pron for w in iter_cedict()]
+    else:
+        numbered = generated_pinyin(200_000)
+    marked = [pinyin_numbers_to_tone_marks(s) for s in numbered]
+    # build the lookup tables before timing
+    convert_many(["hao3"], ToneFormat.MARKS)
+
+    for label, fn, args in [
+        ("numbers->marks regex", convert_each, (reference_numbers_to_tone_marks,)),
+        ("numbers->marks table", convert_each, (pinyin_numbers_to_tone_marks,)),
+        ("numbers->marks convert_many", convert_many, (ToneFormat.MARKS,)),
+        ("marks->numbers regex", convert_each, (reference_tone_marks_to_numbers,)),
+        ("marks->numbers table", convert_each, (pinyin_tone_marks_to_numbers,)),
+        ("marks->numbers convert_many", convert_many, (ToneFormat.NUMBERS,)),
+    ]:
+        strings = numbered if label.startswith("numbers") else marked
+        if fn is convert_many:
+            _, elapsed, peak = measure(fn, strings, *args)
+        else:
+            _, elapsed, peak = measure(fn, *args, strings)
+        report(label, elapsed, peak, len(strings))
+
+
+if __name__ == "__main__":
+    main()
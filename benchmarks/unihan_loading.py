@@ -0,0 +1,72 @@
+# Compare the memory and time needed to load Unihan and read the fields used by the
+# zh pipeline: parsing the full JSON, reading every field from the snapshot, and
+# loading only the pipeline's fields from the snapshot.
+#
+# usage: python -m benchmarks.unihan_loading [path/to/unihan.json]
+
+import json
+import sys
+from pathlib import Path
+
+from benchmarks import measure, report
+from uniunihan_db.data.datasets import UNIHAN_PIPELINE_FIELDS
+from uniunihan_db.data.paths import TEST_CORPUS_DIR, UNIHAN_FILE
+from uniunihan_db.data.snapshot import load_snapshot
+
+
+def read_pipeline_fields(unihan):
+    """Touch the same fields as load_char_data_zh and load_prons_zh"""
+    count = 0
+    for char, entry in unihan.items():
+        if "kHKGlyph" in entry:
+            count += len(entry.get("kDefinition", []))
+            count += len(entry.get("kSimplifiedVariant", []))
+        for field in ["kHanyuPinlu", "kXHC1983", "kHanyuPinyin", "kMandarin"]:
+            if field in entry:
+                count += 1
+                break
+    return count
+
+
+def load_json(path):
+    with open(path) as f:
+        unihan = json.load(f)
+    read_pipeline_fields(unihan)
+    return len(unihan)
+
+
+def load_full_snapshot(path):
+    unihan = load_snapshot(path)
+    read_pipeline_fields(unihan)
+    return len(unihan)
+
+
+def load_projected_snapshot(path):
+    unihan = load_snapshot(path).project(UNIHAN_PIPELINE_FIELDS)
+    read_pipeline_fields(unihan)
+    return len(unihan)
+
+
+def main():
+    if len(sys.argv) > 1:
+        path = Path(sys.argv[1])
+    elif UNIHAN_FILE.exists():
+        path = UNIHAN_FILE
+    else:
+        path = TEST_CORPUS_DIR / "unihan_sample.json"
+    print(f"Reading {path}")
+
+    # make sure the snapshot exists so that building it isn't measured
+    load_snapshot(path)
+
+    for label, fn in [
+        ("json.load", load_json),
+        ("snapshot, all fields", load_full_snapshot),
+        ("snapshot, pipeline fields", load_projected_snapshot),
+    ]:
+        num_chars, elapsed, peak = measure(fn, path)
+        report(label, elapsed, peak, num_chars)
+
+
+if __name__ == "__main__":
+    main()
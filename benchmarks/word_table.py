@@ -0,0 +1,48 @@
+# Compare the memory used to hold CEDICT as a list of ZhWord objects and as a
+# WordTable, and the time needed to index each of them by character/pronunciation.
+#
+# usage: python -m benchmarks.word_table [path/to/cedict_ts.u8]
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+from benchmarks import measure, report
+from uniunihan_db.data.datasets import index_vocab, iter_cedict
+from uniunihan_db.data.paths import CEDICT_FILE, CEDICT_ZIP, TEST_CORPUS_DIR
+from uniunihan_db.data.types import WordTable
+from uniunihan_db.lingua.aligner import ZhAligner
+
+
+def retained(fn, *args):
+    """Return (result, bytes still allocated by fn once it has returned)"""
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def main():
+    if len(sys.argv) > 1:
+        file = Path(sys.argv[1])
+    elif CEDICT_ZIP.exists():
+        file = CEDICT_FILE
+    else:
+        file = TEST_CORPUS_DIR / "cedict_sample.u8"
+    print(f"Reading {file}")
+
+    for label, load in [
+        ("list of ZhWord", lambda: list(iter_cedict(file))),
+        ("WordTable", lambda: WordTable(iter_cedict(file))),
+    ]:
+        words, size = retained(load)
+        print(f"{label:<32} {size / 2**20:8.1f} MiB retained")
+        _, elapsed, peak = measure(index_vocab, words, ZhAligner())
+        report(f"  index_vocab({label})", elapsed, peak, len(words))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
+import random
+
 import pytest
 
+from tests.reference import random_group_prons, reference_ordered_clusters
 from uniunihan_db.component.group import ComponentGroup, PurityType
 
 
@@ -110,3 +113,11 @@ class TestComponentGroup:
         assert group.purity_type == PurityType.NO_PRONUNCIATIONS
         assert group.pron_to_chars == {"": ["a", "b", "c"]}
         assert group.get_ordered_clusters() == [["a", "b", "c"]]
+
+    @staticmethod
+    @pytest.mark.parametrize("seed", range(20))
+    def test_ordered_clusters_match_reference(seed) -> None:
+        rng = random.Random(seed)
+        char_to_prons = random_group_prons(rng, rng.randint(1, 60), rng.randint(1, 30))
+        group = ComponentGroup("x", char_to_prons)
+        assert group.get_ordered_clusters() == reference_ordered_clusters(group)
@@ -1,4 +1,14 @@
-from uniunihan_db.component.index import find_component_groups
+import random
+
+import pytest
+
+from tests.reference import (
+    random_char_to_prons,
+    random_component_table,
+    reference_find_component_groups,
+)
+from uniunihan_db.component.group import ComponentGroup, PurityType
+from uniunihan_db.component.index import find_component_groups, index_components
 
 
 def test_group_assignment():
@@ -42,3 +52,180 @@ def test_no_group_chars():
     char_to_prons = {"館": ["kan"], "缶": ["kan"]}
     index = find_component_groups(char_to_prons, {})
     assert index.no_comp_chars == set("館缶")
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_reference(seed):
+    rng = random.Random(seed)
+    comp_to_char = random_component_table(rng, 300, 40)
+    # some characters in no component, and some components sharing characters
+    comp_to_char["extra"] = [chr(0x4E00 + i) for i in range(0, 300, 7)]
+    chars = [chr(0x4E00 + i) for i in rng.sample(range(400), 150)]
+    char_to_prons = random_char_to_prons(rng, chars, 60)
+    # 国字-like groups, where no character has a pronunciation
+    comp_to_char["none"] = [chr(0x4E00 + 400), chr(0x4E00 + 401)]
+    char_to_prons.update({c: [] for c in comp_to_char["none"]})
+
+    index = find_component_groups(char_to_prons, comp_to_char)
+    groups, unique, missing_pron, no_group = reference_find_component_groups(
+        char_to_prons, comp_to_char
+    )
+    assert [(g.component, g.chars) for g in index.groups] == [
+        (comp, set(c2p)) for comp, c2p in groups
+    ]
+    for group, (_, c2p) in zip(index.groups, groups):
+        assert group.pron_to_chars == ComponentGroup("", c2p).pron_to_chars
+    assert index.unique_pron_to_char == unique
+    assert index.missing_pron_chars == missing_pron
+    assert index.no_comp_chars == no_group
+
+
+def test_precomputed_component_index():
+    char_to_prons = {"館": ["kan"], "官": ["kan"], "可": ["ka"]}
+    comp_to_char = {"官": "館官菅", "可": "何可"}
+    char_to_comps = index_components(comp_to_char)
+    assert char_to_comps["館"] == [(0, "官")]
+
+    index = find_component_groups(char_to_prons, comp_to_char, char_to_comps)
+    assert [g.component for g in index.groups] == ["官", "可"]
+
+
+def test_secondary_indexes():
+    char_to_prons = {"館": ["kan"], "官": ["kan"], "可": ["ka"], "河": ["ka", "ga"]}
+    comp_to_char = {"官": "館官", "可": "可河"}
+    index = find_component_groups(char_to_prons, comp_to_char)
+    group_1, group_2 = index.groups
+
+    assert index.char_to_group == {
+        "館": group_1,
+        "官": group_1,
+        "可": group_2,
+        "河": group_2,
+    }
+    assert index.component_to_group == {"官": group_1, "可": group_2}
+    assert index.purity_to_groups[PurityType.PURE] == [group_1]
+    assert index.purity_to_groups[PurityType.SEMI_PURE] == [group_2]
+    assert index.purity_to_groups[PurityType.MIXED_A] == []
+    assert index.pron_to_chars == {"kan": ["館", "官"], "ka": ["可", "河"], "ga": ["河"]}
+    # built once
+    assert index.char_to_group is index.char_to_group
+
+
+def test_add_group_updates_indexes():
+    index = find_component_groups({"館": ["kan"], "官": ["kan"]}, {"官": "館官"})
+    assert "峠" not in index.char_to_group
+
+    group = ComponentGroup("国字", {"峠": [], "畑": []})
+    index.add_group(group)
+    assert index.char_to_group["峠"] is group
+    assert index.component_to_group["国字"] is group
+    assert index.purity_to_groups[PurityType.NO_PRONUNCIATIONS] == [group]
+
+    with pytest.raises(ValueError):
+        index.add_group(ComponentGroup("国字", {"込": []}))
+
+
+def assert_same_index(index, expected):
+    def groups(index):
+        return {
+            g.component: (
+                g.chars,
+                list(g.pron_to_chars.items()),
+                list(g.exceptions.items()),
+                g.purity_type,
+            )
+            for g in index.groups
+        }
+
+    assert groups(index) == groups(expected)
+    assert index.char_to_prons == expected.char_to_prons
+    assert index.unique_pron_to_char == expected.unique_pron_to_char
+    assert index.missing_pron_chars == expected.missing_pron_chars
+    assert index.no_comp_chars == expected.no_comp_chars
+    assert {p: set(cs) for p, cs in index.pron_to_chars.items()} == {
+        p: set(cs) for p, cs in expected.pron_to_chars.items()
+    }
+
+
+class TestIncrementalUpdates:
+    comp_to_char = {"官": "館官棺", "可": "可河何"}
+    char_to_prons = {
+        "館": ["kan"],
+        "官": ["kan"],
+        "棺": ["kan"],
+        "可": ["ka"],
+        "河": ["ka", "ga"],
+        "没": ["botu"],
+    }
+
+    def index(self, char_to_prons):
+        return find_component_groups(char_to_prons, self.comp_to_char)
+
+    def test_add_char(self):
+        index = self.index(self.char_to_prons)
+        index.char_to_group  # built before the edit
+        changes = index.add_char("何", ["ka"], "可")
+        assert changes.components == {"可"}
+        assert changes.chars == {"何"}
+        assert_same_index(index, self.index({**self.char_to_prons, "何": ["ka"]}))
+        assert index.char_to_group["何"] is index.component_to_group["可"]
+
+    def test_add_char_keeps_member_order(self):
+        # 何 sorts before the other members, but comes last as in a full rebuild
+        index = self.index(self.char_to_prons)
+        index.add_char("何", ["ga"], "可")
+        assert_same_index(index, self.index({**self.char_to_prons, "何": ["ga"]}))
+
+    def test_add_char_new_group_and_no_component(self):
+        index = self.index(self.char_to_prons)
+        index.add_char("菅", ["kan"], "菅")
+        index.add_char("缶", ["kan"])
+        assert index.component_to_group["菅"].chars == {"菅"}
+        assert "缶" in index.no_comp_chars
+        assert index.unique_pron_to_char["botu"] == "没"
+        with pytest.raises(ValueError):
+            index.add_char("缶", ["kan"])
+
+    def test_remove_char(self):
+        index = self.index(self.char_to_prons)
+        changes = index.remove_char("河")
+        assert changes.components == {"可"}
+        char_to_prons = dict(self.char_to_prons)
+        del char_to_prons["河"]
+        assert_same_index(index, self.index(char_to_prons))
+
+        # the last character of a group
+        index.remove_char("可")
+        assert "可" not in index.component_to_group
+        with pytest.raises(KeyError):
+            index.remove_char("可")
+
+    def test_set_prons(self):
+        index = self.index(self.char_to_prons)
+        group = index.component_to_group["官"]
+        group.sup_info["historical"] = ["kept"]
+        assert group.purity_type == PurityType.PURE
+
+        changes = index.set_prons("棺", ["kan", "botu"])
+        assert changes.components == {"官"}
+        assert_same_index(
+            index, self.index({**self.char_to_prons, "棺": ["kan", "botu"]})
+        )
+        group = index.component_to_group["官"]
+        assert group.purity_type == PurityType.SEMI_PURE
+        assert group.sup_info["historical"] == ["kept"]
+        assert "botu" not in index.unique_pron_to_char
+
+        with pytest.raises(ValueError):
+            # mixing characters with and without pronunciations is still an error
+            index.set_prons("館", [])
+        # and the failed edit did not change anything
+        assert index.char_to_prons["館"] == ["kan"]
+        assert index.component_to_group["官"] is group
+
+    def test_changes_update(self):
+        index = self.index(self.char_to_prons)
+        changes = index.add_char("何", ["ka"], "可")
+        changes.update(index.set_prons("館", ["kan", "foo"]))
+        assert changes.components == {"可", "官"}
+        assert changes.chars == {"何", "館"}
@@ -0,0 +1,9 @@
+import pytest
+
+from uniunihan_db.data import cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path_factory, monkeypatch):
+    # keep tests from writing persistent cache entries under data/generated
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path_factory.mktemp("cache"))
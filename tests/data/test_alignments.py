@@ -0,0 +1,103 @@
+import pytest
+
+from uniunihan_db.data import alignments, cache
+from uniunihan_db.data.alignments import AlignmentTable, align_words, store_path
+from uniunihan_db.data.types import Word, WordTable
+from uniunihan_db.lingua.aligner import JpAligner
+
+WORDS = WordTable(
+    [
+        Word("漢字", "1", "かんじ", "", 0),
+        Word("学校", "2", "がっこう", "", 0),
+        Word("字", "3", "じ", "", 0),
+        Word("校", "4", "こう", "", 0),
+        Word("漢", "5", "から", "", 0),
+    ]
+)
+READINGS = {"漢": ["カン"], "字": ["ジ"], "学": ["ガク"], "校": ["コウ"]}
+
+
+class CountingAligner(JpAligner):
+    def __init__(self, char_to_prons):
+        super().__init__(char_to_prons)
+        self.aligned = []
+
+    def align(self, surface, phonetic_spelling):
+        self.aligned.append(surface)
+        return super().align(surface, phonetic_spelling)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    return tmp_path
+
+
+def test_alignment_table():
+    alignments = [(("学", "ガク"), ("校", "コウ")), (), (("校", "コウ"),)]
+    table = AlignmentTable(alignments)
+    assert list(table) == alignments
+    assert table[-1] == (("校", "コウ"),)
+    with pytest.raises(IndexError):
+        table[3]
+    positions = table.word_positions()
+    assert list(positions) == ["学", "校"]
+    assert list(positions["校"]["コウ"]) == [0, 2]
+
+
+def test_replace():
+    alignments = [(("学", "ガク"), ("校", "コウ")), (), (("校", "コウ"),)]
+    replaced = AlignmentTable(alignments).replace({0: (), 1: (("字", "ジ"),)})
+    expected = AlignmentTable([(), (("字", "ジ"),), (("校", "コウ"),)])
+    assert list(replaced) == list(expected)
+    # unused pairs are left out, and chars are in the order they are first used
+    positions = replaced.word_positions()
+    assert positions == expected.word_positions()
+    assert list(positions) == ["字", "校"]
+
+
+def test_alignments_are_reused():
+    aligner = CountingAligner(READINGS)
+    alignments = list(align_words(WORDS, aligner))
+    assert alignments == aligner.align_many((w.surface, w.pron) for w in WORDS)
+    assert store_path(WORDS, aligner).exists()
+
+    aligner = CountingAligner(READINGS)
+    assert list(align_words(WORDS, aligner)) == alignments
+    assert aligner.aligned == []
+
+
+def test_only_words_with_changed_chars_are_realigned():
+    align_words(WORDS, CountingAligner(READINGS))
+
+    # 漢 gains a reading
+    aligner = CountingAligner({**READINGS, "漢": ["カン", "カラ"]})
+    alignments = list(align_words(WORDS, aligner))
+    assert sorted(aligner.aligned) == ["漢", "漢字"]
+    assert alignments[4] == (("漢", "カラ"),)
+    assert alignments == JpAligner(aligner.char_to_prons).align_many(
+        (w.surface, w.pron) for w in WORDS
+    )
+
+    # and the updated alignments are stored
+    aligner = CountingAligner({**READINGS, "漢": ["カン", "カラ"]})
+    align_words(WORDS, aligner)
+    assert aligner.aligned == []
+
+
+def test_words_are_aligned_in_worker_processes(monkeypatch):
+    monkeypatch.setattr(alignments, "ALIGN_CHUNK_SIZE", 2)
+    monkeypatch.setitem(vars(alignments), "__workers", 1)
+    alignments.set_workers(2)
+    # aligners in worker processes do not count
+    aligner = CountingAligner(READINGS)
+    table = list(align_words(WORDS, aligner))
+    assert aligner.aligned == []
+    assert table == JpAligner(READINGS).align_many((w.surface, w.pron) for w in WORDS)
+
+    # the words realigned after a change are aligned in the workers, too
+    readings = {**READINGS, "漢": ["カン", "カラ"], "字": ["ジ", "カン"]}
+    aligner = CountingAligner(readings)
+    table = list(align_words(WORDS, aligner))
+    assert aligner.aligned == []
+    assert table == JpAligner(readings).align_many((w.surface, w.pron) for w in WORDS)
@@ -0,0 +1,51 @@
+import tarfile
+import zipfile
+
+import pytest
+
+from uniunihan_db.data.archive import ArchiveMember, open_text
+
+
+@pytest.fixture
+def zip_archive(tmp_path):
+    path = tmp_path / "data-master.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("data-master/words.txt", "一 yi1\n二 er4\n")
+        zf.writestr("data-master/other.txt", "other")
+    return path
+
+
+@pytest.fixture
+def tar_archive(tmp_path):
+    source = tmp_path / "words.txt"
+    source.write_text("一 yi1\n二 er4\n", encoding="utf-8")
+    path = tmp_path / "data.tar.gz"
+    with tarfile.open(path, "w:gz") as tf:
+        tf.add(source, arcname="./data/words.txt")
+    return path
+
+
+def test_read_zip_member(zip_archive):
+    with open_text(ArchiveMember(zip_archive, "data-master/words.txt")) as f:
+        assert f.readlines() == ["一 yi1\n", "二 er4\n"]
+
+
+def test_read_tar_member(tar_archive):
+    # the leading ./ of the stored member name is ignored
+    with open_text(ArchiveMember(tar_archive, "data/words.txt")) as f:
+        assert f.read() == "一 yi1\n二 er4\n"
+
+
+def test_read_plain_file(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("三 san1\n", encoding="utf-8")
+    with open_text(path) as f:
+        assert f.read() == "三 san1\n"
+
+
+@pytest.mark.parametrize("archive", ["zip_archive", "tar_archive"])
+def test_missing_member(archive, request):
+    member = ArchiveMember(request.getfixturevalue(archive), "data/missing.txt")
+    with pytest.raises(KeyError):
+        with open_text(member):
+            pass
@@ -0,0 +1,126 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from uniunihan_db.data import cache
+from uniunihan_db.data.archive import ArchiveMember
+from uniunihan_db.data.cache import persistent_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+def test_results_are_reused_until_source_changes(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("a b c")
+    calls = []
+
+    @persistent_cache(source)
+    def read_words():
+        calls.append(1)
+        return source.read_text().split()
+
+    assert read_words() == ["a", "b", "c"]
+    assert read_words() == ["a", "b", "c"]
+    assert len(calls) == 1
+
+    source.write_text("a b c d")
+    assert read_words() == ["a", "b", "c", "d"]
+    assert len(calls) == 2
+
+
+def test_path_arguments_are_sources(tmp_path):
+    calls = []
+
+    @persistent_cache()
+    def read_words(file: Path, upper: bool = False):
+        calls.append(1)
+        text = file.read_text()
+        return (text.upper() if upper else text).split()
+
+    file_1 = tmp_path / "1.txt"
+    file_1.write_text("a b")
+    file_2 = tmp_path / "2.txt"
+    file_2.write_text("c d")
+
+    assert read_words(file_1) == ["a", "b"]
+    assert read_words(file_2) == ["c", "d"]
+    assert read_words(file_1, upper=True) == ["A", "B"]
+    assert read_words(file_1) == ["a", "b"]
+    assert len(calls) == 3
+
+
+def test_archive_member_sources(tmp_path):
+    archive = tmp_path / "archive.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.txt", "a")
+        zf.writestr("b.txt", "b")
+    calls = []
+
+    @persistent_cache()
+    def read(member: ArchiveMember):
+        calls.append(1)
+        return member.name
+
+    assert read(ArchiveMember(archive, "a.txt")) == "a.txt"
+    assert read(ArchiveMember(archive, "b.txt")) == "b.txt"
+    assert read(ArchiveMember(archive, "a.txt")) == "a.txt"
+    assert len(calls) == 2
+
+
+def test_downloads_run_before_sources_are_read(tmp_path):
+    source = tmp_path / "downloaded.txt"
+
+    def download():
+        if not source.exists():
+            source.write_text("x")
+
+    @persistent_cache(source, downloads=[download])
+    def read():
+        return source.read_text()
+
+    assert read() == "x"
+
+
+def test_unreadable_cache_file_is_replaced(tmp_path, cache_dir):
+    source = tmp_path / "source.txt"
+    source.write_text("a")
+
+    @persistent_cache(source)
+    def read():
+        return source.read_text()
+
+    read()
+    for path in cache_dir.glob("read-*.pickle"):
+        path.write_bytes(b"garbage")
+    assert read() == "a"
+
+
+def test_file_digest(tmp_path):
+    file = tmp_path / "file.txt"
+    file.write_text("a")
+    digest = cache.file_digest(file)
+    assert cache.file_digest(file) == digest
+
+    file.write_text("b")
+    assert cache.file_digest(file) != digest
+
+
+def test_code_digest_covers_used_modules():
+    # helpers in other modules, such as the word tables and aligners used by the
+    # dataset accessors, are part of the key
+    dependencies = vars(cache)["__module_dependencies"]("uniunihan_db.data.datasets")
+    assert {
+        "uniunihan_db.data.datasets",
+        "uniunihan_db.data.alignments",
+        "uniunihan_db.data.types",
+        "uniunihan_db.lingua.aligner",
+    } <= set(dependencies)
+    assert "uniunihan_db.pipeline.runner" not in dependencies
+    assert cache.code_digest("uniunihan_db.data.datasets") != cache.code_digest(
+        "uniunihan_db.data.types"
+    )
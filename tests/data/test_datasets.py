@@ -1,3 +1,4 @@
+from uniunihan_db.data import alignments, cache
 from uniunihan_db.data.datasets import (
     BaxterSagart,
     YtenxRhyme,
@@ -9,13 +10,17 @@ from uniunihan_db.data.datasets import (
     get_historical_on_yomi,
     get_joyo,
     get_unihan_variants,
+    get_vocab_index,
     get_ytenx_rhymes,
     get_ytenx_variants,
     index_vocab,
+    iter_cedict,
+    iter_edict_freq,
 )
 from uniunihan_db.data.paths import TEST_CORPUS_DIR
-from uniunihan_db.data.types import Word, ZhWord
-from uniunihan_db.lingua.aligner import ZhAligner
+from uniunihan_db.data.types import Word, WordTable, ZhWord
+from uniunihan_db.lingua.aligner import JpAligner, ZhAligner
+from uniunihan_db.util import format_json
 
 
 def test_get_ytenx_rhymes():
@@ -120,6 +125,25 @@ def test_get_edict_freq():
         "敵対",
         "保湿",
     ]
+    top_words = get_edict_freq(TEST_CORPUS_DIR / "edict_freq_sample.txt", limit=2)
+    assert list(top_words) == words[:2]
+
+
+def test_iter_edict_freq(tmp_path):
+    file = tmp_path / "edict_freq.txt"
+    file.write_text(
+        "# header\n"
+        "心配事 [しんぱいごと] /(n) worries/###20/\n"
+        "すごい /(adj-i) terrible/###500/\n"
+        "卒園 [そつえん] /(n,vs) finishing kindergarten/###30/\n"
+        "保湿 [ほしつ] /(n,adj-no,vs) moisturizer/###10/\n",
+        encoding="utf-8",
+    )
+    words = list(iter_edict_freq(file, min_freq=20))
+    assert [(w.id, w.surface, w.frequency) for w in words] == [
+        ("edict-1", "心配事", 20),
+        ("edict-3", "卒園", 30),
+    ]
 
 
 def test_index_vocab():
@@ -135,6 +159,38 @@ def test_index_vocab():
     assert char_to_pron_to_words["伴"]["han"][0].surface == "同伴"
 
 
+def test_index_vocab_in_parallel(monkeypatch):
+    monkeypatch.setattr(alignments, "ALIGN_CHUNK_SIZE", 2)
+    aligner = JpAligner({"漢": ["カン"], "字": ["ジ"], "学": ["ガク"], "校": ["コウ"]})
+    words = [
+        Word("漢字", "1", "かんじ", "", 0),
+        Word("学校", "2", "がっこう", "", 0),
+        Word("字", "3", "じ", "", 0),
+        Word("校", "4", "こう", "", 0),
+        Word("漢", "5", "から", "", 0),
+    ]
+    serial = index_vocab(words, aligner)
+    parallel = index_vocab(words, aligner, workers=2)
+    assert format_json(parallel) == format_json(serial)
+    assert [w.id for w in parallel["字"]["ジ"]] == ["1", "3"]
+
+
+def test_get_vocab_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    words = WordTable(iter_cedict(TEST_CORPUS_DIR / "cedict_sample.u8"))
+    index = get_vocab_index(words, ZhAligner())
+    assert format_json(dict(index)) == format_json(index_vocab(words, ZhAligner()))
+    # the index is shared by all callers, and persisted for later runs
+    assert get_vocab_index(words, ZhAligner()) is index
+    assert len(list(tmp_path.glob("alignments-*.pickle"))) == 1
+
+    ranked = index.with_frequencies(range(len(words)), key=lambda w: -w.frequency)
+    for c, pron_to_words in ranked.items():
+        for pron, ranked_words in pron_to_words.items():
+            ids = [w.id for w in index[c][pron]]
+            assert [w.id for w in ranked_words] == ids[::-1]
+
+
 def test_get_cedict():
     words = get_cedict(TEST_CORPUS_DIR / "cedict_sample.u8", filter=True)
     assert words[0] == ZhWord(
@@ -154,6 +210,23 @@ def test_get_cedict():
     ]
 
 
+def test_iter_cedict_skips_bad_lines(tmp_path):
+    file = tmp_path / "cedict.u8"
+    file.write_text(
+        "# CC-CEDICT\n"
+        "伏虎 伏虎 [fu2 hu3] /to subdue a tiger/\n"
+        "伏虎 [fu2 hu3] /missing simplified form/\n"
+        "伏臥 伏 [fu2 wo4] /mismatched lengths/\n"
+        "三族 三族 [san1 zu2] /(old) three generations/\n",
+        encoding="utf-8",
+    )
+    assert [(w.id, w.surface) for w in iter_cedict(file)] == [("cedict-2", "伏虎")]
+    assert [w.id for w in iter_cedict(file, filter=False)] == [
+        "cedict-2",
+        "cedict-5",
+    ]
+
+
 # TODO: mark as a larger test and only run sometimes
 def test_get_cedict_full() -> None:
     words = get_cedict()
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from uniunihan_db.data import download
+from uniunihan_db.data.download import Download, fetch, fetch_all
+
+CONTENT = bytes(range(256)) * 64
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Serves CONTENT at every path with an ETag, honoring Range requests (with
+    If-Range) unless the path starts with /no-range"""
+
+    requests = []
+    content = CONTENT
+    etag = '"v1"'
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        FileHandler.requests.append((self.path, range_header))
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        content = FileHandler.content
+        if_range = self.headers.get("If-Range")
+        if (
+            range_header
+            and not self.path.startswith("/no-range")
+            and if_range in (None, FileHandler.etag)
+        ):
+            start = int(range_header.split("=")[1].rstrip("-"))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(content)}")
+                self.end_headers()
+                return
+            body = content[start:]
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}"
+            )
+        else:
+            body = content
+            self.send_response(200)
+        self.send_header("ETag", FileHandler.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FileHandler.requests = []
+    FileHandler.content = CONTENT
+    FileHandler.etag = '"v1"'
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    thread = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    assert fetch(Download("file", f"{server}/file.zip", dest)) == dest
+    assert dest.read_bytes() == CONTENT
+    assert not (tmp_path / "file.zip.part").exists()
+
+
+def test_existing_file_is_not_downloaded(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    dest.write_bytes(b"already here")
+    fetch(Download("file", f"{server}/file.zip", dest))
+    assert dest.read_bytes() == b"already here"
+    assert FileHandler.requests == []
+
+
+def write_partial(tmp_path, content, validator='"v1"', size=len(CONTENT)):
+    (tmp_path / "file.zip.part").write_bytes(content)
+    (tmp_path / "file.zip.part.json").write_text(
+        json.dumps({"validator": validator, "size": size})
+    )
+
+
+def test_resume_partial_download(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    write_partial(tmp_path, CONTENT[:1000])
+    fetch(Download("file", f"{server}/file.zip", dest))
+    assert dest.read_bytes() == CONTENT
+    assert FileHandler.requests == [("/file.zip", "bytes=1000-")]
+    assert not (tmp_path / "file.zip.part.json").exists()
+
+
+def test_complete_partial_download(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    write_partial(tmp_path, CONTENT)
+    fetch(Download("file", f"{server}/file.zip", dest))
+    assert dest.read_bytes() == CONTENT
+
+
+def test_partial_download_without_validator_is_not_resumed(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    (tmp_path / "file.zip.part").write_bytes(b"unknown origin")
+    fetch(Download("file", f"{server}/file.zip", dest))
+    assert dest.read_bytes() == CONTENT
+    assert FileHandler.requests == [("/file.zip", None)]
+
+
+def test_changed_file_is_downloaded_again(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    write_partial(tmp_path, b"old version prefix")
+    FileHandler.etag = '"v2"'
+    FileHandler.content = CONTENT[::-1]
+    fetch(Download("file", f"{server}/file.zip", dest))
+    assert dest.read_bytes() == CONTENT[::-1]
+
+
+def test_too_long_partial_download_is_downloaded_again(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    write_partial(tmp_path, CONTENT + b"garbage")
+    fetch(Download("file", f"{server}/file.zip", dest))
+    assert dest.read_bytes() == CONTENT
+    assert FileHandler.requests == [
+        ("/file.zip", f"bytes={len(CONTENT) + 7}-"),
+        ("/file.zip", None),
+    ]
+
+
+def test_restart_when_range_unsupported(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    write_partial(tmp_path, b"stale")
+    fetch(Download("file", f"{server}/no-range/file.zip", dest))
+    assert dest.read_bytes() == CONTENT
+
+
+def test_checksum_verification(server, tmp_path):
+    dest = tmp_path / "file.zip"
+    download = Download("file", f"{server}/file.zip", dest)
+    with pytest.raises(ValueError):
+        fetch(download, sha256="0" * 64)
+    assert not dest.exists()
+    assert not (tmp_path / "file.zip.part").exists()
+
+    fetch(download, sha256=hashlib.sha256(CONTENT).hexdigest())
+    assert dest.read_bytes() == CONTENT
+
+
+def test_fetch_all(server, tmp_path):
+    downloads = [
+        Download(f"file-{i}", f"{server}/{i}.zip", tmp_path / f"{i}.zip")
+        for i in range(5)
+    ]
+    manifest = {"file-0": hashlib.sha256(CONTENT).hexdigest()}
+    paths = fetch_all(downloads, manifest, max_workers=5)
+    assert paths == [d.dest for d in downloads]
+    assert all(p.read_bytes() == CONTENT for p in paths)
+
+
+def test_fetch_all_reports_errors_after_finishing(server, tmp_path):
+    downloads = [
+        Download("missing", f"{server}/missing.zip", tmp_path / "missing.zip"),
+        Download("file", f"{server}/file.zip", tmp_path / "file.zip"),
+    ]
+    with pytest.raises(Exception):
+        fetch_all(downloads)
+    assert (tmp_path / "file.zip").read_bytes() == CONTENT
+    assert not (tmp_path / "missing.zip").exists()
+
+
+def test_download_all_verifies_pinned_checksums(server, tmp_path, monkeypatch):
+    sources = {
+        name: Download(name, f"{server}/{name}.zip", tmp_path / f"{name}.zip")
+        for name in ["pinned", "unpinned"]
+    }
+    monkeypatch.setattr(download, "SOURCES", sources)
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"pinned": "0" * 64, "unpinned": None}))
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        download.download_all(manifest_path=manifest)
+    assert not (tmp_path / "pinned.zip").exists()
+    # unpinned sources are downloaded, with a warning
+    assert (tmp_path / "unpinned.zip").read_bytes() == CONTENT
+
+
+def test_download_is_not_needed_if_derived_files_exist(tmp_path):
+    derived = tmp_path / "unihan.json"
+    d = Download("d", "http://unused", tmp_path / "d.zip", (derived,))
+    assert d.is_needed()
+    derived.write_text("{}")
+    assert not d.is_needed()
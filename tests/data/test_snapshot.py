@@ -0,0 +1,99 @@
+import json
+import os
+import pickle
+import shutil
+
+import pytest
+
+from uniunihan_db.data import snapshot
+from uniunihan_db.data.paths import TEST_CORPUS_DIR
+
+SAMPLE_FILE = TEST_CORPUS_DIR / "unihan_sample.json"
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    return tmp_path
+
+
+def test_snapshot_matches_json(snapshot_dir):
+    with open(SAMPLE_FILE) as f:
+        expected = json.load(f)
+    unihan = snapshot.load_snapshot(SAMPLE_FILE)
+
+    assert len(unihan) == len(expected)
+    assert list(unihan) == sorted(expected, key=ord)
+    assert dict(unihan.items()) == expected
+    assert unihan["㗖"]["kDefinition"] == expected["㗖"]["kDefinition"]
+
+
+def test_missing_keys(snapshot_dir):
+    unihan = snapshot.load_snapshot(SAMPLE_FILE)
+    assert "a" not in unihan
+    assert "㑯㖈" not in unihan
+    assert unihan.get("a") is None
+    with pytest.raises(KeyError):
+        unihan["a"]
+
+
+def test_stale_snapshot_is_rebuilt(snapshot_dir):
+    source = snapshot_dir / "unihan_sample.json"
+    shutil.copy(SAMPLE_FILE, source)
+    assert len(snapshot.load_snapshot(source)) == 4
+
+    with open(source) as f:
+        data = json.load(f)
+    del data["㑯"]
+    with open(source, "w") as f:
+        json.dump(data, f)
+    # make sure the change is visible even on filesystems with coarse mtimes
+    os.utime(source, ns=(0, 0))
+
+    unihan = snapshot.load_snapshot(source)
+    assert len(unihan) == 3
+    assert "㑯" not in unihan
+
+
+def test_files_with_the_same_name_have_separate_snapshots(snapshot_dir):
+    source = snapshot_dir / "unihan_sample.json"
+    shutil.copy(SAMPLE_FILE, source)
+    with open(source) as f:
+        data = json.load(f)
+    del data["㑯"]
+    with open(source, "w") as f:
+        json.dump(data, f)
+
+    assert snapshot.snapshot_path(source) != snapshot.snapshot_path(SAMPLE_FILE)
+    assert len(snapshot.load_snapshot(SAMPLE_FILE)) == 4
+    assert len(snapshot.load_snapshot(source)) == 3
+    # neither snapshot was replaced by the other
+    mtime = snapshot.snapshot_path(SAMPLE_FILE).stat().st_mtime_ns
+    assert len(snapshot.load_snapshot(SAMPLE_FILE)) == 4
+    assert snapshot.snapshot_path(SAMPLE_FILE).stat().st_mtime_ns == mtime
+
+
+def test_pickle_reopens_file(snapshot_dir):
+    unihan = snapshot.load_snapshot(SAMPLE_FILE)
+    copy = pickle.loads(pickle.dumps(unihan))
+    assert copy.path == unihan.path
+    assert dict(copy.items()) == dict(unihan.items())
+
+
+def test_project_fields(snapshot_dir):
+    with open(SAMPLE_FILE) as f:
+        expected = json.load(f)
+    unihan = snapshot.load_snapshot(SAMPLE_FILE).project(
+        ["kDefinition", "kSemanticVariant", "kNotAField"]
+    )
+
+    assert list(unihan) == sorted(expected, key=ord)
+    for char, entry in expected.items():
+        assert unihan[char] == {
+            k: v for k, v in entry.items() if k in ["kDefinition", "kSemanticVariant"]
+        }
+    assert "a" not in unihan
+
+    unihan = snapshot.load_snapshot(SAMPLE_FILE).project(["kZVariant"])
+    assert unihan["㖈"] == {"kZVariant": expected["㖈"]["kZVariant"]}
+    assert unihan["㑯"] == {}
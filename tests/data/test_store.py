@@ -0,0 +1,87 @@
+import pickle
+
+import pytest
+
+from uniunihan_db.data import datasets
+from uniunihan_db.data.datasets import attach_store, get_cedict, iter_cedict
+from uniunihan_db.data.paths import TEST_CORPUS_DIR
+from uniunihan_db.data.store import DatasetStore, write_store
+from uniunihan_db.data.types import Word, WordTable
+
+WORDS = [
+    Word("植え替え", "edict-1", "うえかえ", "(n) transplanting", 18686),
+    Word("伴走", "", "ban sou", "", 0),
+    Word("卒園", "x-07", "そつえん", "(n,vs) finishing kindergarten", 18686),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    cedict = WordTable(iter_cedict(TEST_CORPUS_DIR / "cedict_sample.u8"))
+    write_store(
+        tmp_path / "datasets.store",
+        {
+            "edict": WordTable(WORDS),
+            "cedict": cedict,
+            "empty": WordTable(),
+            "components": {"官": ["館", "官"], "可": "何河", "x": set("cba")},
+        },
+    )
+    return DatasetStore(tmp_path / "datasets.store")
+
+
+def test_word_tables(store):
+    cedict = WordTable(iter_cedict(TEST_CORPUS_DIR / "cedict_sample.u8"))
+    for name, table in [("edict", WordTable(WORDS)), ("cedict", cedict)]:
+        stored = store[name]
+        assert list(stored) == list(table)
+        assert list(stored.surfaces) == list(table.surfaces)
+        assert stored.fingerprint() == table.fingerprint()
+        assert list(stored.with_frequencies(range(len(table)))) == list(
+            table.with_frequencies(range(len(table)))
+        )
+        key = lambda w: w.pron  # noqa: E731
+        assert stored.sorted(key).fingerprint() == table.sorted(key).fingerprint()
+        # copies share the store's columns, but can be pickled on their own
+        for copy in [
+            stored.with_frequencies(range(len(table))),
+            stored.sorted(key).with_frequencies(range(len(table))),
+        ]:
+            unpickled = pickle.loads(pickle.dumps(copy))
+            assert type(unpickled) is WordTable
+            assert unpickled.fingerprint() == copy.fingerprint()
+            assert list(unpickled) == list(copy)
+    assert len(store["empty"]) == 0
+    # datasets are only decoded once
+    assert store["edict"] is store["edict"]
+
+
+def test_multimap(store):
+    components = store["components"]
+    assert list(components.items()) == [
+        ("官", ("館", "官")),
+        ("可", ("何", "河")),
+        ("x", ("a", "b", "c")),
+    ]
+    assert components["可"] == ("何", "河")
+    assert "館" not in components
+    assert 1 not in components
+    with pytest.raises(KeyError):
+        components["館"]
+
+
+def test_pickled_by_path(store):
+    data = pickle.dumps((store, store["edict"]))
+    assert len(data) < 500
+    unpickled_store, edict = pickle.loads(data)
+    assert list(edict) == WORDS
+    assert unpickled_store.path == store.path
+
+
+def test_attached_store_is_used_by_accessors(store):
+    attach_store(store)
+    try:
+        assert get_cedict() is store["cedict"]
+    finally:
+        attach_store(None)
+    assert datasets.__dict__["__store"] is None
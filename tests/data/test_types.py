@@ -0,0 +1,132 @@
+import json
+import pickle
+
+import pytest
+
+from uniunihan_db.data.types import VocabIndex, Word, WordTable, ZhWord
+from uniunihan_db.util import format_json
+
+WORDS = [
+    Word("植え替え", "edict-1", "うえかえ", "(n) transplanting", 18686),
+    Word("心配事", "edict-2", "しんぱいごと", "(n) worries/cares", 18685),
+    Word("伴走", "", "ban sou", "", 0),
+    Word("卒園", "x-07", "そつえん", "(n,vs) finishing kindergarten", 18686),
+]
+ZH_WORDS = [
+    ZhWord("三文魚", "cedict-1", "san1 wen2 yu2", "salmon", -1, "三文鱼"),
+    ZhWord("伏虎", "cedict-2", "fu2 hu3", "to subdue a tiger", 3, "伏虎"),
+]
+
+
+class TestWordTable:
+    @staticmethod
+    def test_rows_match_words():
+        table = WordTable(WORDS)
+        assert len(table) == len(WORDS)
+        assert list(table) == WORDS
+        assert table[-1] == WORDS[-1]
+        assert table[1:3] == WORDS[1:3]
+        assert table[0].english == "(n) transplanting"
+        assert WordTable([Word("走", "7", "sou", "", 0)])[0].id == "7"
+        with pytest.raises(IndexError):
+            table[len(WORDS)]
+
+    @staticmethod
+    def test_simplified():
+        table = WordTable(ZH_WORDS)
+        assert list(table) == ZH_WORDS
+        assert table[0].simplified == "三文鱼"
+        assert table[1].simplified == "伏虎"
+        with pytest.raises(AttributeError):
+            WordTable(WORDS)[0].simplified
+
+    @staticmethod
+    def test_strings_are_interned():
+        # built at runtime, so that they are distinct objects
+        surface, pron = "".join(["伏", "虎"]), " ".join(["fu2", "hu3"])
+        table = WordTable(
+            [ZhWord(surface, "1", pron, "", 0, surface), *ZH_WORDS, *ZH_WORDS]
+        )
+        assert table[0].surface is table[2].surface is table[4].surface
+        assert table[0].pron is table[2].pron
+        assert table[0].simplified is table[0].surface
+
+    @staticmethod
+    def test_with_frequencies():
+        table = WordTable(WORDS)
+        updated = table.with_frequencies([1, 2, 3, 4])
+        assert [w.frequency for w in updated] == [1, 2, 3, 4]
+        assert [w.frequency for w in table] == [w.frequency for w in WORDS]
+        with pytest.raises(ValueError):
+            table.with_frequencies([1])
+
+    @staticmethod
+    def test_sorted_is_stable():
+        table = WordTable(WORDS).sorted(key=lambda w: -w.frequency)
+        assert [w.id for w in table] == ["edict-1", "x-07", "edict-2", ""]
+
+    @staticmethod
+    def test_pickle():
+        table = WordTable(ZH_WORDS)
+        assert list(pickle.loads(pickle.dumps(table))) == ZH_WORDS
+        # rows are pickled as plain words
+        assert pickle.loads(pickle.dumps(table[0])) == ZH_WORDS[0]
+        assert type(pickle.loads(pickle.dumps(table[0]))) is ZhWord
+
+    @staticmethod
+    def test_json():
+        rows = list(WordTable(ZH_WORDS))
+        assert json.loads(format_json(rows)) == json.loads(format_json(ZH_WORDS))
+
+    @staticmethod
+    def test_fingerprint():
+        table = WordTable(WORDS)
+        assert table.fingerprint() == WordTable(WORDS).fingerprint()
+        assert table.fingerprint() != table.with_frequencies([1, 2, 3, 4]).fingerprint()
+        assert table.fingerprint() != WordTable(WORDS[:-1]).fingerprint()
+
+
+class TestVocabIndex:
+    @staticmethod
+    def index():
+        table = WordTable(
+            [
+                Word("伴走", "1", "ban sou", "", 1),
+                Word("走", "2", "sou", "", 2),
+                Word("伴", "3", "ban", "", 3),
+            ]
+        )
+        return VocabIndex(table, {"伴": {"ban": [0, 2]}, "走": {"sou": [0, 1]}})
+
+    @staticmethod
+    def test_mapping():
+        index = TestVocabIndex.index()
+        assert list(index) == ["伴", "走"]
+        assert "伴" in index and "字" not in index
+        assert [w.id for w in index["走"]["sou"]] == ["1", "2"]
+        assert index.get("字", {}).get("ji", []) == []
+        assert list(index.prons("伴")) == ["ban"]
+        assert list(index.prons("字")) == []
+
+    @staticmethod
+    def test_strings_are_interned():
+        # built at runtime, so that they are distinct objects
+        surface, pron = "".join(["伏", "虎"]), " ".join(["fu2", "hu3"])
+        table = WordTable(
+            [ZhWord(surface, "1", pron, "", 0, surface), *ZH_WORDS, *ZH_WORDS]
+        )
+        assert table[0].surface is table[2].surface is table[4].surface
+        assert table[0].pron is table[2].pron
+        assert table[0].simplified is table[0].surface
+
+    @staticmethod
+    def test_with_frequencies():
+        index = TestVocabIndex.index()
+        ranked = index.with_frequencies([5, 7, 5], key=lambda w: -w.frequency)
+        assert [(w.id, w.frequency) for w in ranked["伴"]["ban"]] == [
+            ("1", 5),
+            ("3", 5),
+        ]
+        assert [w.id for w in ranked["走"]["sou"]] == ["2", "1"]
+        # the original index is unchanged
+        assert [(w.id, w.frequency) for w in index["走"]["sou"]] == [("1", 1), ("2", 2)]
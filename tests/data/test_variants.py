@@ -0,0 +1,51 @@
+import pickle
+
+from uniunihan_db.data.variants import VariantGraph, VariantType
+
+EDGES = [
+    ("從", "从", VariantType.SIMPLIFIED),
+    ("从", "從", VariantType.TRADITIONAL),
+    ("從", "従", VariantType.SHINJITAI),
+    ("從", "从", VariantType.SEMANTIC),
+    ("麵", "面", VariantType.SIMPLIFIED),
+    ("麵", "麺", VariantType.SHINJITAI),
+    # ignored
+    ("曲", "曲", VariantType.SIMPLIFIED),
+]
+
+
+class TestVariantGraph:
+    @staticmethod
+    def test_components():
+        graph = VariantGraph(EDGES)
+        assert graph.component("従") == "从従從"
+        assert graph.canonical("従") == "从"
+        assert graph.equivalent("麺", "面")
+        assert not graph.equivalent("從", "麵")
+        assert sorted(graph.components()) == ["从従從", "面麵麺"]
+        assert len(graph) == 6
+
+    @staticmethod
+    def test_characters_without_variants():
+        graph = VariantGraph(EDGES)
+        assert "曲" not in graph
+        assert graph.canonical("曲") == "曲"
+        assert graph.component("曲") == "曲"
+        assert graph.equivalent("曲", "曲")
+        assert graph.variants("曲") == {}
+
+    @staticmethod
+    def test_typed_edges():
+        graph = VariantGraph(EDGES)
+        assert graph.variants("從") == {
+            "从": VariantType.SIMPLIFIED | VariantType.SEMANTIC,
+            "従": VariantType.SHINJITAI,
+        }
+        assert graph.variants("从") == {"從": VariantType.TRADITIONAL}
+
+    @staticmethod
+    def test_pickle():
+        graph = pickle.loads(pickle.dumps(VariantGraph(EDGES)))
+        assert graph.canonical("麺") == "面"
+        assert graph.component("従") is graph.component("从")
+        assert graph.variants("麵")["麺"] is VariantType.SHINJITAI
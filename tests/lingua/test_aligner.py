@@ -1,3 +1,6 @@
+import random
+
+from tests.reference import reference_jp_align
 from uniunihan_db.lingua.aligner import JpAligner, KoAligner, ZhAligner
 
 
@@ -65,6 +68,50 @@ class TestJpAligner:
         alignment = TestJpAligner.ALIGNER.align("シソ科", "シソカ")
         assert alignment == {("科", "カ")}
 
+    @staticmethod
+    def test_matches_reference_implementation() -> None:
+        char_to_prons = {
+            **TestJpAligner.CHAR_TO_PRONS,
+            "一": ["イチ", "イツ", "イ"],
+            "日": ["ニチ", "ジツ", "ニ", "カ"],
+            "人": ["ジン", "ニン", "ト"],
+            "発": ["ハツ", "ホツ", "ハ"],
+            "来": ["ライ", "タイ"],
+        }
+        aligner = JpAligner(char_to_prons)
+        chars = list(char_to_prons) + ["カ", "ッ", "の"]
+        kana = "カガキギクグコゴハバパンツッイチジトドニ"
+        rng = random.Random(0)
+        for _ in range(3000):
+            surface = "".join(rng.choices(chars, k=rng.randint(1, 5)))
+            if rng.random() < 0.5:
+                # build a plausible pronunciation from the readings
+                pron = ""
+                for c in surface:
+                    readings = char_to_prons.get(c, [c])
+                    pron += rng.choice(readings)
+            else:
+                pron = "".join(rng.choices(kana, k=rng.randint(1, 8)))
+            expected = reference_jp_align(char_to_prons, surface, pron)
+            assert aligner.align(surface, pron) == expected, (surface, pron)
+
+    @staticmethod
+    def test_fingerprint():
+        aligner = JpAligner({"漢": ["カン"], "字": ["ジ"]})
+        assert aligner == JpAligner({"字": ["ジ"], "漢": ["カン"]})
+        assert hash(aligner) == hash(JpAligner({"字": ["ジ"], "漢": ["カン"]}))
+        assert aligner != JpAligner({"漢": ["カン", "ハン"], "字": ["ジ"]})
+        assert aligner.fingerprint() != ZhAligner().fingerprint()
+        assert ZhAligner() == ZhAligner()
+
+    @staticmethod
+    def test_char_config():
+        aligner = JpAligner({"漢": ["カン", "カラ"], "字": ["ジ"]})
+        assert aligner.char_config("漢") == ("カラ", "カン")
+        assert aligner.char_config("学") is None
+        assert aligner.char_config("か") is None
+        assert ZhAligner().char_config("漢") is None
+
 
 class TestSpaceAligner:
     ALIGNER = ZhAligner()
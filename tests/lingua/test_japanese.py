@@ -3,7 +3,13 @@ from typing import Any, Collection, Tuple, Union
 
 import pytest
 
+from tests.reference import (
+    random_words,
+    reference_alpha_to_kana,
+    reference_kana_to_alpha,
+)
 from uniunihan_db.lingua import japanese
+from uniunihan_db.lingua.japanese import Romanization
 from uniunihan_db.util import read_csv
 
 CODE_DIR = Path(__file__).parents[0]
@@ -60,6 +66,53 @@ def test_kana_to_ime(kana: str, expected_ime: str) -> None:
     assert actual == expected_ime
 
 
+def test_conversions_match_reference() -> None:
+    alpha = {
+        *japanese.HEPBURN_DIGRAPHS,
+        *japanese.HEPBURN_50,
+        *japanese.HEPBURN_GLIDE,
+        *japanese.HEPBURN_SEMIVOWELS,
+        *japanese.VOWELS,
+        *"nm'-kstph",
+    }
+    words = random_words(alpha, 5000)
+    assert japanese.alpha_to_kana_many(words) == [
+        reference_alpha_to_kana(w) for w in words
+    ]
+
+    kana = {
+        *japanese.NIHONSIKI_TRIGRAPH.values(),
+        *japanese.NIHONSIKI_COMPOUND.values(),
+        *japanese.VOWELS.values(),
+        "ん",
+        "っ",
+    }
+    words = random_words(kana, 5000)
+    assert japanese.kana_to_alpha_many(words) == [
+        reference_kana_to_alpha(w) for w in words
+    ]
+
+
+@pytest.mark.parametrize(
+    "kana,romaji",
+    [
+        ("しんぶん", "shinbun"),
+        ("じょじょ", "jojo"),
+        ("ふつう", "futsuu"),
+        ("まっちゃ", "matcha"),
+        ("きっさ", "kissa"),
+        ("かんい", "kan'i"),
+    ],
+)
+def test_kana_to_hepburn(kana: str, romaji: str) -> None:
+    assert japanese.kana_to_alpha(kana, Romanization.HEPBURN) == romaji
+
+
+def test_ime_to_kana() -> None:
+    assert japanese.alpha_to_kana("zyozyo", Romanization.IME) == "じょじょ"
+    assert japanese.alpha_to_kana("sitatuzutumi", Romanization.IME) == "したつずつみ"
+
+
 @pytest.mark.parametrize(
     "input,expected",
     [("katsu", "katu"), ("jachunfu", "zyatyunhu"), ("saan'i", "saan'i")],
@@ -112,3 +165,22 @@ def test_parse_legal_han_syllable(
 def test_parse_nonce_han_syllable() -> None:
     syl = japanese.parse_han_syllable("xyadfs")
     assert syl is None
+
+
+def test_parsed_han_syllables_are_shared() -> None:
+    syllable = japanese.parse_han_syllable("kyaku")
+    assert syllable is japanese.parse_han_syllable(" KYAKU")
+    with pytest.raises(AttributeError):
+        syllable.coda = "n"  # type: ignore
+    # precomputed parses are the same as parsing from scratch
+    parse = japanese.__parse_han_syllable
+    for s, precomputed in japanese.__parsed_han_syllables().items():
+        assert precomputed == parse(s), s
+
+
+def test_parse_han_syllables() -> None:
+    parses = japanese.parse_han_syllables(["キャク", "ryuu", "キャク", "xyz"])
+    assert list(parses) == ["キャク", "ryuu", "xyz"]
+    assert parses["キャク"] is japanese.parse_han_syllable("kyaku")
+    assert parses["ryuu"] is japanese.parse_han_syllable("ryuu")
+    assert parses["xyz"] is None
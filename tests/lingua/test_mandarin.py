@@ -1,6 +1,36 @@
+import random
+
 import pytest
 
+from tests.reference import (
+    reference_numbers_to_tone_marks,
+    reference_strip_tone,
+    reference_tone_marks_to_numbers,
+)
 from uniunihan_db.lingua import mandarin
+from uniunihan_db.lingua.mandarin import ToneFormat
+
+
+def random_pinyin(rng, count):
+    """Strings of numbered pinyin syllables, with some capitalized, misspelled and
+    punctuated ones"""
+    syllables = [
+        onset + final
+        for onset in ["", "zh", "sh", "b", "l", "n", "y", "w"]
+        for final in mandarin.FINALS + ["v", "u:", "ve", "r"]
+    ]
+    strings = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(1, 4)):
+            w = rng.choice(syllables) + rng.choice("0123455 ")
+            if rng.random() < 0.1:
+                w = w.capitalize()
+            if rng.random() < 0.05:
+                w += rng.choice(",?·")
+            words.append(w)
+        strings.append(rng.choice([" ", "  "]).join(words))
+    return strings
 
 
 # NEXT: reorganize as CGVX;
@@ -73,3 +103,44 @@ def test_pinyin_tone_marks_to_numbers() -> None:
 def test_pinyin_numbers_to_tone_marks() -> None:
     s = "Ni3 hao3 ma0?"
     assert mandarin.pinyin_numbers_to_tone_marks(s) == "Nǐ hǎo ma?"
+
+
+def test_strip_tone_matches_reference() -> None:
+    for vowels in mandarin.PINYIN_VOWELS:
+        for s in [vowels, "hǎo", "nǚ", "LǙ", "lǜè", "xyz", ""]:
+            assert mandarin.strip_tone(s) == reference_strip_tone(s), s
+
+
+def test_conversions_match_reference() -> None:
+    numbered = random_pinyin(random.Random(0), 5000)
+    marked = [reference_numbers_to_tone_marks(s) for s in numbered]
+    assert mandarin.convert_many(numbered, ToneFormat.MARKS) == marked
+    assert mandarin.convert_many(marked, ToneFormat.NUMBERS) == [
+        reference_tone_marks_to_numbers(s) for s in marked
+    ]
+    for s in numbered[:100]:
+        assert mandarin.pinyin_numbers_to_tone_marks(s) == (
+            reference_numbers_to_tone_marks(s)
+        )
+
+
+def test_parsed_syllables_are_shared() -> None:
+    syllable = mandarin.parse_syllable("hǎo")
+    assert syllable is mandarin.parse_syllable(" HǍO")
+    with pytest.raises(AttributeError):
+        syllable.tone = 4  # type: ignore
+    # precomputed parses are the same as parsing from scratch
+    parse = mandarin.__parse_syllable
+    for s, precomputed in mandarin.__parsed_syllables().items():
+        assert precomputed == parse(s), s
+
+
+def test_parse_syllables() -> None:
+    parses = mandarin.parse_syllables(
+        ["hao3", "lu:4", "hao3", "xyz1"], ToneFormat.NUMBERS
+    )
+    assert list(parses) == ["hao3", "lu:4", "xyz1"]
+    assert parses["hao3"] is mandarin.parse_syllable("hǎo")
+    assert parses["lu:4"] == mandarin.parse_syllable("lǜ")
+    assert parses["xyz1"] is None
+    assert mandarin.parse_syllables(["hǎo"]) == {"hǎo": mandarin.parse_syllable("hǎo")}
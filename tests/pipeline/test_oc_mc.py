@@ -0,0 +1,29 @@
+from uniunihan_db.data.variants import VariantGraph, VariantType
+from uniunihan_db.pipeline import oc_mc
+
+get_with_variants = vars(oc_mc)["__get_with_variants"]
+
+
+def test_data_of_form_variants_is_used():
+    variants = VariantGraph(
+        [
+            ("从", "從", VariantType.TRADITIONAL),
+            ("从", "乙", VariantType.SEMANTIC),
+        ]
+    )
+    char_to_data = {"從": ["dzjowng"], "乙": ["qrit"]}
+    assert get_with_variants("從", char_to_data, variants) == ["dzjowng"]
+    assert get_with_variants("从", char_to_data, variants) == ["dzjowng"]
+
+
+def test_data_of_semantic_variants_is_not_used():
+    variants = VariantGraph(
+        [
+            ("甲", "乙", VariantType.SEMANTIC),
+            ("甲", "丙", VariantType.OTHER),
+            # chains of form variants through a semantic variant are not followed
+            ("乙", "丁", VariantType.SIMPLIFIED),
+        ]
+    )
+    char_to_data = {"乙": ["a"], "丙": ["b"], "丁": ["c"]}
+    assert get_with_variants("甲", char_to_data, variants) == []
@@ -0,0 +1,62 @@
+from uniunihan_db.component.index import find_component_groups
+from uniunihan_db.pipeline import oc_mc
+from uniunihan_db.pipeline.group_chars import update_char_data
+from uniunihan_db.pipeline.organize import organize_data, update_organized_data
+
+COMP_TO_CHAR = {"官": "館官棺菅", "可": "可河何", "缶": "缶"}
+
+
+def pipeline_data(char_to_prons):
+    char_data = {
+        c: {"prons": {p: {"vocab": []} for p in prons}}
+        for c, prons in char_to_prons.items()
+    }
+    # the index shares the prons of char_data, as in group_chars
+    index = find_component_groups(
+        {c: c_data["prons"] for c, c_data in char_data.items()}, COMP_TO_CHAR
+    )
+    return oc_mc.integrate_historical_chinese(
+        {"char_data": char_data, "group_index": index}
+    )
+
+
+def test_update_organized_data(monkeypatch):
+    monkeypatch.setitem(vars(oc_mc), "__historical_data", lambda c: [f"old {c}"])
+    char_to_prons = {"館": ["kan"], "官": ["kan"], "可": ["ka"], "河": ["ka", "ga"]}
+    data = pipeline_data(char_to_prons)
+    organized = organize_data(data)
+
+    index = data["group_index"]
+    changes = index.add_char("缶", ["kan"], "缶")
+    changes.update(index.set_prons("河", ["ga", "ka"]))
+    changes.update(index.add_char("棺", ["kan"], "官"))
+    changes.update(index.remove_char("館"))
+    update_char_data(data, changes)
+    # select_vocab would find the vocabulary of the new characters
+    for c in changes.chars & data["char_data"].keys():
+        for pron_data in data["char_data"][c]["prons"].values():
+            pron_data.setdefault("vocab", [])
+    oc_mc.update_historical_chinese(data, changes)
+    updated = update_organized_data(organized, data, changes)
+
+    expected_data = pipeline_data(
+        {"官": ["kan"], "可": ["ka"], "河": ["ga", "ka"], "缶": ["kan"], "棺": ["kan"]}
+    )
+    expected = organize_data(expected_data)
+    assert list(data["char_data"].items()) == list(expected_data["char_data"].items())
+    assert index.char_to_prons == expected_data["group_index"].char_to_prons
+
+    def order(organized):
+        # the order of the groups, their members and their clusters
+        return {
+            p: [
+                (component, g["historical"], [list(c.items()) for c in g["clusters"]])
+                for component, g in d["groups"].items()
+            ]
+            for p, d in organized.items()
+        }
+
+    assert order(updated) == order(expected)
+    assert {p: list(d["groups"].items()) for p, d in updated.items()} == {
+        p: list(d["groups"].items()) for p, d in expected.items()
+    }
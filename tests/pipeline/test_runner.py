@@ -0,0 +1,201 @@
+import argparse
+import multiprocessing
+
+import pytest
+
+from uniunihan_db import metrics
+from uniunihan_db.data.datasets import get_cedict, iter_cedict
+from uniunihan_db.data.paths import TEST_CORPUS_DIR
+from uniunihan_db.data.store import DatasetStore, write_store
+from uniunihan_db.data.types import WordTable
+from uniunihan_db.pipeline import runner
+from uniunihan_db.pipeline.runner import (
+    Stage,
+    count_chars,
+    parse_languages,
+    run_pipelines,
+    run_stages,
+)
+
+calls = []
+
+
+def load():
+    calls.append("load")
+    return ["loaded"]
+
+
+def add(data):
+    calls.append("add")
+    return data + ["added"]
+
+
+def finish(data):
+    calls.append("finish")
+    return data + ["finished"]
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    source = tmp_path / "override.json"
+    source.write_text("{}")
+    monkeypatch.setattr(runner, "PIPELINE_OUTPUT_DIR", tmp_path / "pipeline")
+    monkeypatch.setattr(runner.cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(
+        runner,
+        "STAGES",
+        [
+            Stage("load", {"jp": load, "zh": load}, {}),
+            Stage("add", {"jp": add, "zh": add}, {"jp": (source,)}),
+            Stage("finish", {"jp": finish, "zh": finish}, {}),
+        ],
+    )
+    calls.clear()
+    return source
+
+
+def test_unchanged_stages_are_skipped(source):
+    expected = ["loaded", "added", "finished"]
+    assert run_stages("jp") == expected
+    assert calls == ["load", "add", "finish"]
+
+    calls.clear()
+    assert run_stages("jp") == expected
+    assert calls == []
+
+
+def test_changed_source_resumes_from_previous_checkpoint(source):
+    run_stages("jp")
+    calls.clear()
+    source.write_text('{"a": 1}')
+    assert run_stages("jp") == ["loaded", "added", "finished"]
+    assert calls == ["add", "finish"]
+
+
+def test_from_stage_and_force(source):
+    run_stages("jp")
+    calls.clear()
+    run_stages("jp", from_stage="finish")
+    assert calls == ["finish"]
+
+    calls.clear()
+    run_stages("jp", force=True)
+    assert calls == ["load", "add", "finish"]
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="the workers must inherit the patched stages",
+)
+def test_run_pipelines_in_parallel(source, monkeypatch):
+    # the shared datasets are not needed by the test stages
+    monkeypatch.setattr(runner, "preload_shared_datasets", lambda *args: None)
+    # everything is downloaded before the workers start
+    downloads = []
+    monkeypatch.setattr(runner, "download_all", lambda: downloads.append(True))
+    expected = ["loaded", "added", "finished"]
+    assert run_pipelines(["jp", "zh"], jobs=2) == {"jp": expected, "zh": expected}
+    assert downloads == [True]
+    assert run_pipelines(["jp", "zh"], jobs=1) == {"jp": expected, "zh": expected}
+
+    # the workers' steps are recorded by the parent
+    metrics.start_recording()
+    try:
+        run_pipelines(["jp", "zh"], jobs=2, force=True)
+        names = {s.name for s in metrics.take_steps()}
+    finally:
+        metrics.stop_recording()
+    assert {"load.jp", "load.zh", "finish.jp", "finish.zh"} <= names
+
+
+def test_parse_languages():
+    assert parse_languages("zh,jp") == ["zh", "jp"]
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_languages("zh,xx")
+
+
+def stored_cedict_size(data):
+    # runs in a worker process
+    table = get_cedict()
+    return data + [f"{type(table).__name__} {len(table)}"]
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="the workers must inherit the patched stages",
+)
+def test_workers_attach_to_dataset_store(source, monkeypatch):
+    cedict = WordTable(iter_cedict(TEST_CORPUS_DIR / "cedict_sample.u8"))
+
+    def preload(languages, store_path):
+        write_store(store_path, {"cedict": cedict})
+        return DatasetStore(store_path)
+
+    monkeypatch.setattr(runner, "preload_shared_datasets", preload)
+    monkeypatch.setattr(runner, "download_all", lambda: [])
+    monkeypatch.setattr(
+        runner,
+        "STAGES",
+        [
+            Stage("vocab", {"zh": load, "jp": load}, {}),
+            Stage("size", {"zh": stored_cedict_size, "jp": stored_cedict_size}, {}),
+        ],
+    )
+    outputs = run_pipelines(["jp", "zh"], jobs=2)
+    assert outputs["zh"] == ["loaded", f"_StoredWordTable {len(cedict)}"]
+    # the store is removed afterwards
+    assert not list(runner.cache.CACHE_DIR.glob("*.store"))
+
+
+def test_stages_are_measured(source):
+    metrics.start_recording()
+    try:
+        run_stages("jp")
+        run_stages("jp", from_stage="finish")
+        steps = metrics.take_steps()
+    finally:
+        metrics.stop_recording()
+    assert [(s.name, s.kind, s.items_in, s.items_out) for s in steps] == [
+        ("load.jp", "stage", None, 1),
+        ("add.jp", "stage", 1, 2),
+        ("finish.jp", "stage", 2, 3),
+        ("add.jp", "checkpoint", None, 2),
+        ("finish.jp", "stage", 2, 3),
+    ]
+
+
+def test_count_chars():
+    char_data = {"一": {}, "二": {}}
+    assert count_chars(char_data) == 2
+    assert count_chars({"char_data": char_data, "group_index": None}) == 2
+    organized = {
+        "1": {"groups": {"g": {"clusters": [{"一": {}}, {"二": {}, "三": {}}]}}},
+        "2": {"groups": {}},
+    }
+    assert count_chars(organized) == 3
+    assert count_chars(None) is None
+
+
+def test_changed_code_in_used_modules_reruns_stages(source, monkeypatch):
+    run_stages("jp")
+    calls.clear()
+    code_digest = runner.cache.code_digest
+    # e.g. an edit of uniunihan_db.data.datasets, which this module uses
+    monkeypatch.setattr(
+        runner.cache, "code_digest", lambda name: code_digest(name) + "changed"
+    )
+    run_stages("jp")
+    assert calls == ["load", "add", "finish"]
+
+
+def test_untracked_stages_are_always_run(source, monkeypatch):
+    stages = list(runner.STAGES)
+    stages[1] = Stage("add", {"jp": add, "zh": add}, {}, untracked=("zh",))
+    monkeypatch.setattr(runner, "STAGES", stages)
+    run_stages("jp")
+    run_stages("zh")
+    calls.clear()
+    run_stages("jp")
+    assert calls == []
+    run_stages("zh")
+    assert calls == ["add", "finish"]
@@ -0,0 +1,209 @@
+# The original, straightforward implementations of functions which have since been
+# optimized, and generators of random input data. The tests check that the optimized
+# functions give the same results, and the benchmarks compare their speed.
+
+import copy
+import random
+import re
+from collections import defaultdict
+from typing import Collection, Dict, List
+
+import jaconv
+
+from uniunihan_db.component.group import ComponentGroup
+from uniunihan_db.lingua import japanese, mandarin
+from uniunihan_db.lingua.aligner import JpAligner
+
+
+def reference_jp_align(char_to_prons, surface, word_pron):
+    """The original recursive backtracking JpAligner, to check that the memoized
+    version finds the same alignments"""
+    surface = jaconv.hira2kata(surface)
+    word_pron = jaconv.hira2kata(word_pron)
+    if surface:
+        char = surface[0]
+        if JpAligner.KATAKANA_LOW <= ord(char) <= JpAligner.KATAKANA_HIGH:
+            prons = [char]
+            matching_kana = True
+        else:
+            prons = sorted(char_to_prons.get(char, []), reverse=True)
+            matching_kana = False
+        for pron in prons:
+            matched_pron = None
+            if word_pron.startswith(pron):
+                matched_pron = pron
+            elif (
+                word_pron.startswith(pron[:-1] + "ッ")
+                and pron[-1] not in JpAligner.NO_SOKUON_ALLOWED
+            ):
+                matched_pron = pron[:-1] + "ッ"
+            elif pron[0] in JpAligner.RENDAKU.keys() and word_pron.startswith(
+                JpAligner.RENDAKU[pron[0]] + pron[1:]
+            ):
+                matched_pron = JpAligner.RENDAKU[pron[0]] + pron[1:]
+            elif pron[0] in JpAligner.RENPANDAKU.keys() and word_pron.startswith(
+                JpAligner.RENPANDAKU[pron[0]] + pron[1:]
+            ):
+                matched_pron = JpAligner.RENPANDAKU[pron[0]] + pron[1:]
+            if matched_pron:
+                if len(word_pron) == len(matched_pron):
+                    if matching_kana:
+                        return set()
+                    return {(char, pron)}
+                if alignment := reference_jp_align(
+                    char_to_prons, surface[1:], word_pron.removeprefix(matched_pron)
+                ):
+                    if not matching_kana:
+                        alignment.add((char, pron))
+                    return alignment
+    return set()
+
+
+def reference_strip_tone(s):
+    """The original regex-based implementation of mandarin.strip_tone"""
+    tone = 0
+    for t, matcher in mandarin.TONE_MATCHERS.items():
+        if re.search(matcher, s):
+            tone = t
+    for no_tone, with_tone in mandarin.TONE_REMOVERS.items():
+        s = re.sub(with_tone, no_tone, s)
+    return s, tone
+
+
+def reference_tone_marks_to_numbers(s):
+    """The original implementation of mandarin.pinyin_tone_marks_to_numbers"""
+    new_words = []
+    for w in s.split():
+        w, tone = reference_strip_tone(w)
+        new_words.append(f"{w}{'' if tone == 0 else tone}")
+    return " ".join(new_words)
+
+
+def reference_numbers_to_tone_marks(s):
+    """The original implementation of mandarin.pinyin_numbers_to_tone_marks"""
+    return re.sub(
+        r"([aeiouüvÜ]{1,3})(n?g?r?)([012345])",
+        mandarin.__convertPinyinCallback,
+        s,
+        flags=re.IGNORECASE,
+    )
+
+
+def reference_alpha_to_kana(word: str) -> str:
+    """The original str.replace-based implementation of japanese.alpha_to_kana"""
+    word = word.lower().strip()
+    for table in [
+        japanese.HEPBURN_DIGRAPHS,
+        japanese.HEPBURN_50,
+        japanese.HEPBURN_GLIDE,
+        japanese.HEPBURN_SEMIVOWELS,
+        japanese.VOWELS,
+    ]:
+        for k, v in table.items():
+            word = word.replace(k, v)
+    for k, v in [("n", "ん"), ("m", "ん"), ("'", ""), ("-", "")]:
+        word = word.replace(k, v)
+    for c in "kstph":
+        word = word.replace(c, "っ")
+    return word
+
+
+def reference_kana_to_alpha(word: str) -> str:
+    """The original str.replace-based implementation of japanese.kana_to_alpha"""
+    for table in [
+        japanese.NIHONSIKI_TRIGRAPH,
+        japanese.NIHONSIKI_COMPOUND,
+        japanese.VOWELS,
+    ]:
+        for k, v in table.items():
+            word = word.replace(v, k)
+    word = re.sub("ん(?=[aiueoy])", "n'", word)
+    word = word.replace("ん", "n")
+    for c in "kstph":
+        word = word.replace("っ" + c, c + c)
+    return word
+
+
+def random_words(units: Collection[str], count: int, seed: int = 0):
+    rng = random.Random(seed)
+    units = sorted(units)
+    return [
+        "".join(rng.choices(units, k=length))
+        for length in rng.choices(range(1, 6), k=count)
+    ]
+
+
+def reference_ordered_clusters(group: ComponentGroup) -> List[List[str]]:
+    """The original implementation of ComponentGroup.get_ordered_clusters"""
+    pron_to_chars = copy.deepcopy(group.pron_to_chars)
+    presentation = []
+    while pron_to_chars:
+        pron, added_chars = min(
+            pron_to_chars.items(), key=lambda item: (-len(item[1]), item[0])
+        )
+        presentation.append(added_chars)
+        del pron_to_chars[pron]
+        to_delete = []
+        for pron, chars in pron_to_chars.items():
+            for c in added_chars:
+                try:
+                    chars.remove(c)
+                except ValueError:
+                    pass
+            if not chars:
+                to_delete.append(pron)
+        for pron in to_delete:
+            del pron_to_chars[pron]
+    return presentation
+
+
+def random_group_prons(
+    rng: random.Random, num_chars: int, num_prons: int, max_prons: int = 4
+) -> Dict[str, List[str]]:
+    """Random group data with skewed pronunciation counts, so that there are both
+    large clusters and many ties"""
+    prons = [f"p{i:03}" for i in range(num_prons)]
+    weights = [1 / (i + 1) for i in range(num_prons)]
+    return {
+        chr(0x4E00 + i): sorted(
+            set(rng.choices(prons, weights, k=rng.randint(1, max_prons)))
+        )
+        for i in range(num_chars)
+    }
+
+
+def reference_find_component_groups(char_to_prons, comp_to_char):
+    """The original implementation of find_component_groups, returning (component,
+    char_to_prons) of each group, unique readings, missing pron chars and no
+    component chars"""
+    groups = []
+    assigned = set()
+    for component, chars in comp_to_char.items():
+        chars = set(chars).intersection(char_to_prons.keys())
+        if not chars:
+            continue
+        groups.append((component, {c: char_to_prons[c] for c in chars}))
+        assigned.update(chars)
+    no_group = set(char_to_prons.keys()) - assigned
+    missing_pron = {c for c, prons in char_to_prons.items() if not prons} - no_group
+    pron_to_chars = defaultdict(set)
+    for char, prons in char_to_prons.items():
+        for pron in prons:
+            pron_to_chars[pron].add(char)
+    unique = {p: next(iter(cs)) for p, cs in pron_to_chars.items() if len(cs) == 1}
+    return groups, unique, missing_pron, no_group
+
+
+def random_component_table(rng, num_chars, num_components):
+    chars = [chr(0x4E00 + i) for i in range(num_chars)]
+    comp_to_char = defaultdict(list)
+    for c in chars:
+        comp_to_char[rng.choice(chars[:num_components])].append(c)
+    return dict(comp_to_char)
+
+
+def random_char_to_prons(rng, chars, num_prons):
+    return {
+        c: sorted({f"p{rng.randrange(num_prons)}" for _ in range(rng.randint(1, 3))})
+        for c in chars
+    }
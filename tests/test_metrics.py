@@ -0,0 +1,190 @@
+import json
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+
+import pytest
+
+from uniunihan_db import metrics
+
+
+@pytest.fixture(autouse=True)
+def stop_recording():
+    yield
+    metrics.stop_recording()
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", tmp_path)
+    return tmp_path
+
+
+def test_steps_are_only_recorded_while_recording():
+    with metrics.measure("ignored", "stage"):
+        pass
+    assert metrics.take_steps() == []
+
+    metrics.start_recording()
+    with metrics.measure("outer", "stage", items_in=3) as step:
+        with metrics.measure("inner", "dataset"):
+            sum(range(10000))
+        step.items_out = 2
+    with pytest.raises(ValueError):
+        with metrics.measure("failed", "stage"):
+            raise ValueError()
+    steps = metrics.take_steps()
+    assert [(s.name, s.kind) for s in steps] == [
+        ("inner", "dataset"),
+        ("outer", "stage"),
+    ]
+    inner, outer = steps
+    assert (outer.items_in, outer.items_out) == (3, 2)
+    assert 0 <= inner.wall <= outer.wall
+    assert outer.peak_rss is None or outer.peak_rss > 0
+    assert outer.peak_traced is None
+
+
+@pytest.mark.skipif(metrics.resource is None, reason="needs the resource module")
+def test_cpu_of_child_processes_is_recorded_separately():
+    metrics.start_recording()
+    with metrics.measure("child", "stage") as step:
+        subprocess.run([sys.executable, "-c", "sum(range(10**7))"], check=True)
+    assert step.child_cpu > 0.05
+    assert step.cpu < step.child_cpu
+
+
+def test_traced_peaks_of_nested_steps():
+    metrics.start_recording()
+    tracemalloc.start()
+    try:
+        with metrics.measure("outer", "stage"):
+            with metrics.measure("inner", "dataset"):
+                data = bytearray(4 << 20)
+                del data
+            with metrics.measure("small", "dataset"):
+                pass
+        inner, small, outer = metrics.take_steps()
+    finally:
+        tracemalloc.stop()
+    assert inner.peak_traced >= 4 << 20
+    assert small.peak_traced < 1 << 20
+    # the outer step's peak includes those of the steps it contains
+    assert outer.peak_traced >= inner.peak_traced
+
+
+def test_measured_counts_the_result():
+    @metrics.measured("dataset")
+    def get_words():
+        return ["a", "b", "c"]
+
+    metrics.start_recording()
+    assert get_words() == ["a", "b", "c"]
+    (step,) = metrics.take_steps()
+    assert (step.name, step.kind, step.items_out) == ("get_words", "dataset", 3)
+
+
+def test_recording_writes_the_run(metrics_dir):
+    with metrics.recording("runner"):
+        with metrics.measure("load.jp", "stage"):
+            pass
+    assert not metrics.is_recording()
+
+    path = metrics.latest_run("runner")
+    assert path is not None and path.parent == metrics_dir
+    run = json.loads(path.read_text())
+    assert run["command"] == "runner"
+    assert [(s["name"], s["kind"]) for s in run["steps"]] == [
+        ("load.jp", "stage"),
+        ("runner", "run"),
+    ]
+
+
+def test_runs_started_in_the_same_second_are_kept(metrics_dir):
+    started = datetime(2024, 1, 1)
+    first = metrics.write_run("runner", [], started)
+    second = metrics.write_run("runner", [], started.replace(microsecond=1))
+    assert first != second
+    assert len(list(metrics_dir.glob("*-runner.json"))) == 2
+
+
+def step(name, wall, peak_rss=None, kind="run"):
+    return {
+        "name": name,
+        "kind": kind,
+        "wall": wall,
+        "cpu": wall,
+        "peak_rss": peak_rss,
+    }
+
+
+def test_find_regressions():
+    baseline = [step("a", 1.0), step("b", 1.0, 100 << 20), step("c", 0.01)]
+    latest = [
+        step("a", 1.05),
+        step("b", 1.0, 120 << 20),
+        # too small to matter
+        step("c", 0.03),
+        step("new", 5.0),
+    ]
+    regressions = metrics.find_regressions(baseline, latest, threshold=0.1)
+    assert [(r.step, r.metric) for r in regressions] == [("b", "peak_rss")]
+    assert regressions[0].change == pytest.approx(0.2)
+
+    regressions = metrics.find_regressions(baseline, latest, threshold=0.01)
+    assert {(r.step, r.metric) for r in regressions} == {
+        ("a", "wall"),
+        ("a", "cpu"),
+        ("b", "peak_rss"),
+    }
+
+
+def test_steps_with_the_same_name_are_combined():
+    summary = metrics.summarize([step("a", 1.0, 10), step("a", 2.0, 5)])
+    assert summary == {"a": {"wall": 3.0, "cpu": 3.0, "peak_rss": 10}}
+
+
+def test_peak_rss_is_only_compared_for_runs():
+    # the process-wide peak of a step includes the memory of the steps before it
+    baseline = [step("a", 1.0, 100 << 20, "stage"), step("b", 1.0, 100 << 20, "stage")]
+    latest = [step("a", 1.0, 200 << 20, "stage"), step("b", 1.0, 200 << 20, "stage")]
+    assert metrics.find_regressions(baseline, latest, threshold=0.1) == []
+    assert metrics.summarize(latest) == {
+        "a": {"wall": 1.0, "cpu": 1.0},
+        "b": {"wall": 1.0, "cpu": 1.0},
+    }
+
+
+def write_run(metrics_dir, name, steps, argv=("--language", "jp")):
+    path = metrics_dir / f"{name}-runner.json"
+    run = {"command": "runner", "argv": list(argv), "steps": steps}
+    path.write_text(json.dumps(run))
+    return path
+
+
+def test_report(metrics_dir, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["metrics"])
+    assert metrics.main() == 1
+    write_run(metrics_dir, "20240101-000000", [step("load.jp", 1.0)])
+    assert metrics.main() == 1
+
+    monkeypatch.setattr(sys, "argv", ["metrics", "--save-baseline"])
+    assert metrics.main() == 0
+    assert metrics.baseline_path("runner", ["--language", "jp"]).exists()
+
+    monkeypatch.setattr(sys, "argv", ["metrics"])
+    write_run(metrics_dir, "20240102-000000", [step("load.jp", 1.01)])
+    assert metrics.main() == 0
+    write_run(metrics_dir, "20240103-000000", [step("load.jp", 2.0)])
+    assert metrics.main() == 1
+    assert "load.jp" in capsys.readouterr().out
+
+    # runs with other arguments are not compared with that baseline
+    write_run(metrics_dir, "20240104-000000", [step("load.jp", 2.0)], ["-l", "zh"])
+    assert metrics.main() == 1
+    assert "No baseline for runner -l zh" in capsys.readouterr().err
+    baseline = metrics.baseline_path("runner", ["--language", "jp"])
+    monkeypatch.setattr(sys, "argv", ["metrics", "--baseline", str(baseline)])
+    assert metrics.main() == 1
+    assert "other arguments" in capsys.readouterr().err
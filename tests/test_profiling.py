@@ -0,0 +1,117 @@
+import cProfile
+import os
+import pstats
+import tracemalloc
+
+import pytest
+
+from uniunihan_db import metrics, profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    yield tmp_path
+    profiling.disable()
+
+
+def leaf(n):
+    return sum(i * i for i in range(n))
+
+
+def middle():
+    return leaf(20000)
+
+
+def top():
+    return middle() + leaf(40000)
+
+
+def test_collapsed_stacks():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    top()
+    profiler.disable()
+    stacks = profiling.collapsed_stacks(pstats.Stats(profiler))
+
+    def time_under(*names):
+        return sum(
+            t
+            for stack, t in stacks.items()
+            if [frame.split(" ")[0] for frame in stack.split(";")][: len(names)]
+            == list(names)
+        )
+
+    assert time_under("top", "middle", "leaf") > 0
+    # leaf is called twice as much directly from top than through middle
+    assert time_under("top", "leaf") > time_under("top", "middle", "leaf")
+    top_time = next(
+        v[3]
+        for f, v in pstats.Stats(profiler).stats.items()  # type: ignore
+        if f[2] == "top"
+    )
+    assert time_under("top") == pytest.approx(top_time, rel=0.01)
+
+
+def test_profiling_is_off_by_default(profile_dir):
+    with metrics.measure("select_vocab.jp", "stage"):
+        top()
+    assert not list(profile_dir.iterdir())
+
+
+def test_cpu_profile_per_stage(profile_dir):
+    profiling.enable("cpu")
+    with metrics.measure("select_vocab.jp", "stage"):
+        # datasets loaded by a stage are part of its profile
+        with metrics.measure("get_cedict", "dataset"):
+            top()
+    with metrics.measure("get_joyo", "dataset"):
+        top()
+    assert sorted(p.name for p in profile_dir.iterdir()) == [
+        "profile-select_vocab.jp.collapsed",
+        "profile-select_vocab.jp.pstats",
+    ]
+    stats = pstats.Stats(str(profile_dir / "profile-select_vocab.jp.pstats"))
+    assert any(f[2] == "middle" for f in stats.stats)  # type: ignore
+    lines = (profile_dir / "profile-select_vocab.jp.collapsed").read_text()
+    stack, count = lines.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_memory_profile(profile_dir):
+    profiling.enable("mem")
+    metrics.start_recording()
+    try:
+        with metrics.measure("render.zh-8", "render"):
+            kept = [bytearray(1 << 20) for _ in range(2)]
+        (step,) = metrics.take_steps()
+    finally:
+        metrics.stop_recording()
+    assert not tracemalloc.is_tracing()
+    # memory profiling also records the step's tracemalloc peak
+    assert step.peak_traced >= 2 << 20
+
+    snapshot = tracemalloc.Snapshot.load(
+        str(profile_dir / "profile-render.zh-8.tracemalloc")
+    )
+    assert sum(s.size for s in snapshot.statistics("filename")) >= 2 << 20
+    collapsed = (profile_dir / "profile-render.zh-8.mem.collapsed").read_text()
+    assert "test_profiling.py" in collapsed
+    del kept
+
+
+def test_enable():
+    profiling.enable("mem")
+    try:
+        assert profiling.mode() == "mem"
+        # inherited by worker processes
+        assert os.environ[profiling.PROFILE_ENV_VAR] == "mem"
+        assert profiling.is_profiled("stage")
+        assert not profiling.is_profiled("dataset")
+    finally:
+        profiling.disable()
+    assert profiling.mode() is None
+    with pytest.raises(ValueError):
+        profiling.enable("gpu")
+    profiling.enable(None)
+    assert profiling.mode() is None
@@ -2,6 +2,7 @@
 # then language ("part"), then purity group. One page is written to introduce
 # each part, and one page is written for each purity group in each language.
 
+import argparse
 import json
 from datetime import datetime
 from pathlib import Path
@@ -12,6 +13,7 @@ import jinja2
 from jinja2 import Environment, FileSystemLoader, StrictUndefined
 from loguru import logger as log
 
+from uniunihan_db import metrics, profiling
 from uniunihan_db.collate import collate
 from uniunihan_db.component.group import PurityType
 from uniunihan_db.data.paths import GENERATED_DATA_DIR
@@ -22,6 +24,7 @@ TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
 INPUT_FILE = GENERATED_DATA_DIR / "collated" / "final.json"
 OUTPUT_DIR = GENERATED_DATA_DIR / "book"
 OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
+BOOK_TITLE = "Dictionary of Chinese Characters for Sinoxenic Language Learners"
 LANG_TO_HAN = {"jp": "日", "zh": "中", "ko": "韓", "vi": "越"}
 LANG_ENGLISH = {"jp": "Japanese", "zh": "Mandarin", "ko": "Korean", "vi": "Vietnamese"}
 
@@ -121,43 +124,55 @@ def generate_toc(all_data):
     return toc, "\n".join(toc_html)
 
 
+# render steps are measured with the number of TOC entries or groups as their
+# input items and the length of the HTML as their output items
+
+
 def render_front_matter(jinja_env, toc, toc_html):
-    front_matter_template = jinja_env.get_template("front_matter.html.jinja")
-    result = front_matter_template.render(
-        book_title="Dictionary of Chinese Characters for Sinoxenic Language Learners",
-        intro="TODO: intro text",
-        toc=toc_html,
-        prev=None,
-        next=toc[1],
-    )
-    with open(OUTPUT_DIR / "index.html", "w") as f:
-        f.write(f"<!-- Generated from build_book.py, {datetime.now()} -->")
-        f.write(result)
+    with metrics.measure("render.front_matter", "render", len(toc)) as step:
+        front_matter_template = jinja_env.get_template("front_matter.html.jinja")
+        result = front_matter_template.render(
+            book_title=BOOK_TITLE,
+            intro="TODO: intro text",
+            toc=toc_html,
+            prev=None,
+            next=toc[1],
+        )
+        with open(OUTPUT_DIR / "index.html", "w") as f:
+            f.write(f"<!-- Generated from build_book.py, {datetime.now()} -->")
+            f.write(result)
+        step.items_out = len(result)
 
 
 def render_part_intro(jinja_env, lang, part_num, prev, next):
-    part_intro_template = jinja_env.get_template("part_intro.html.jinja")
-    result = part_intro_template.render(
-        lang=lang, part_num=part_num, intro=intros[lang], prev=prev, next=next
-    )
-    with open(OUTPUT_DIR / lang_intro_page_name(lang), "w") as f:
-        f.write(f"<!-- Generated from build_book.py, {datetime.now()} -->")
-        f.write(result)
+    with metrics.measure(f"render.{lang}-intro", "render") as step:
+        part_intro_template = jinja_env.get_template("part_intro.html.jinja")
+        result = part_intro_template.render(
+            lang=lang, part_num=part_num, intro=intros[lang], prev=prev, next=next
+        )
+        with open(OUTPUT_DIR / lang_intro_page_name(lang), "w") as f:
+            f.write(f"<!-- Generated from build_book.py, {datetime.now()} -->")
+            f.write(result)
+        step.items_out = len(result)
 
 
 def render_purity_group(jinja_env, lang, purity_type, pg, prev, next):
-    purity_group_template = jinja_env.get_template("purity_group.html.jinja")
-    result = purity_group_template.render(
-        purity_type=purity_type,
-        pg=pg,
-        lang=lang,
-        intro=intros[lang],
-        prev=prev,
-        next=next,
-    )
-    with open(OUTPUT_DIR / f"{lang}-{purity_type}.html", "w") as f:
-        f.write(f"<!-- Generated from build_book.py, {datetime.now()} -->")
-        f.write(result)
+    with metrics.measure(
+        f"render.{lang}-{purity_type}", "render", len(pg["groups"])
+    ) as step:
+        purity_group_template = jinja_env.get_template("purity_group.html.jinja")
+        result = purity_group_template.render(
+            purity_type=purity_type,
+            pg=pg,
+            lang=lang,
+            intro=intros[lang],
+            prev=prev,
+            next=next,
+        )
+        with open(OUTPUT_DIR / f"{lang}-{purity_type}.html", "w") as f:
+            f.write(f"<!-- Generated from build_book.py, {datetime.now()} -->")
+            f.write(result)
+        step.items_out = len(result)
 
 
 intros = {
@@ -171,7 +186,9 @@ intros = {
 def build_book():
     if INPUT_FILE.exists():
         log.info(f"Loading collated data from {INPUT_FILE}...")
-        all_data = json.load(INPUT_FILE.open())
+        with metrics.measure("build_book.load", "dataset") as step:
+            all_data = json.load(INPUT_FILE.open())
+            step.items_out = len(all_data)
     else:
         log.info("Re-generating collated data...")
         all_data = collate()
@@ -214,7 +231,12 @@ def build_book():
 
 def main():
     configure_logging(__name__)
-    build_book()
+    parser = argparse.ArgumentParser()
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    profiling.enable(args.profile)
+    with metrics.recording("build_book"):
+        build_book()
 
 
 if __name__ == "__main__":
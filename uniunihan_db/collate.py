@@ -1,11 +1,15 @@
 # create cross-reference links between character data of different languages
 
+import argparse
+
 from loguru import logger as log
 
+from uniunihan_db import metrics, profiling
+from uniunihan_db.data.download import download_all
 from uniunihan_db.data.paths import GENERATED_DATA_DIR
 from uniunihan_db.util import configure_logging, format_json
 
-from .pipeline.runner import LANGUAGES, run_pipeline
+from .pipeline.runner import LANGUAGES, run_pipelines
 
 OUTPUT_DIR = GENERATED_DATA_DIR / "collated"
 OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
@@ -76,15 +80,26 @@ __get_variants = {
 }
 
 
-def collate():
-    all_data = {lang: run_pipeline(lang) for lang in LANGUAGES}
-    all_char_indices = {
-        lang: __get_char_index(all_data[lang], __get_variants[lang])
-        for lang in LANGUAGES
-    }
-    __cross_reference(all_char_indices)
-    with open(OUTPUT_DIR / "final.json", "w") as f:
-        f.write(format_json(all_data))
+def collate(jobs: int = 1):
+    """Run the pipelines of all languages, in up to jobs processes, and link their
+    characters with each other"""
+    # fetch everything up front so that the downloads can run concurrently
+    with metrics.measure("collate.download", "collate"):
+        download_all()
+    all_data = run_pipelines(LANGUAGES, jobs)
+    with metrics.measure("collate.index_chars", "collate") as step:
+        all_char_indices = {
+            lang: __get_char_index(all_data[lang], __get_variants[lang])
+            for lang in LANGUAGES
+        }
+        step.items_out = sum(map(len, all_char_indices.values()))
+    with metrics.measure("collate.cross_reference", "collate", step.items_out):
+        __cross_reference(all_char_indices)
+    with metrics.measure("collate.write", "collate") as step:
+        output = format_json(all_data)
+        with open(OUTPUT_DIR / "final.json", "w") as f:
+            f.write(output)
+        step.items_out = len(output)
 
     return all_data
 
@@ -114,7 +129,20 @@ def __cross_reference(all_indices):
 
 def main():
     configure_logging(__name__)
-    collate()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes; languages are run in parallel, and processes "
+        "left over align vocabulary",
+    )
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    profiling.enable(args.profile)
+    with metrics.recording("collate"):
+        collate(args.jobs)
 
 
 if __name__ == "__main__":
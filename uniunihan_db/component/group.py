@@ -1,7 +1,7 @@
-import copy
+import heapq
 from collections import defaultdict
 from enum import IntEnum
-from typing import Any, Collection, MutableMapping, Sequence, Tuple
+from typing import Any, MutableMapping, Sequence
 
 from uniunihan_db.data.datasets import StringToStrings
 
@@ -150,30 +150,36 @@ class ComponentGroup:
         share. This ordering is meant to allow the learner to memorize pronunciations
         as rules with exceptions."""
 
-        # sort by number of characters descending and then
-        # orthographically by pronunciation
-        def sorter(item: Tuple[str, Collection[str]]) -> Tuple[int, str]:
-            return (-len(item[1]), item[0])
-
-        pron_to_chars = copy.deepcopy(self.pron_to_chars)
+        # Clusters are taken greedily: the pronunciation with the most characters
+        # which are not in a cluster yet (ties broken by the pronunciation) forms the
+        # next cluster. The sets of characters are stored as bitsets (bit i = i-th
+        # char in sorted order), and the candidates in a heap keyed by
+        # (-remaining characters, pron). The number of remaining characters only
+        # ever decreases, so outdated heap entries are simply re-pushed when popped.
+        chars = sorted(self.chars)
+        char_bits = {c: 1 << i for i, c in enumerate(chars)}
+        pron_to_bits = {
+            pron: sum(char_bits[c] for c in pron_chars)
+            for pron, pron_chars in self.pron_to_chars.items()
+        }
+        heap = [(-_count_bits(bits), pron) for pron, bits in pron_to_bits.items()]
+        heapq.heapify(heap)
+
+        remaining = (1 << len(chars)) - 1
         presentation = []
-        while pron_to_chars:
-            # get next group of chars
-            pron, added_chars = min(pron_to_chars.items(), key=sorter)
-            presentation.append(added_chars)
-
-            # delete them from the multimap
-            del pron_to_chars[pron]
-            to_delete = []
-            for pron, chars in pron_to_chars.items():
-                for c in added_chars:
-                    try:
-                        chars.remove(c)
-                    except ValueError:
-                        pass
-                if not chars:
-                    to_delete.append(pron)
-            for pron in to_delete:
-                del pron_to_chars[pron]
+        while heap:
+            neg_count, pron = heapq.heappop(heap)
+            bits = pron_to_bits[pron] & remaining
+            count = _count_bits(bits)
+            if count != -neg_count:
+                if count:
+                    heapq.heappush(heap, (-count, pron))
+                continue
+            presentation.append([c for i, c in enumerate(chars) if bits >> i & 1])
+            remaining &= ~bits
 
         return presentation
+
+
+def _count_bits(bits: int) -> int:
+    return bin(bits).count("1")
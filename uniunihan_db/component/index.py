@@ -1,32 +1,218 @@
 from collections import defaultdict
-from dataclasses import dataclass
-from typing import Collection, Mapping, MutableMapping, MutableSequence, Set
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import (
+    Collection,
+    Dict,
+    List,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from uniunihan_db.component.group import ComponentGroup, PurityType
 from uniunihan_db.data.datasets import StringToStrings
 from uniunihan_db.util import format_json
 
+# names of the cached_property indexes, which have to be rebuilt when groups change
+_GROUP_INDEXES = ("char_to_group", "component_to_group", "purity_to_groups")
+
+
+@dataclass
+class GroupChanges:
+    """What was changed by editing a ComponentGroupIndex, so that the output of the
+    later pipeline stages can be updated without running them again. Groups are
+    identified by their component; a component which no longer has a group in the
+    index was removed."""
+
+    components: Set[str] = field(default_factory=set)
+    chars: Set[str] = field(default_factory=set)
+
+    def update(self, other: "GroupChanges") -> "GroupChanges":
+        """Add the changes in other to these"""
+        self.components |= other.components
+        self.chars |= other.chars
+        return self
+
 
 @dataclass(frozen=True)
 class ComponentGroupIndex:
+    # add groups with add_group, so that the secondary indexes stay up to date
     groups: MutableSequence[ComponentGroup]
     # char -> pronunciaions
-    char_to_prons: StringToStrings
+    char_to_prons: MutableMapping[str, Collection[str]]
     # unique pronunciations and their corresponding character
-    unique_pron_to_char: Mapping[str, str]
+    unique_pron_to_char: Dict[str, str]
     # characters assigned to a component group but missing a pronunciation
-    missing_pron_chars: Collection[str]
+    missing_pron_chars: Set[str]
     # characters with no pronunciation components
     no_comp_chars: Set[str]
 
-    def log_diagnostics(self, logger):
-        """Write a diagnostic summary to the logs"""
+    # Secondary indexes, built on first use. cached_property stores its value
+    # directly in the instance dict, so it works with frozen dataclasses.
+
+    @cached_property
+    def char_to_group(self) -> Mapping[str, ComponentGroup]:
+        """char -> the group containing it (the first one, if there are several)"""
+        char_to_group: Dict[str, ComponentGroup] = {}
+        for g in self.groups:
+            for c in g.chars:
+                char_to_group.setdefault(c, g)
+        return char_to_group
 
-        purity_to_chars = defaultdict(set)
-        purity_to_groups: MutableMapping[PurityType, int] = defaultdict(int)
+    @cached_property
+    def component_to_group(self) -> Mapping[str, ComponentGroup]:
+        """component -> its group"""
+        return {g.component: g for g in self.groups}
+
+    @cached_property
+    def purity_to_groups(self) -> Mapping[PurityType, Sequence[ComponentGroup]]:
+        """purity type -> groups of that type, in index order; every purity type is
+        present"""
+        purity_to_groups: Dict[PurityType, List[ComponentGroup]] = {
+            p: [] for p in PurityType
+        }
         for g in self.groups:
-            purity_to_chars[g.purity_type].update(g.chars)
-            purity_to_groups[g.purity_type] += 1
+            purity_to_groups[g.purity_type].append(g)
+        return purity_to_groups
+
+    @cached_property
+    def pron_to_chars(self) -> Dict[str, List[str]]:
+        """pronunciation -> characters with that pronunciation"""
+        pron_to_chars: Dict[str, List[str]] = defaultdict(list)
+        for c, prons in self.char_to_prons.items():
+            for pron in prons:
+                pron_to_chars[pron].append(c)
+        return dict(pron_to_chars)
+
+    def add_group(self, group: ComponentGroup) -> None:
+        """Add a group for a component which does not have one yet, discarding the
+        secondary indexes built so far"""
+        if any(g.component == group.component for g in self.groups):
+            raise ValueError(f"There is already a group for {group.component}")
+        self.groups.append(group)
+        self._discard_group_indexes()
+
+    def _discard_group_indexes(self) -> None:
+        for name in _GROUP_INDEXES:
+            self.__dict__.pop(name, None)
+
+    # Editing operations. They rebuild only the groups containing the edited
+    # character, and return the changes for the later pipeline stages. New groups
+    # are added after the existing ones. These are library API for editing a
+    # pipeline's output in place (apply the changes with group_chars.update_char_data,
+    # oc_mc.update_historical_chinese and organize.update_organized_data, then run
+    # assign_ids again); the runner itself reruns the stages from group_chars on when
+    # their inputs change.
+
+    def add_char(
+        self, char: str, prons: Collection[str], component: Optional[str] = None
+    ) -> GroupChanges:
+        """Add a character to the group of component, which is created if it does not
+        exist yet, or to the characters without a component if component is None"""
+        if char in self.char_to_prons:
+            raise ValueError(f"{char} is already in the index")
+        return self._edit(char, list(prons), [] if component is None else [component])
+
+    def remove_char(self, char: str) -> GroupChanges:
+        """Remove a character from the index; groups left empty are removed"""
+        if char not in self.char_to_prons:
+            raise KeyError(char)
+        return self._edit(char, None, self._components_of(char))
+
+    def set_prons(self, char: str, prons: Collection[str]) -> GroupChanges:
+        """Replace the pronunciations of a character"""
+        if char not in self.char_to_prons:
+            raise KeyError(char)
+        return self._edit(char, list(prons), self._components_of(char))
+
+    def _components_of(self, char: str) -> List[str]:
+        return [g.component for g in self.groups if char in g.chars]
+
+    def _edit(
+        self, char: str, prons: Optional[List[str]], components: Collection[str]
+    ) -> GroupChanges:
+        """Set the pronunciations of char, or remove it if prons is None, and rebuild
+        the groups of the given components with it"""
+        # build from the unedited state, so that it can be updated below
+        pron_to_chars = self.pron_to_chars
+        old_prons = self.char_to_prons.get(char, ())
+
+        # create the new groups first, so that nothing changes if one is invalid
+        positions = {
+            g.component: i
+            for i, g in enumerate(self.groups)
+            if g.component in components
+        }
+        new_groups: Dict[str, Optional[ComponentGroup]] = {}
+        for component in components:
+            members: Dict[str, Collection[str]] = {}
+            if (i := positions.get(component)) is not None:
+                # groups added with add_group can have characters which are not in
+                # char_to_prons
+                members = {
+                    c: self.char_to_prons.get(c, ()) for c in self.groups[i].chars
+                }
+            # keep the order of char_to_prons, as find_component_groups does: an
+            # edited character keeps its place and a new one comes last
+            if prons is None:
+                members.pop(char, None)
+            else:
+                members[char] = prons
+            if members:
+                group = ComponentGroup(component, members)
+                if i is not None:
+                    group.sup_info = self.groups[i].sup_info
+                new_groups[component] = group
+            else:
+                new_groups[component] = None
+
+        if prons is None:
+            del self.char_to_prons[char]
+        else:
+            self.char_to_prons[char] = prons
+        for component, group in new_groups.items():
+            if group is None:
+                continue
+            if (i := positions.get(component)) is not None:
+                self.groups[i] = group
+            else:
+                self.groups.append(group)
+        for i in sorted(
+            (positions[c] for c, g in new_groups.items() if g is None), reverse=True
+        ):
+            del self.groups[i]
+
+        self.no_comp_chars.discard(char)
+        self.missing_pron_chars.discard(char)
+        if prons is not None:
+            if not components:
+                self.no_comp_chars.add(char)
+            elif not prons:
+                self.missing_pron_chars.add(char)
+
+        for pron in set(old_prons):
+            if chars := [c for c in pron_to_chars[pron] if c != char]:
+                pron_to_chars[pron] = chars
+            else:
+                del pron_to_chars[pron]
+        for pron in prons or ():
+            pron_to_chars.setdefault(pron, []).append(char)
+        for pron in set(old_prons).union(prons or ()):
+            if len(chars := set(pron_to_chars.get(pron, ()))) == 1:
+                self.unique_pron_to_char[pron] = next(iter(chars))
+            else:
+                self.unique_pron_to_char.pop(pron, None)
+
+        self._discard_group_indexes()
+        return GroupChanges(set(components), {char})
+
+    def log_diagnostics(self, logger):
+        """Write a diagnostic summary to the logs"""
 
         if self.no_comp_chars:
             logger.warning(
@@ -45,15 +231,32 @@ class ComponentGroupIndex:
         logger.debug(format_json(self.unique_pron_to_char))
 
         logger.info(f"{len(self.groups)} total groups:")
-        for purity_type in PurityType:
+        for purity_type, groups in self.purity_to_groups.items():
+            num_chars = len(set().union(*(g.chars for g in groups)))
             logger.info(
-                f"    {purity_to_groups[purity_type]} {purity_type.name} "
-                f"groups ({len(purity_to_chars[purity_type])} characters)"
+                f"    {len(groups)} {purity_type.name} "
+                f"groups ({num_chars} characters)"
             )
 
 
+# char -> [(position of the component in the component table, component)]
+CharToComponents = Mapping[str, Sequence[Tuple[int, str]]]
+
+
+def index_components(comp_to_char: StringToStrings) -> CharToComponents:
+    """Reverse a component table (component -> chars which use it phonetically) so
+    that the components of a character can be looked up directly"""
+    char_to_comps: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+    for i, (component, chars) in enumerate(comp_to_char.items()):
+        for c in chars:
+            char_to_comps[c].append((i, component))
+    return dict(char_to_comps)
+
+
 def find_component_groups(
-    char_to_prons: StringToStrings, comp_to_char: StringToStrings
+    char_to_prons: StringToStrings,
+    comp_to_char: StringToStrings,
+    char_to_comps: Optional[CharToComponents] = None,
 ) -> ComponentGroupIndex:
     """Group characters by component and classify the groups by their pronunciation
     regularity.
@@ -61,50 +264,47 @@ def find_component_groups(
         character
     comp_to_char: mapping from phonetic phonetic components to the characters which use
         the compooent phonetically
+    char_to_comps: index_components(comp_to_char), if it has already been computed;
+        the component table is much larger than the characters of one language, so
+        callers grouping several languages should compute it once
     """
-    # loop through the provided dictionaries and create ComponentGroup objects
-    groups = []
-    chars_assigned_to_a_group = set()
-    for component, chars in comp_to_char.items():
-        # comp_to_char likely contains way more characters than we need
-        chars = set(chars).intersection(char_to_prons.keys())
-        if not chars:
-            continue
-        c2p = {c: char_to_prons[c] for c in chars}
-        group = ComponentGroup(
-            component,
-            c2p,
-        )
-        groups.append(group)
-        chars_assigned_to_a_group.update(chars)
+    if char_to_comps is None:
+        char_to_comps = index_components(comp_to_char)
 
-    # index characters that do not fit into groups
-
-    # find characters with no assigned group
-    all_chars = set(char_to_prons.keys())
-    chars_with_no_group = all_chars - chars_assigned_to_a_group
-
-    # Find characters assigned to a group but without listed pronunciations
+    # (component position, component) -> {char -> prons}
+    group_members: Dict[Tuple[int, str], Dict[str, Collection[str]]] = defaultdict(dict)
+    # characters that do not fit into groups
+    chars_with_no_group = set()
+    # characters assigned to a group but without listed pronunciations
     missing_pron_chars = set()
+    # pron -> first character with that pron; prons of several characters are shared
+    pron_to_char: Dict[str, str] = {}
+    shared_prons = set()
     for char, prons in char_to_prons.items():
-        if not prons:
-            missing_pron_chars.add(char)
-    missing_pron_chars -= chars_with_no_group
+        if components := char_to_comps.get(char):
+            for component in components:
+                group_members[component][char] = prons
+            if not prons:
+                missing_pron_chars.add(char)
+        else:
+            chars_with_no_group.add(char)
 
-    # get unique character readings
-    pron_to_chars = defaultdict(set)
-    for char, prons in char_to_prons.items():
         for pron in prons:
-            pron_to_chars[pron].add(char)
+            if pron_to_char.setdefault(pron, char) != char:
+                shared_prons.add(pron)
+
+    # groups in the order of the component table
+    groups = [
+        ComponentGroup(component, members)
+        for (_, component), members in sorted(group_members.items())
+    ]
     unique_readings = {
-        pron: next(iter(chars))
-        for pron, chars in pron_to_chars.items()
-        if len(chars) == 1
+        pron: char for pron, char in pron_to_char.items() if pron not in shared_prons
     }
 
     return ComponentGroupIndex(
         groups,
-        char_to_prons,
+        dict(char_to_prons),
         unique_readings,
         missing_pron_chars,
         chars_with_no_group,
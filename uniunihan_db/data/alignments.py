@@ -0,0 +1,220 @@
+# Persistent store of dictionary word alignments. Aligning a whole dictionary is
+# the slowest part of indexing its vocabulary, but the alignment of a word only
+# depends on the aligner's code and on the aligner's configuration for the
+# characters in the word (see Aligner.char_config). Alignments are therefore stored
+# per dictionary and aligner class together with the configuration of each
+# character; when the configuration changes (e.g. one Joyo reading is added), only
+# the words containing the affected characters are aligned again. Words can be
+# aligned in several processes (see set_workers).
+
+import hashlib
+import pickle
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, chain
+from operator import sub
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from uniunihan_db.data import cache
+from uniunihan_db.data.types import WordTable
+from uniunihan_db.lingua.aligner import Aligner
+from uniunihan_db.metrics import measured
+
+# bump this when the stored format changes
+STORE_VERSION = 1
+
+Alignment = Tuple[Tuple[str, str], ...]
+
+# number of words sent to a worker process at a time
+ALIGN_CHUNK_SIZE = 5000
+# number of processes used by align_many by default
+__workers = 1
+# aligner used by the current worker process
+__worker_aligner: Optional[Aligner] = None
+
+
+def set_workers(workers: int) -> None:
+    """Align words in up to workers processes from now on"""
+    global __workers
+    __workers = max(1, workers)
+
+
+def __init_align_worker(aligner: Aligner) -> None:
+    global __worker_aligner
+    __worker_aligner = aligner
+
+
+def __align_chunk(pairs: List[Tuple[str, str]]) -> List[Alignment]:
+    assert __worker_aligner is not None
+    return __worker_aligner.align_many(pairs)
+
+
+def align_many(
+    aligner: Aligner,
+    pairs: Sequence[Tuple[str, str]],
+    workers: Optional[int] = None,
+) -> List[Alignment]:
+    """aligner.align_many(pairs), in up to workers processes (by default, the number
+    set with set_workers); the alignments are the same either way"""
+    workers = __workers if workers is None else workers
+    if workers <= 1 or len(pairs) <= ALIGN_CHUNK_SIZE:
+        return aligner.align_many(pairs)
+    chunks = [
+        pairs[i : i + ALIGN_CHUNK_SIZE] for i in range(0, len(pairs), ALIGN_CHUNK_SIZE)
+    ]
+    # the aligner is sent to each worker once, and only strings are sent back
+    with ProcessPoolExecutor(
+        min(workers, len(chunks)),
+        initializer=__init_align_worker,
+        initargs=(aligner,),
+    ) as executor:
+        return list(chain.from_iterable(executor.map(__align_chunk, chunks)))
+
+
+class AlignmentTable:
+    """Read-only list of word alignments, in the order of the words in the
+    dictionary. Each distinct (char, pron) pair is stored once, and each alignment
+    is a range of pair numbers."""
+
+    def __init__(self, alignments: Iterable[Alignment] = ()):
+        self._pairs: List[Tuple[str, str]] = []
+        pair_numbers: Dict[Tuple[str, str], int] = {}
+        numbers: List[int] = []
+        ends: List[int] = []
+        for alignment in alignments:
+            for pair in alignment:
+                if (number := pair_numbers.get(pair)) is None:
+                    number = pair_numbers[pair] = len(self._pairs)
+                    self._pairs.append(pair)
+                numbers.append(number)
+            ends.append(len(numbers))
+        self._pair_numbers = array("I", numbers)
+        self._ends = array("Q", ends)
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def __getitem__(self, index: int) -> Alignment:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("AlignmentTable index out of range")
+        start = self._ends[index - 1] if index else 0
+        pairs = self._pairs
+        return tuple(pairs[n] for n in self._pair_numbers[start : self._ends[index]])
+
+    def __iter__(self) -> Iterator[Alignment]:
+        return (self[i] for i in range(len(self)))
+
+    def replace(self, alignments: Mapping[int, Alignment]) -> "AlignmentTable":
+        """Return a copy of this table with the alignments at the given positions
+        replaced. Unchanged alignments are copied in bulk rather than one by one."""
+        table = AlignmentTable()
+        table._pairs = list(self._pairs)
+        pair_numbers = {pair: n for n, pair in enumerate(table._pairs)}
+        # words' lengths in pairs
+        lengths = array("Q", map(sub, self._ends, chain([0], self._ends)))
+        numbers = array("I")
+        copied = 0
+        for i in sorted(alignments):
+            numbers.extend(self._pair_numbers[copied : self._ends[i] - lengths[i]])
+            for pair in alignments[i]:
+                if (number := pair_numbers.get(pair)) is None:
+                    number = pair_numbers[pair] = len(table._pairs)
+                    table._pairs.append(pair)
+                numbers.append(number)
+            lengths[i] = len(alignments[i])
+            copied = self._ends[i]
+        numbers.extend(self._pair_numbers[copied:])
+        table._pair_numbers = numbers
+        table._ends = array("Q", accumulate(lengths))
+        return table
+
+    def word_positions(self) -> Dict[str, Dict[str, array]]:
+        """{char -> {pron -> positions of the words aligned with that pair}}, with
+        chars, prons and positions in the order they first appear"""
+        pair_to_positions: List[List[int]] = [[] for _ in self._pairs]
+        # pair numbers in the order the pairs are first used; after a replace, this
+        # can differ from the numbering, and some pairs may not be used at all
+        order = []
+        start = 0
+        for i, end in enumerate(self._ends):
+            for n in self._pair_numbers[start:end]:
+                if not (pair_positions := pair_to_positions[n]):
+                    order.append(n)
+                pair_positions.append(i)
+            start = end
+
+        positions: Dict[str, Dict[str, array]] = {}
+        for n in order:
+            c, pron = self._pairs[n]
+            positions.setdefault(c, {})[pron] = array("I", pair_to_positions[n])
+        return positions
+
+
+def store_path(words: WordTable, aligner: Aligner) -> Path:
+    """Location of the stored alignments of words by aligners of this type"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{STORE_VERSION}:{words.fingerprint()}".encode("utf-8"))
+    h.update(aligner.code_fingerprint().encode("utf-8"))
+    return cache.CACHE_DIR / f"alignments-{h.hexdigest()}.pickle"
+
+
+def __char_configs(words: WordTable, aligner: Aligner) -> Dict[str, str]:
+    chars = set("".join(words.surfaces))
+    configs = {}
+    for c in chars:
+        if (config := aligner.char_config(c)) is not None:
+            configs[c] = repr(config)
+    return configs
+
+
+def __load(path: Path) -> Optional[Tuple[Dict[str, str], AlignmentTable]]:
+    if not path.exists():
+        return None
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Could not read alignment store {path.name} ({e})")
+        return None
+
+
+@measured("alignment")
+def align_words(words: WordTable, aligner: Aligner) -> AlignmentTable:
+    """Return the alignments of all words, reusing stored alignments of words whose
+    characters' configuration has not changed since they were aligned"""
+    path = store_path(words, aligner)
+    configs = __char_configs(words, aligner)
+
+    if (stored := __load(path)) is None:
+        logger.info(f"Aligning {len(words)} words...")
+        pairs = [(w.surface, w.pron) for w in words]
+        table = AlignmentTable(align_many(aligner, pairs))
+    else:
+        stored_configs, stored_table = stored
+        changed = {
+            c
+            for c in configs.keys() | stored_configs.keys()
+            if configs.get(c) != stored_configs.get(c)
+        }
+        if not changed:
+            logger.info(f"Loaded alignments from {path.name}")
+            return stored_table
+
+        positions = [
+            i for i, s in enumerate(words.surfaces) if not changed.isdisjoint(s)
+        ]
+        logger.info(
+            f"Re-aligning {len(positions)} of {len(words)} words containing "
+            f"{len(changed)} characters with changed configuration..."
+        )
+        pairs = [(words[i].surface, words[i].pron) for i in positions]
+        table = stored_table.replace(dict(zip(positions, align_many(aligner, pairs))))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cache.atomic_write(path, pickle.dumps((configs, table), pickle.HIGHEST_PROTOCOL))
+    return table
@@ -0,0 +1,58 @@
+# Read single files directly out of downloaded zip and tar archives, so that we
+# don't have to extract whole archives to disk just to parse one or two files.
+
+import io
+import tarfile
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator, Union
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """A file inside of a zip or tar archive"""
+
+    archive: Path
+    # path of the file within the archive
+    name: str
+
+    @contextmanager
+    def open_binary(self) -> Iterator[IO[bytes]]:
+        if zipfile.is_zipfile(self.archive):
+            with zipfile.ZipFile(self.archive) as zf:
+                with zf.open(self.name) as f:
+                    yield f
+        else:
+            with tarfile.open(self.archive) as tf:
+                f = tf.extractfile(self.__find_tar_member(tf))
+                if f is None:
+                    raise KeyError(f"{self.name} in {self.archive} is not a file")
+                with f:
+                    yield f
+
+    def __find_tar_member(self, tf: tarfile.TarFile) -> tarfile.TarInfo:
+        # members are sometimes stored with a leading ./
+        for info in tf:
+            if info.name.removeprefix("./") == self.name:
+                return info
+        raise KeyError(f"{self.name} not found in {self.archive}")
+
+    def __str__(self) -> str:
+        return f"{self.archive}:{self.name}"
+
+
+Source = Union[Path, ArchiveMember]
+
+
+@contextmanager
+def open_text(source: Source, encoding: str = "utf-8") -> Iterator[IO[str]]:
+    """Open a regular file or archive member for reading as text"""
+    if isinstance(source, ArchiveMember):
+        with source.open_binary() as f:
+            with io.TextIOWrapper(f, encoding=encoding) as text:
+                yield text
+    else:
+        with open(source, encoding=encoding) as text:
+            yield text
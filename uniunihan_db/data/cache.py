@@ -0,0 +1,198 @@
+# Persistent cache for parsed datasets. Parsing the raw dictionary, rhyme and
+# character files takes a large part of each run even though they rarely change, so
+# parsed results are pickled under data/generated/cache and reused by later runs.
+# Entries are keyed by the contents of the source files, the parser's code (including
+# the uniunihan_db modules it uses) and an explicit version number, so they are
+# invalidated automatically when any of these change.
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+
+from loguru import logger
+
+from uniunihan_db.data.archive import ArchiveMember, Source
+from uniunihan_db.data.paths import CACHE_DIR
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Digests of source files are remembered by size and mtime so that large files are
+# only hashed again when they change
+DIGEST_INDEX_FILE = "digests.json"
+# Files modified more recently than this could be modified again without their
+# mtime changing, so their digests are not remembered
+RACY_MTIME_NS = 2_000_000_000
+__digest_index: Dict[str, Tuple[int, int, str]] = {}
+
+
+def __load_digest_index() -> Dict[str, Tuple[int, int, str]]:
+    if not __digest_index:
+        try:
+            with open(CACHE_DIR / DIGEST_INDEX_FILE) as f:
+                __digest_index.update(
+                    {k: tuple(v) for k, v in json.load(f).items()}  # type: ignore
+                )
+        except (OSError, ValueError):
+            pass
+    return __digest_index
+
+
+def __save_digest_index() -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    atomic_write(
+        CACHE_DIR / DIGEST_INDEX_FILE, json.dumps(__digest_index).encode("utf-8")
+    )
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write data to path through a temporary file, so that readers never see a
+    partly written file"""
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def file_digest(path: Path) -> str:
+    """Return a hex digest of the contents of the file at path"""
+    path = Path(path).resolve()
+    stat = path.stat()
+    index = __load_digest_index()
+    if entry := index.get(str(path)):
+        size, mtime, digest = entry
+        if size == stat.st_size and mtime == stat.st_mtime_ns:
+            return digest
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    digest = h.hexdigest()
+    if time.time_ns() - stat.st_mtime_ns > RACY_MTIME_NS:
+        index[str(path)] = (stat.st_size, stat.st_mtime_ns, digest)
+        __save_digest_index()
+    return digest
+
+
+def source_digest(source: Source) -> str:
+    """Return a hex digest identifying the contents of a file or archive member.
+    Members are identified by the digest of the whole archive plus their name."""
+    if isinstance(source, ArchiveMember):
+        return f"{file_digest(source.archive)}:{source.name}"
+    return file_digest(source)
+
+
+def __module_dependencies(module_name: str) -> List[str]:
+    # the module and the uniunihan_db modules it uses, directly or indirectly,
+    # judging from the modules, functions and classes in their globals
+    seen = {module_name}
+    pending = [module_name]
+    while pending:
+        if (module := sys.modules.get(pending.pop())) is None:
+            continue
+        for value in vars(module).values():
+            if isinstance(value, ModuleType):
+                dependency = value.__name__
+            elif callable(value):
+                dependency = getattr(value, "__module__", None)
+            else:
+                continue
+            if (
+                isinstance(dependency, str)
+                and dependency.split(".")[0] == "uniunihan_db"
+                and dependency not in seen
+            ):
+                seen.add(dependency)
+                pending.append(dependency)
+    return sorted(seen)
+
+
+@functools.cache
+def code_digest(module_name: str) -> str:
+    """Return a hex digest of the source code of a module and of all uniunihan_db
+    modules it uses, so that results computed by the module's code are invalidated
+    when any of the code they may depend on changes"""
+    h = hashlib.blake2b(digest_size=16)
+    for name in __module_dependencies(module_name):
+        file = getattr(sys.modules[name], "__file__", None)
+        if file is not None and file.endswith(".py"):
+            h.update(f"{name}:".encode("utf-8"))
+            h.update(Path(file).read_bytes())
+    return h.hexdigest()
+
+
+def _cache_key(
+    fn: Callable[..., Any],
+    version: int,
+    sources: Iterable[Source],
+    arguments: Dict[str, Any],
+) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{fn.__module__}.{fn.__qualname__}:{version}".encode("utf-8"))
+    h.update(inspect.getsource(fn).encode("utf-8"))
+    h.update(code_digest(fn.__module__).encode("utf-8"))
+    for source in sources:
+        h.update(source_digest(source).encode("utf-8"))
+    for name, value in sorted(arguments.items()):
+        if isinstance(value, (Path, ArchiveMember)):
+            value = source_digest(value)
+        elif callable(getattr(value, "fingerprint", None)):
+            # objects such as word tables and aligners identify their own contents
+            value = value.fingerprint()
+        h.update(f"{name}={value!r}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def persistent_cache(
+    *sources: Source,
+    version: int = 1,
+    downloads: Iterable[Callable[[], None]] = (),
+) -> Callable[[F], F]:
+    """Decorator which stores the results of a dataset accessor on disk.
+    sources: files or archive members which the accessor reads; arguments of these
+        types are also treated as sources, and arguments with a fingerprint() method
+        are identified by its result
+    version: bump this when a change to something other than code changes the
+        parser's output (the code of the decorated function's module and of the
+        uniunihan_db modules it uses is already part of the key)
+    downloads: functions to call before the sources are read, to make sure they
+        exist"""
+    downloads = tuple(downloads)
+
+    def decorator(fn: F) -> F:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            for download in downloads:
+                download()
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = _cache_key(fn, version, sources, bound.arguments)
+            path = CACHE_DIR / f"{fn.__name__.strip('_')}-{key}.pickle"
+
+            if path.exists():
+                try:
+                    with open(path, "rb") as f:
+                        result = pickle.load(f)
+                    logger.info(f"Loaded {fn.__name__} result from {path.name}")
+                    return result
+                except Exception as e:
+                    logger.warning(f"Could not read cache file {path.name} ({e})")
+
+            result = fn(*args, **kwargs)
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            atomic_write(path, pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+            return result
+
+        return wrapper  # type: ignore
+
+    return decorator
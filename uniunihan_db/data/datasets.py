@@ -1,60 +1,123 @@
 import csv
+import heapq
 import json
-import tarfile
-import zipfile
+import re
 from collections import defaultdict
 from dataclasses import dataclass
-from functools import cache
+from functools import cache, wraps
+from itertools import chain
 from pathlib import Path
 from typing import (
     AbstractSet,
     Any,
+    Callable,
     Dict,
+    Iterable,
+    Iterator,
     List,
     Mapping,
     MutableMapping,
     MutableSet,
     Optional,
     TypeVar,
+    Union,
 )
 
 import commentjson
 import jaconv
-import requests
 from datapackage import Package
 from loguru import logger
 from unihan_etl.core import Packager as unihan_packager
 from unihan_etl.types import UntypedUnihanData
 
+from uniunihan_db.data.alignments import align_many, align_words
+from uniunihan_db.data.archive import ArchiveMember, Source, open_text
+from uniunihan_db.data.cache import persistent_cache
+from uniunihan_db.data.download import fetch_source
 from uniunihan_db.data.paths import (
     CEDICT_FILE,
-    CEDICT_URL,
-    CEDICT_ZIP,
     CHUNOM_VOCAB_FILE,
     COMPONENT_OVERRIDE_FILE,
-    EDICT_FREQ_DIR,
     EDICT_FREQ_FILE,
-    EDICT_FREQ_TARBALL,
-    EDICT_FREQ_URL,
     GENERATED_DATA_DIR,
     INCLUDED_DATA_DIR,
     JUN_DA_CHAR_FREQ_FILE,
-    JUN_DA_CHAR_FREQ_URL,
+    JUN_DA_CHAR_FREQ_HTML,
     KENGDIC_DATA_PACKAGE_URL,
-    LIB_HANGUL_DIR,
-    LIB_HANGUL_URL,
-    LIB_HANGUL_ZIP_FILE,
     UNIHAN_FILE,
+    UNIHAN_ZIP,
+    YTENX_ZIP_FILE,
 )
-from uniunihan_db.data.types import Char2Pron2Words, StringToStrings, Word, ZhWord
+from uniunihan_db.data.snapshot import load_snapshot, snapshot_path, write_snapshot
+from uniunihan_db.data.store import DatasetStore, write_store
+from uniunihan_db.data.types import (
+    Char2Pron2Words,
+    StringToStrings,
+    VocabIndex,
+    Word,
+    WordRow,
+    WordTable,
+    ZhWord,
+)
+from uniunihan_db.data.variants import Edge, VariantGraph, VariantType
 from uniunihan_db.lingua.aligner import Aligner
+from uniunihan_db.metrics import measured
 from uniunihan_db.util import read_csv
 
-YTENX_URL = "https://github.com/BYVoid/ytenx/archive/master.zip"
-YTENX_ZIP_FILE = GENERATED_DATA_DIR / "ytenx-master.zip"
-YTENX_DIR = YTENX_ZIP_FILE.with_suffix("")
+YTENX_RHYMES_FILE = ArchiveMember(
+    YTENX_ZIP_FILE, "ytenx-master/ytenx/sync/dciangx/DrienghTriang.txt"
+)
+YTENX_VARIANTS_FILE = ArchiveMember(
+    YTENX_ZIP_FILE, "ytenx-master/ytenx/sync/jihthex/JihThex.csv"
+)
+YTENX_OTHER_VARIANTS_FILE = ArchiveMember(
+    YTENX_ZIP_FILE, "ytenx-master/ytenx/sync/jihthex/ThaJihThex.csv"
+)
 
 BAXTER_SAGART_FILE = INCLUDED_DATA_DIR / "BaxterSagartOC2015-10-13.csv"
+CKIP_20K_FILE = INCLUDED_DATA_DIR / "CKIP_20000" / "mandarin_20K.tsv"
+JOYO_FILE = INCLUDED_DATA_DIR / "augmented_joyo.csv"
+HISTORICAL_ON_YOMI_FILE = INCLUDED_DATA_DIR / "historical_kanji_on-yomi.csv"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Store of parsed datasets shared between processes (see attach_store), and the
+# accessors whose datasets can be put in one
+__store: Optional[DatasetStore] = None
+__storable: Dict[str, Callable[[], Any]] = {}
+
+
+def _storable(name: str) -> Callable[[F], F]:
+    """Decorator for accessors whose datasets can be shared through a DatasetStore.
+    While a store containing the dataset is attached, calling the accessor without
+    arguments returns the store's read-only view instead."""
+
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if __store is not None and not args and not kwargs and name in __store:
+                return __store[name]
+            return fn(*args, **kwargs)
+
+        __storable[name] = wrapper
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def write_dataset_store(dest: Path, names: Iterable[str]) -> DatasetStore:
+    """Load the named datasets (see _storable) and write them to a store at dest"""
+    names = list(names)
+    logger.info(f"Writing {', '.join(names)} to {dest.name}...")
+    write_store(dest, {name: __storable[name]() for name in names})
+    return DatasetStore(dest)
+
+
+def attach_store(store: Optional[DatasetStore]) -> None:
+    """Serve the datasets in store from it from now on (or stop, if store is None)"""
+    global __store
+    __store = store
+
 
 #################
 # Downloaders ###
@@ -69,8 +132,11 @@ def __download_unihan():
         logger.info(f"{UNIHAN_FILE.name} already exists; skipping download")
         return
 
-    logger.info("  Downloading unihan data...")
-    p = unihan_packager.from_cli(["-F", "json", "--destination", str(UNIHAN_FILE)])
+    fetch_source("unihan")
+    # unihan-etl copies the source to its own working directory if it is a file
+    p = unihan_packager.from_cli(
+        ["-F", "json", "--destination", str(UNIHAN_FILE), "--source", str(UNIHAN_ZIP)]
+    )
     p.download()
     # instruct packager to return data instead of writing to file
     # https://github.com/cihai/unihan-etl/issues/233
@@ -130,6 +196,12 @@ def __download_unihan():
         json.dump(unihan_dict, f, indent=2, ensure_ascii=False)
     logger.info(f"  Saved unihan DB to: {UNIHAN_FILE}")
 
+    # write the binary snapshot now, since we already have the data in memory
+    stat = UNIHAN_FILE.stat()
+    write_snapshot(
+        unihan_dict, snapshot_path(UNIHAN_FILE), (stat.st_size, stat.st_mtime_ns)
+    )
+
     global UNIHAN_DICT
     UNIHAN_DICT = unihan_dict
 
@@ -141,77 +213,65 @@ def export_json(data, destination):
 
 
 def __download_edict_freq():
-    """Download and unzip Utsumi Hiroshi's frequency-annotated EDICT"""
-
-    # download
-    if EDICT_FREQ_TARBALL.exists() and EDICT_FREQ_TARBALL.stat().st_size > 0:
-        logger.info(f"{EDICT_FREQ_TARBALL.name} already exists; skipping download")
-    else:
-        logger.info(
-            f"Downloading frequency-annotated EDICT to {EDICT_FREQ_TARBALL.name}..."
-        )
-        r = requests.get(EDICT_FREQ_URL, stream=True)
-        with open(EDICT_FREQ_TARBALL, "wb") as fd:
-            for chunk in r.iter_content(chunk_size=128):
-                fd.write(chunk)
+    """Download Utsumi Hiroshi's frequency-annotated EDICT"""
+    fetch_source("edict-freq")
 
-    # unzip
-    if EDICT_FREQ_DIR.exists() and EDICT_FREQ_DIR.is_dir():
-        logger.info(f"  {EDICT_FREQ_DIR.name} already exists; skipping decompress")
-    else:
-        tar = tarfile.open(EDICT_FREQ_TARBALL, "r:gz")
-        tar.extractall(GENERATED_DATA_DIR)
-        tar.close()
 
+# parse format: word [pron] /en1/en2/###freq/
+__EDICT_FREQ_LINE = re.compile(r"([^ ]+) \[([^\]]*)\] /(.*)/###(\d+)/")
 
-def get_edict_freq(file=EDICT_FREQ_FILE):
-    """Retrieve Utsumi Hiroshi's frequency-annotated EDICT data"""
 
-    __download_edict_freq()
+def __edict_freq_order(word: WordRow):
+    # descending frequency; ties are kept in file order by the (stable) sort
+    return (-word.frequency, word.surface, word.pron, word.english)
 
-    logger.info(f"Reading EDICT frequency data from {file}...")
-    words = []
-    with open(file) as f:
+
+def iter_edict_freq(
+    file: Source = EDICT_FREQ_FILE, min_freq: Optional[int] = None
+) -> Iterator[Word]:
+    """Parse Utsumi Hiroshi's frequency-annotated EDICT one line at a time, in file
+    order. Entries without kanji are skipped."""
+    if file == EDICT_FREQ_FILE:
+        __download_edict_freq()
+
+    with open_text(file) as f:
         # skip header
-        for i, line in enumerate(f.readlines()[1:]):
-            word = line.split(" ")[0]
-            freq = int(line.split("#")[-1][:-2])
-            english = "/".join(line.split("/")[1:-2])
-            if "[" not in line:
+        next(f, None)
+        for i, line in enumerate(f, 1):
+            if not (match := __EDICT_FREQ_LINE.match(line)):
                 # line contains no kanji
                 continue
-            pron = line.split("[")[1].split("]")[0]
-            # negative frequency to sort descending
-            words.append((-freq, word, pron, english, i))
+            word, pron, english, freq = match.groups()
+            freq = int(freq)
+            if min_freq is None or freq >= min_freq:
+                yield Word(word, f"edict-{i}", pron, english, freq)
+
 
-    output = []
-    for freq, word, pron, english, i in sorted(words):
-        output.append(Word(word, f"edict-{i+1}", pron, english, -freq))
+@_storable("edict_freq")
+@cache
+@measured("dataset")
+@persistent_cache(downloads=[__download_edict_freq])
+def get_edict_freq(
+    file: Source = EDICT_FREQ_FILE,
+    limit: Optional[int] = None,
+    min_freq: Optional[int] = None,
+) -> WordTable:
+    """Retrieve Utsumi Hiroshi's frequency-annotated EDICT data, sorted by
+    descending frequency.
+    limit: only return this many of the most frequent words; only that many words
+        are held in memory at once
+    min_freq: skip words with a lower frequency than this"""
 
-    return output
+    logger.info(f"Reading EDICT frequency data from {file}...")
+    words = iter_edict_freq(file, min_freq)
+    if limit is None:
+        return WordTable(words).sorted(__edict_freq_order)
+    return WordTable(heapq.nsmallest(limit, words, key=__edict_freq_order))
 
 
 def __download_cedict():
-    """Download and unzip CC-CEDICT"""
-
-    # download
-    if CEDICT_ZIP.exists() and CEDICT_ZIP.stat().st_size > 0:
-        logger.info(f"{CEDICT_ZIP.name} already exists; skipping download")
-    else:
-        logger.info(f"Downloading CC-CEDICT to {CEDICT_ZIP.name}...")
-        r = requests.get(CEDICT_URL, stream=True)
-        with open(CEDICT_ZIP, "wb") as fd:
-            for chunk in r.iter_content(chunk_size=128):
-                fd.write(chunk)
-
-    CEDICT_DIR = CEDICT_ZIP.with_suffix("")
-    # unzip
-    if CEDICT_DIR.exists() and CEDICT_DIR.stat().st_size > 0:
-        logger.info(f"  {CEDICT_DIR.name} already exists; skipping decompress")
-    else:
-        logger.info(f"  Writing decompressed contents to {CEDICT_DIR.name}")
-        with zipfile.ZipFile(CEDICT_ZIP, "r") as zip_ref:
-            zip_ref.extractall(CEDICT_DIR)
+    """Download CC-CEDICT"""
+    fetch_source("cedict")
 
 
 def __download_jun_da_char_freq():
@@ -223,12 +283,10 @@ def __download_jun_da_char_freq():
         logger.info(f"{JUN_DA_CHAR_FREQ_FILE.name} already exists; skipping download")
         return
 
-    logger.info(
-        f"Downloading Jun Da's character frequency list from {JUN_DA_CHAR_FREQ_URL}..."
-    )
-    r = requests.get(JUN_DA_CHAR_FREQ_URL)
-    r.encoding = "GBK"
-    for line in r.text.splitlines():
+    fetch_source("jun-da-char-freq")
+    with open(JUN_DA_CHAR_FREQ_HTML, encoding="GBK", errors="replace") as f:
+        html = f.read()
+    for line in html.splitlines():
         if line.startswith("<pre>"):
             # remove leading <pre>
             line = line[5:]
@@ -251,43 +309,13 @@ def __download_jun_da_char_freq():
 
 
 def __download_libhangul():
-    """Download and unzip the libhangul hanja word list data."""
-    # download
-    if LIB_HANGUL_ZIP_FILE.exists() and LIB_HANGUL_ZIP_FILE.stat().st_size > 0:
-        logger.info(f"{LIB_HANGUL_ZIP_FILE.name} already exists; skipping download")
-    else:
-        logger.info(f"Downloading libhangul to {LIB_HANGUL_ZIP_FILE}...")
-        r = requests.get(LIB_HANGUL_URL, stream=True)
-        with open(LIB_HANGUL_ZIP_FILE, "wb") as fd:
-            for chunk in r.iter_content(chunk_size=128):
-                fd.write(chunk)
-
-    # unzip
-    if LIB_HANGUL_DIR.exists() and LIB_HANGUL_DIR.is_dir():
-        logger.info(f"  {LIB_HANGUL_DIR.name} already exists; skipping unzip")
-    else:
-        with zipfile.ZipFile(LIB_HANGUL_ZIP_FILE, "r") as zip_ref:
-            zip_ref.extractall(GENERATED_DATA_DIR)
+    """Download the libhangul hanja word list data."""
+    fetch_source("libhangul")
 
 
 def __download_ytenx():
-    """Download and unzip the ytenx rhyming data."""
-    # download
-    if YTENX_ZIP_FILE.exists() and YTENX_ZIP_FILE.stat().st_size > 0:
-        logger.debug(f"{YTENX_ZIP_FILE.name} already exists; skipping download")
-    else:
-        logger.info(f"Downloading ytenx rhyming data to {YTENX_ZIP_FILE}...")
-        r = requests.get(YTENX_URL, stream=True)
-        with open(YTENX_ZIP_FILE, "wb") as fd:
-            for chunk in r.iter_content(chunk_size=128):
-                fd.write(chunk)
-
-    # unzip
-    if YTENX_DIR.exists() and YTENX_DIR.is_dir():
-        logger.debug(f"  {YTENX_DIR.name} already exists; skipping unzip")
-    else:
-        with zipfile.ZipFile(YTENX_ZIP_FILE, "r") as zip_ref:
-            zip_ref.extractall(GENERATED_DATA_DIR)
+    """Download the ytenx rhyming data."""
+    fetch_source("ytenx")
 
 
 ###############
@@ -305,12 +333,12 @@ class YtenxRhyme:
 
 
 @cache
+@measured("dataset")
+@persistent_cache(YTENX_RHYMES_FILE, downloads=[__download_ytenx])
 def get_ytenx_rhymes():
-    __download_ytenx()
-
     logger.info("  Reading rhymes from ytenx...")
     char_to_component = defaultdict(list)
-    with open(YTENX_DIR / "ytenx" / "sync" / "dciangx" / "DrienghTriang.txt") as f:
+    with open_text(YTENX_RHYMES_FILE) as f:
         rows = csv.DictReader(f, delimiter=" ")
         for r in rows:
             char = r["#字"]
@@ -343,6 +371,8 @@ class BaxterSagart:
 
 
 @cache
+@measured("dataset")
+@persistent_cache(BAXTER_SAGART_FILE)
 def get_baxter_sagart():
     logger.info("Loading Baxter/Sagart reconstruction data...")
     char_to_info = defaultdict(list)
@@ -362,39 +392,54 @@ def get_baxter_sagart():
 
 
 @cache
+@measured("dataset")
+@persistent_cache(
+    YTENX_VARIANTS_FILE, YTENX_OTHER_VARIANTS_FILE, downloads=[__download_ytenx]
+)
 def get_ytenx_variants():
-    __download_ytenx()
-
     logger.info("Constructing variants index from Ytenx...")
     char_to_variants = defaultdict(set)
-    with open(YTENX_DIR / "ytenx" / "sync" / "jihthex" / "JihThex.csv") as f:
+    for char, variant, _ in __iter_ytenx_variants():
+        char_to_variants[char].add(variant)
+
+    return char_to_variants
+
+
+# ytenx variant field -> type of the variants it lists
+__YTENX_VARIANT_TYPES = {
+    "全等": VariantType.Z,
+    "語義交疊": VariantType.SEMANTIC,
+    "簡體": VariantType.SIMPLIFIED,
+    "繁體": VariantType.TRADITIONAL,
+}
+
+
+def __iter_ytenx_variants() -> Iterator[Edge]:
+    with open_text(YTENX_VARIANTS_FILE) as f:
         rows = csv.DictReader(f)
         for r in rows:
             char = r["#字"]
-            for field in ["全等", "語義交疊", "簡體", "繁體"]:
-                if variants := r[field]:
-                    for v in variants:
-                        char_to_variants[char].add(v)
-    with open(YTENX_DIR / "ytenx" / "sync" / "jihthex" / "ThaJihThex.csv") as f:
+            for field, type in __YTENX_VARIANT_TYPES.items():
+                for v in r[field]:
+                    yield char, v, type
+    with open_text(YTENX_OTHER_VARIANTS_FILE) as f:
         rows = csv.DictReader(f)
         for r in rows:
             char = r["#字"]
-            if variants := r["其他異體"]:
-                for v in variants:
-                    char_to_variants[char].add(v)
-
-    return char_to_variants
+            for v in r["其他異體"]:
+                yield char, v, VariantType.OTHER
 
 
 @cache
+@measured("dataset")
+@persistent_cache(CKIP_20K_FILE)
 def get_ckip_20k() -> Mapping[str, Any]:
-    ckip_path = INCLUDED_DATA_DIR / "CKIP_20000" / "mandarin_20K.tsv"
-    logger.info(f"Loading {ckip_path}")
+    logger.info(f"Loading {CKIP_20K_FILE}")
 
     # surface form -> word list
     entries = defaultdict(list)
     num_words = 0
-    rows = read_csv(ckip_path, delimiter="\t")
+    rows = read_csv(CKIP_20K_FILE, delimiter="\t")
     for r in rows:
         # rows contains: word, function, roman, meaning, freq
         pronunciation = r["roman"]
@@ -412,61 +457,60 @@ def get_ckip_20k() -> Mapping[str, Any]:
     return entries
 
 
-@cache
-def get_cedict(file=CEDICT_FILE, filter: bool = True) -> List[ZhWord]:
-    __download_cedict()
-    logger.info("Loading CEDICT data...")
+# parse format: trad simp [pin yin] /en1/en2/en3/
+__CEDICT_LINE = re.compile(r"([^ ]+) ([^ ]+) \[([^\[\]]*)\] */(.*)")
+# entries which are only references to other entries or are otherwise not useful as
+# example vocabulary
+__CEDICT_EXCLUDED = re.compile(r"variant of|see |surname|\(old\)").match
 
-    words: List[ZhWord] = []
-    with open(file) as f:
-        # current CEDICT has one bad line in it, and may have more in the future,
-        # so we'll skip over them
-        failed = 0
-        for i, line in enumerate(f.readlines()):
-            try:
-                # skip comments or empty lines
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
 
-                # parse format: trad simp [pin yin] /en1/en2/en3/
-                remaining, en = line.split("/", 1)
+def iter_cedict(file: Source = CEDICT_FILE, filter: bool = True) -> Iterator[ZhWord]:
+    """Parse CC-CEDICT one line at a time"""
+    if file == CEDICT_FILE:
+        __download_cedict()
+
+    num_words = 0
+    # current CEDICT has one bad line in it, and may have more in the future,
+    # so we'll skip over them
+    failed = 0
+    with open_text(file) as f:
+        for i, line in enumerate(f, 1):
+            # skip comments or empty lines
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            try:
+                if not (match := __CEDICT_LINE.fullmatch(line)):
+                    raise ValueError("Unrecognized line format")
+                trad, simp, pron, en = match.groups()
                 en = en.rstrip("/")
-                if filter:
-                    if (
-                        en.startswith("variant of")
-                        or en.startswith("see ")
-                        or en.startswith("surname")
-                        or en.startswith("(old)")
-                    ):
-                        continue
-
-                remaining, pron = remaining.split("[")
-
-                trad, simp = remaining.rstrip().split(" ")
+                if filter and __CEDICT_EXCLUDED(en):
+                    continue
                 if len(trad) != len(simp):
                     raise ValueError(
                         "Number of characters for traditional and simplified "
                         f"forms do not match: {trad}/{simp}"
                     )
-
-                pron = pron.lstrip("[").rstrip("] ").lower()
-                # frequency is TODO
-                word = ZhWord(
-                    surface=trad,
-                    id=f"cedict-{i+1}",
-                    pron=pron,
-                    english=en,
-                    frequency=-1,
-                    simplified=simp,
-                )
-                words.append(word)
-            except Exception as e:
+            except ValueError as e:
                 failed += 1
-                logger.error(f"Failed to parse line {i+1}: {line} ({e})")
+                logger.error(f"Failed to parse line {i}: {line} ({e})")
+                continue
+
+            num_words += 1
+            # frequency is TODO
+            yield ZhWord(trad, f"cedict-{i}", pron.strip().lower(), en, -1, simp)
 
-    logger.info(f"  Read {len(words)} entries from CEDICT. {failed} failed to parse.")
-    return words
+    logger.info(f"  Read {num_words} entries from CEDICT. {failed} failed to parse.")
+
+
+@_storable("cedict")
+@cache
+@measured("dataset")
+@persistent_cache(downloads=[__download_cedict])
+def get_cedict(file: Source = CEDICT_FILE, filter: bool = True) -> WordTable:
+    logger.info("Loading CEDICT data...")
+    return WordTable(iter_cedict(file, filter))
 
 
 @dataclass
@@ -487,10 +531,12 @@ class Joyo:
 
 
 @cache
+@measured("dataset")
+@persistent_cache(JOYO_FILE)
 def get_joyo():
     logger.info("Loading joyo data...")
     char_info: MutableMapping[str, MutableMapping[str, Any]] = {}
-    rows = read_csv(INCLUDED_DATA_DIR / "augmented_joyo.csv")
+    rows = read_csv(JOYO_FILE)
     for r in rows:
         kun_yomi = {yomi for yomi in (r["kun-yomi"] or "").split("|") if yomi}
         supplementary_info = {
@@ -522,7 +568,17 @@ def get_joyo():
 
 
 # TODO: unit test
+@_storable("phonetic_components")
 @cache
+@measured("dataset")
+@persistent_cache(
+    YTENX_RHYMES_FILE,
+    COMPONENT_OVERRIDE_FILE,
+    UNIHAN_FILE,
+    YTENX_VARIANTS_FILE,
+    YTENX_OTHER_VARIANTS_FILE,
+    downloads=[__download_ytenx, __download_unihan],
+)
 def get_phonetic_components():
     """Extract and augment the phonetic component data in ytenx"""
 
@@ -554,23 +610,37 @@ def get_phonetic_components():
     return component_to_chars
 
 
-W = TypeVar("W", bound=Word)
-
-
-def index_vocab(words: List[W], aligner: Aligner) -> Char2Pron2Words:
+def index_vocab(
+    words: Iterable[Union[Word, WordRow]], aligner: Aligner, workers: int = 1
+) -> Char2Pron2Words:
+    """Index words by the (char, pron) pairs that aligner finds in them. With
+    workers > 1, the words are aligned in that many processes; the index is the same
+    either way."""
+    words = list(words)
+    pairs = [(word.surface, word.pron) for word in words]
     char_to_pron_to_words: Char2Pron2Words = defaultdict(lambda: defaultdict(list))
-    for word in words:
-        alignment = aligner.align(word.surface, word.pron)
+    for word, alignment in zip(words, align_many(aligner, pairs, workers)):
         for c, pron in alignment:
             char_to_pron_to_words[c][pron].append(word)
     return char_to_pron_to_words
 
 
 @cache
+@measured("dataset")
+def get_vocab_index(words: WordTable, aligner: Aligner) -> VocabIndex:
+    """Index a dictionary by the (char, pron) pairs that aligner finds in its words.
+    The index is built once per dictionary and aligner, from alignments which are
+    persisted between runs; use VocabIndex.with_frequencies to order the words
+    differently."""
+    return VocabIndex(words, align_words(words, aligner).word_positions())
+
+
+@cache
+@measured("dataset")
 def get_historical_on_yomi():
     logger.info("Loading historical on-yomi data...")
     char_to_new_to_old_pron = defaultdict(dict)
-    rows = read_csv(INCLUDED_DATA_DIR / "historical_kanji_on-yomi.csv")
+    rows = read_csv(HISTORICAL_ON_YOMI_FILE)
     for r in rows:
         modern = r["現代仮名遣い"]
         historical = jaconv.hira2kata(r["字音仮名遣い"])
@@ -583,6 +653,7 @@ def get_historical_on_yomi():
 
 
 @cache
+@measured("dataset")
 def get_vocab_override(file) -> Char2Pron2Words:
     data = commentjson.load(file.open())
     counter = 1
@@ -603,39 +674,89 @@ def get_vocab_override(file) -> Char2Pron2Words:
     return data
 
 
+# Unihan fields used to construct the variants index
+UNIHAN_VARIANT_FIELDS = (
+    "kSemanticVariant",
+    "kZVariant",
+    "kSimplifiedVariant",
+    "kTraditionalVariant",
+    "kReverseCompatibilityVariants",
+    "kJinmeiyoKanji",
+    "kJoyoKanji",
+    "kCompatibilityVariant",
+)
+
+# All Unihan fields used by the pipeline; pass these to get_unihan to avoid
+# decoding the ~90 other fields
+UNIHAN_PIPELINE_FIELDS = (
+    "kHKGlyph",
+    "kDefinition",
+    "kHanyuPinlu",
+    "kXHC1983",
+    "kHanyuPinyin",
+    "kMandarin",
+    *UNIHAN_VARIANT_FIELDS,
+)
+
+
+def get_unihan(
+    file=UNIHAN_FILE, fields: Optional[Iterable[str]] = None
+) -> Mapping[str, Any]:
+    """Returns a read-only {char -> entry} mapping which decodes entries from the
+    binary Unihan snapshot on access. If fields is given, the snapshot is streamed
+    once and only those fields are kept in memory."""
+    if fields is not None:
+        fields = tuple(sorted(set(fields)))
+    return __load_unihan(file, fields)
+
+
 @cache
-def get_unihan(file=UNIHAN_FILE) -> Mapping[str, Any]:
+@measured("dataset", "get_unihan")
+def __load_unihan(file, fields):
     __download_unihan()
     logger.info("Loading unihan data...")
-    with open(file) as f:
-        unihan = json.load(f)
+    unihan = load_snapshot(Path(file))
+    if fields is not None:
+        logger.info(f"  Keeping {len(fields)} fields")
+        unihan = unihan.project(fields)
     logger.info(f"  Read {len(unihan)} characters from Unihan DB")
 
     return unihan
 
 
 @cache
+@measured("dataset")
 def get_unihan_variants(file=GENERATED_DATA_DIR / "unihan.json"):
-    unihan = get_unihan(file)
     logger.info("Constructing variants index from Unihan...")
-
     char_to_variants = defaultdict(set)
+    for char, variant, _ in __iter_unihan_variants(file):
+        char_to_variants[char].add(variant)
+
+    return char_to_variants
+
+
+# Unihan variant field -> type of the variants it lists
+__UNIHAN_VARIANT_TYPES = {
+    "kSemanticVariant": VariantType.SEMANTIC,
+    "kZVariant": VariantType.Z,
+    "kSimplifiedVariant": VariantType.SIMPLIFIED,
+    "kTraditionalVariant": VariantType.TRADITIONAL,
+    "kReverseCompatibilityVariants": VariantType.COMPATIBILITY,
+    "kJinmeiyoKanji": VariantType.COMPATIBILITY,
+    "kJoyoKanji": VariantType.COMPATIBILITY,
+    "kCompatibilityVariant": VariantType.COMPATIBILITY,
+}
+
+
+def __iter_unihan_variants(file=UNIHAN_FILE) -> Iterator[Edge]:
+    unihan = get_unihan(file, fields=UNIHAN_PIPELINE_FIELDS)
     for char, entry in unihan.items():
-        for field_name in [
-            "kSemanticVariant",
-            "kZVariant",
-            "kSimplifiedVariant",
-            "kTraditionalVariant",
-            "kReverseCompatibilityVariants",
-            "kJinmeiyoKanji",
-            "kJoyoKanji",
-            "kCompatibilityVariant",
-        ]:
+        for field_name in UNIHAN_VARIANT_FIELDS:
             if variants := entry.get(field_name):
                 if not isinstance(variants, list):
                     variants = [variants]
                 for v in variants:
-                    char_to_variants[char].add(v)
+                    yield char, v, __UNIHAN_VARIANT_TYPES[field_name]
 
         # These are asymmetrically noted in Unihan, so
         # we need to reverse the mapping direction
@@ -644,12 +765,24 @@ def get_unihan_variants(file=GENERATED_DATA_DIR / "unihan.json"):
                 if not isinstance(comp_variant, list):
                     comp_variant = [comp_variant]
                 for v in comp_variant:
-                    char_to_variants[v].add(char)
+                    yield v, char, VariantType.COMPATIBILITY
 
-    return char_to_variants
+
+def __iter_joyo_variants() -> Iterator[Edge]:
+    for old_c, info in get_joyo().items():
+        if info["new"] != old_c:
+            yield old_c, info["new"], VariantType.SHINJITAI
 
 
+@_storable("variants")
 @cache
+@measured("dataset")
+@persistent_cache(
+    UNIHAN_FILE,
+    YTENX_VARIANTS_FILE,
+    YTENX_OTHER_VARIANTS_FILE,
+    downloads=[__download_ytenx, __download_unihan],
+)
 def get_variants():
     char_to_variants = defaultdict(set)
     for char, variants in get_unihan_variants().items():
@@ -661,6 +794,29 @@ def get_variants():
 
 
 @cache
+@measured("dataset")
+@persistent_cache(
+    UNIHAN_FILE,
+    YTENX_VARIANTS_FILE,
+    YTENX_OTHER_VARIANTS_FILE,
+    JOYO_FILE,
+    downloads=[__download_ytenx, __download_unihan],
+)
+def get_variant_graph() -> VariantGraph:
+    """Variant relations from Unihan, ytenx and the Joyo list, grouped into
+    components of equivalent characters"""
+    logger.info("Constructing variant graph...")
+    graph = VariantGraph(
+        chain(__iter_unihan_variants(), __iter_ytenx_variants(), __iter_joyo_variants())
+    )
+    logger.info(
+        f"  {len(graph)} characters in {len(graph.components())} variant components"
+    )
+    return graph
+
+
+@cache
+@measured("dataset")
 def get_kengdic():
     # TODO: add separate download step
     logger.info("Loading kengdic data...")
@@ -691,11 +847,13 @@ def get_kengdic():
             words.append(w)
 
     logger.info(f"Loaded {len(words)} usable words from Kengdic")
-    return sorted(words, key=lambda w: -w.frequency)
+    return WordTable(sorted(words, key=lambda w: -w.frequency))
 
 
+@_storable("chunom_org_vocab")
 @cache
-def get_chunom_org_vocab() -> List[Word]:
+@measured("dataset")
+def get_chunom_org_vocab() -> WordTable:
     with open(CHUNOM_VOCAB_FILE, "r") as f:
         rows = csv.DictReader(f, delimiter="\t")
         seen = set()
@@ -718,4 +876,4 @@ def get_chunom_org_vocab() -> List[Word]:
                 -int(r["Freq."]),
             )
             words.append(w)
-    return words
+    return WordTable(words)
@@ -0,0 +1,305 @@
+# Fetch the external data sources used by the pipeline. Downloads are written to a
+# temporary .part file which is only moved into place once it is complete (and its
+# checksum verified), so an interrupted download is never mistaken for a finished
+# one. The server's validator (a strong ETag or Last-Modified) and the file's size
+# are stored next to the .part file, and the next attempt resumes it with an HTTP
+# Range request conditional on the validator (If-Range), so that a file which
+# changed upstream is downloaded again from the start instead of being spliced
+# together from two versions. Partial files without a validator are not resumed.
+#
+# SHA-256 checksums are pinned in data/included/download_manifest.json; run
+# `poe download --pin` to record the checksums of the files currently on disk.
+# Sources without a pinned checksum (null) are downloaded with a warning, since
+# their contents cannot be verified. Only edict-freq is published under a dated,
+# immutable URL; the other URLs point to the latest version of their source.
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import requests
+from loguru import logger
+
+from uniunihan_db.data.paths import (
+    CEDICT_URL,
+    CEDICT_ZIP,
+    DOWNLOAD_MANIFEST_FILE,
+    EDICT_FREQ_TARBALL,
+    EDICT_FREQ_URL,
+    JUN_DA_CHAR_FREQ_FILE,
+    JUN_DA_CHAR_FREQ_HTML,
+    JUN_DA_CHAR_FREQ_URL,
+    LIB_HANGUL_URL,
+    LIB_HANGUL_ZIP_FILE,
+    UNIHAN_FILE,
+    UNIHAN_URL,
+    UNIHAN_ZIP,
+    YTENX_URL,
+    YTENX_ZIP_FILE,
+)
+from uniunihan_db.util import configure_logging
+
+CHUNK_SIZE = 1 << 20
+# (connect, read) timeouts in seconds
+TIMEOUT = (30, 300)
+
+
+@dataclass(frozen=True)
+class Download:
+    # key in the checksum manifest
+    name: str
+    url: str
+    dest: Path
+    # files generated from the download; once they exist, it is not needed anymore
+    derived: Tuple[Path, ...] = ()
+
+    def is_needed(self) -> bool:
+        """False if the download or all of the files derived from it exist"""
+        if self.dest.exists() and self.dest.stat().st_size > 0:
+            return False
+        return not self.derived or not all(p.exists() for p in self.derived)
+
+
+SOURCES = {
+    d.name: d
+    for d in [
+        Download("unihan", UNIHAN_URL, UNIHAN_ZIP, (UNIHAN_FILE,)),
+        Download("edict-freq", EDICT_FREQ_URL, EDICT_FREQ_TARBALL),
+        Download("cedict", CEDICT_URL, CEDICT_ZIP),
+        Download(
+            "jun-da-char-freq",
+            JUN_DA_CHAR_FREQ_URL,
+            JUN_DA_CHAR_FREQ_HTML,
+            (JUN_DA_CHAR_FREQ_FILE,),
+        ),
+        Download("libhangul", LIB_HANGUL_URL, LIB_HANGUL_ZIP_FILE),
+        Download("ytenx", YTENX_URL, YTENX_ZIP_FILE),
+    ]
+}
+
+
+@cache
+def load_manifest(path: Path = DOWNLOAD_MANIFEST_FILE) -> Mapping[str, Optional[str]]:
+    """Returns {download name -> pinned SHA-256 checksum or None}"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def sha256sum(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def __validator(r: requests.Response) -> Optional[str]:
+    # weak ETags cannot be used with If-Range
+    if (etag := r.headers.get("ETag")) and not etag.startswith("W/"):
+        return etag
+    return r.headers.get("Last-Modified")
+
+
+def __content_range(r: requests.Response) -> Tuple[Optional[int], Optional[int]]:
+    # (first byte, total size) of a 206 response
+    if r.headers.get("Content-Encoding", "identity") != "identity":
+        return None, None
+    try:
+        unit_range, total = r.headers["Content-Range"].split("/")
+        first = int(unit_range.split()[1].split("-")[0])
+        return first, None if total == "*" else int(total)
+    except (KeyError, IndexError, ValueError):
+        return None, None
+
+
+def __content_length(r: requests.Response) -> Optional[int]:
+    # the size of the file, unless the response is compressed (requests decompresses
+    # it while reading)
+    if r.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    try:
+        return int(r.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def __read_state(path: Path) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def __request(url: str, offset: int, validator: Optional[str]) -> requests.Response:
+    headers = {}
+    if offset and validator:
+        headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+    return requests.get(url, headers=headers, stream=True, timeout=TIMEOUT)
+
+
+def fetch(
+    download: Download,
+    sha256: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Path:
+    """Download to download.dest unless it already exists, resuming an earlier
+    partial download if the file has not changed on the server since. If sha256
+    is given, the downloaded file must match it or a ValueError is raised."""
+    dest = download.dest
+    if dest.exists() and dest.stat().st_size > 0:
+        logger.info(f"{dest.name} already exists; skipping download")
+        return dest
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = dest.with_name(dest.name + ".part")
+    # validator and size of the file being downloaded to part
+    state_file = dest.with_name(dest.name + ".part.json")
+    state = __read_state(state_file)
+    offset = part.stat().st_size if part.exists() and state.get("validator") else 0
+
+    logger.info(f"Downloading {download.url} to {dest}...")
+    r = __request(download.url, offset, state.get("validator"))
+    try:
+        # If-Range makes the server ignore the range if the file changed, so a 416
+        # means the partial file is as long as the unchanged file, or longer
+        if r.status_code == 416 and offset == state.get("size"):
+            logger.info(f"  {part.name} is already complete")
+            size = offset
+        else:
+            if r.status_code == 416:
+                r.close()
+                logger.info(f"  {part.name} is too long; downloading it again")
+                offset = 0
+                r = __request(download.url, 0, None)
+            r.raise_for_status()
+            if r.status_code == 206:
+                first, size = __content_range(r)
+                if first != offset:
+                    part.unlink()
+                    state_file.unlink()
+                    raise ValueError(
+                        f"{download.url} returned bytes from {first} instead of "
+                        f"{offset}"
+                    )
+                logger.info(f"  Resuming {part.name} from byte {offset}")
+                mode = "ab"
+            else:
+                # the file changed, or the server does not support ranges
+                size = __content_length(r)
+                mode = "wb"
+            with open(state_file, "w") as f:
+                json.dump({"validator": __validator(r), "size": size}, f)
+            with open(part, mode) as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+    finally:
+        r.close()
+
+    # the partial file is kept to be resumed
+    if size is not None and (actual_size := part.stat().st_size) != size:
+        raise ValueError(
+            f"Incomplete download of {download.url}: got {actual_size} of {size} "
+            "bytes"
+        )
+    if sha256 and (actual := sha256sum(part)) != sha256:
+        part.unlink()
+        state_file.unlink(missing_ok=True)
+        raise ValueError(
+            f"Checksum mismatch for {download.url}: expected {sha256}, got {actual}"
+        )
+    os.replace(part, dest)
+    state_file.unlink(missing_ok=True)
+    return dest
+
+
+def __pinned_checksum(
+    name: str, manifest: Mapping[str, Optional[str]]
+) -> Optional[str]:
+    if (sha256 := manifest.get(name)) is None:
+        logger.warning(f"No checksum pinned for {name}; its download is not verified")
+    return sha256
+
+
+def fetch_source(name: str) -> Path:
+    """Download one of the SOURCES, verifying it against the pinned checksum"""
+    return fetch(SOURCES[name], __pinned_checksum(name, load_manifest()))
+
+
+def fetch_all(
+    downloads: Iterable[Download],
+    manifest: Optional[Mapping[str, Optional[str]]] = None,
+    max_workers: int = 8,
+) -> List[Path]:
+    """Download everything concurrently, verifying the checksums pinned in
+    manifest. Errors are raised after all other downloads have finished."""
+    manifest = manifest or {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(fetch, d, __pinned_checksum(d.name, manifest))
+            for d in downloads
+        ]
+    paths = []
+    errors = []
+    for future in futures:
+        try:
+            paths.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    for e in errors:
+        logger.error(f"Download failed: {e}")
+    if errors:
+        raise errors[0]
+    return paths
+
+
+def download_all(
+    max_workers: int = len(SOURCES), manifest_path: Path = DOWNLOAD_MANIFEST_FILE
+) -> List[Path]:
+    """Download all external data sources which are missing and whose derived
+    files are missing, too"""
+    downloads = [d for d in SOURCES.values() if d.is_needed()]
+    if not downloads:
+        logger.info("All external data sources are present")
+        return []
+    return fetch_all(downloads, load_manifest(manifest_path), max_workers)
+
+
+def pin_checksums(path: Path = DOWNLOAD_MANIFEST_FILE) -> None:
+    """Record the checksums of the currently downloaded files in the manifest"""
+    manifest = dict(load_manifest(path))
+    for name, download in SOURCES.items():
+        if download.dest.exists():
+            manifest[name] = sha256sum(download.dest)
+            logger.info(f"Pinned {name}: {manifest[name]}")
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=4)
+        f.write("\n")
+    load_manifest.cache_clear()
+
+
+def main() -> None:
+    configure_logging(__name__)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=len(SOURCES), help="concurrent downloads"
+    )
+    parser.add_argument(
+        "--pin",
+        action="store_true",
+        help="record checksums of the downloaded files in the manifest",
+    )
+    args = parser.parse_args()
+    download_all(args.jobs)
+    if args.pin:
+        pin_checksums()
+
+
+if __name__ == "__main__":
+    main()
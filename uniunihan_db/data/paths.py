@@ -1,5 +1,7 @@
 from pathlib import Path
 
+from uniunihan_db.data.archive import ArchiveMember
+
 PROJECT_DIR = Path(__file__).parents[2]
 
 DATA_DIR = PROJECT_DIR / "data"
@@ -9,28 +11,33 @@ GENERATED_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 PIPELINE_OUTPUT_DIR = GENERATED_DATA_DIR / "pipeline"
 
+CACHE_DIR = GENERATED_DATA_DIR / "cache"
+
 INCLUDED_DATA_DIR = DATA_DIR / "included"
 
 TEST_CORPUS_DIR = PROJECT_DIR / "tests" / "corpus"
 
 CEDICT_URL = "https://www.mdbg.net/chinese/export/cedict/cedict_1_0_ts_utf-8_mdbg.zip"
 CEDICT_ZIP = GENERATED_DATA_DIR / "cedict_1_0_ts_utf-8_mdbg.zip"
-CEDICT_DIR = CEDICT_ZIP.with_suffix("")
-CEDICT_FILE = CEDICT_DIR / "cedict_ts.u8"
+CEDICT_FILE = ArchiveMember(CEDICT_ZIP, "cedict_ts.u8")
 
 CHUNOM_CHAR_FILE = INCLUDED_DATA_DIR / "chunom_org" / "char_data.csv"
 CHUNOM_VOCAB_FILE = INCLUDED_DATA_DIR / "chunom_org" / "standard-list.csv"
 
 COMPONENT_OVERRIDE_FILE = INCLUDED_DATA_DIR / "manual_components.json"
 
+DOWNLOAD_MANIFEST_FILE = INCLUDED_DATA_DIR / "download_manifest.json"
+
 EDICT_FREQ_URL = "http://ftp.edrdg.org/pub/Nihongo/edict-freq-20081002.tar.gz"
 EDICT_FREQ_TARBALL = GENERATED_DATA_DIR / "edict-freq-20081002.tar.gz"
-EDICT_FREQ_DIR = EDICT_FREQ_TARBALL.with_suffix("").with_suffix("")
-EDICT_FREQ_FILE = EDICT_FREQ_DIR / "edict-freq-20081002"
+EDICT_FREQ_FILE = ArchiveMember(
+    EDICT_FREQ_TARBALL, "edict-freq-20081002/edict-freq-20081002"
+)
 
 JUN_DA_CHAR_FREQ_URL = (
     "https://lingua.mtsu.edu/chinese-computing/statistics/char/list.php"
 )
+JUN_DA_CHAR_FREQ_HTML = GENERATED_DATA_DIR / "jun_da_char.html"
 JUN_DA_CHAR_FREQ_FILE = GENERATED_DATA_DIR / "jun_da_char.tsv"
 
 KENGDIC_DATA_PACKAGE_URL = (
@@ -43,8 +50,16 @@ JP_VOCAB_OVERRIDE = INCLUDED_DATA_DIR / "jp_vocab_override.json"
 
 LIB_HANGUL_URL = "https://github.com/libhangul/libhangul/archive/master.zip"
 LIB_HANGUL_ZIP_FILE = GENERATED_DATA_DIR / "libhangul-master.zip"
-LIB_HANGUL_DIR = LIB_HANGUL_ZIP_FILE.with_suffix("")
+
+METRICS_DIR = GENERATED_DATA_DIR / "metrics"
 
 PHONETIC_COMPONENTS_FILE = GENERATED_DATA_DIR / "components_to_chars.tsv"
 
+SNAPSHOT_DIR = GENERATED_DATA_DIR / "snapshots"
+
+UNIHAN_URL = "https://www.unicode.org/Public/UNIDATA/Unihan.zip"
+UNIHAN_ZIP = GENERATED_DATA_DIR / "Unihan.zip"
 UNIHAN_FILE = GENERATED_DATA_DIR / "unihan.json"
+
+YTENX_URL = "https://github.com/BYVoid/ytenx/archive/master.zip"
+YTENX_ZIP_FILE = GENERATED_DATA_DIR / "ytenx-master.zip"
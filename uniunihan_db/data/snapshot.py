@@ -0,0 +1,180 @@
+# Compact binary snapshot of the Unihan database. Parsing the full generated JSON
+# file takes seconds and hundreds of MB, so we convert it once into a file that can
+# be memory-mapped and decoded one entry at a time.
+#
+# Layout (all integers little-endian):
+#   header: magic, source size, source mtime (ns), entry count
+#   codepoints: uint32[count], sorted ascending
+#   offsets: uint64[count + 1], entry boundaries relative to the payload start
+#   payload: compact UTF-8 JSON for each entry, in codepoint order
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Collection, Dict, Iterator, Mapping, Optional, Tuple
+
+from loguru import logger
+
+from uniunihan_db.data.paths import SNAPSHOT_DIR
+
+MAGIC = b"UUHSNAP1"
+HEADER = struct.Struct("<8sQQQ")
+
+
+def _source_stamp(source: Path) -> Tuple[int, int]:
+    stat = source.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def snapshot_path(source: Path) -> Path:
+    """Location of the snapshot built from the given JSON file; files with the same
+    name in different directories have different snapshots"""
+    digest = hashlib.blake2b(str(source.resolve()).encode("utf-8"), digest_size=4)
+    return SNAPSHOT_DIR / f"{source.stem}-{digest.hexdigest()}.snapshot"
+
+
+def write_snapshot(
+    data: Mapping[str, Any], dest: Path, stamp: Tuple[int, int] = (0, 0)
+) -> None:
+    """Write data ({char -> entry}) to dest in snapshot format. stamp is the
+    (size, mtime) of the source file and is used to detect stale snapshots."""
+    chars = sorted(data.keys(), key=ord)
+    offsets = [0]
+    payload = bytearray()
+    for c in chars:
+        payload += json.dumps(
+            data[c], ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        offsets.append(len(payload))
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, stamp[0], stamp[1], len(chars)))
+        f.write(struct.pack(f"<{len(chars)}I", *(ord(c) for c in chars)))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.write(payload)
+    os.replace(tmp, dest)
+
+
+class UnihanSnapshot(Mapping[str, Any]):
+    """Read-only {char -> entry} mapping backed by a memory-mapped snapshot file.
+    Entries are decoded from the file each time they are accessed."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, mtime, count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a Unihan snapshot")
+        self.stamp = (size, mtime)
+
+        view = memoryview(self._mmap)
+        start = HEADER.size
+        end = start + 4 * count
+        self._codepoints = view[start:end].cast("I")
+        start, end = end, end + 8 * (count + 1)
+        self._offsets = view[start:end].cast("Q")
+        self._payload_start = end
+
+    def _index(self, char: object) -> Optional[int]:
+        if not isinstance(char, str) or len(char) != 1:
+            return None
+        cp = ord(char)
+        i = bisect_left(self._codepoints, cp)
+        if i < len(self._codepoints) and self._codepoints[i] == cp:
+            return i
+        return None
+
+    def _payload(self, i: int) -> bytes:
+        start = self._payload_start + self._offsets[i]
+        end = self._payload_start + self._offsets[i + 1]
+        return self._mmap[start:end]
+
+    def __getitem__(self, char: str) -> Any:
+        i = self._index(char)
+        if i is None:
+            raise KeyError(char)
+        return json.loads(self._payload(i))
+
+    def __contains__(self, char: object) -> bool:
+        return self._index(char) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (chr(cp) for cp in self._codepoints)
+
+    def __len__(self) -> int:
+        return len(self._codepoints)
+
+    def __reduce__(self):
+        # reopen the mapping by path instead of copying its contents
+        return (self.__class__, (self.path,))
+
+    def project(self, fields: Collection[str]) -> "ProjectedUnihan":
+        """Stream through all entries once, keeping only the given fields"""
+        fields = tuple(fields)
+        # Only the requested values are decoded. Entry keys are only ever Unihan
+        # field names, and quotes inside of string values are escaped, so a search
+        # for '"field":' can only find the key itself.
+        decoder = json.JSONDecoder()
+        needles = [(field, f'"{field}":') for field in fields]
+        tables: Dict[str, Dict[str, Any]] = {field: {} for field in fields}
+        for i, cp in enumerate(self._codepoints):
+            payload = self._payload(i).decode("utf-8")
+            for field, needle in needles:
+                index = payload.find(needle)
+                if index != -1:
+                    value, _ = decoder.raw_decode(payload, index + len(needle))
+                    tables[field][chr(cp)] = value
+        return ProjectedUnihan(self, tables)
+
+
+class ProjectedUnihan(Mapping[str, Dict[str, Any]]):
+    """Read-only {char -> entry} mapping containing only a subset of the Unihan
+    fields. Field values are stored in one {char -> value} table per field; the
+    entry dicts are assembled on access. Every character in the snapshot is a key,
+    even if it has none of the requested fields."""
+
+    def __init__(self, snapshot: UnihanSnapshot, tables: Mapping[str, Dict[str, Any]]):
+        self.snapshot = snapshot
+        self.fields = tuple(tables.keys())
+        self._tables = tables
+
+    def __getitem__(self, char: str) -> Dict[str, Any]:
+        if char not in self.snapshot:
+            raise KeyError(char)
+        return {
+            field: table[char] for field, table in self._tables.items() if char in table
+        }
+
+    def __contains__(self, char: object) -> bool:
+        return char in self.snapshot
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.snapshot)
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+
+def load_snapshot(source: Path) -> UnihanSnapshot:
+    """Open the snapshot for the given Unihan JSON file, (re)building it first if it
+    is missing or older than the JSON file."""
+    dest = snapshot_path(source)
+    stamp = _source_stamp(source)
+    if dest.exists():
+        snapshot = UnihanSnapshot(dest)
+        if snapshot.stamp == stamp:
+            return snapshot
+        logger.info(f"  {dest.name} is out of date; rebuilding")
+
+    logger.info(f"  Building Unihan snapshot {dest} from {source.name}...")
+    with open(source) as f:
+        data = json.load(f)
+    write_snapshot(data, dest, stamp)
+    return UnihanSnapshot(dest)
@@ -0,0 +1,321 @@
+# Read-only store of parsed datasets in a single memory-mapped file. Worker
+# processes which each unpickled their own copy of the variant map, the phonetic
+# component table and the dictionaries would multiply the memory used by the
+# number of workers; instead, the parent process writes the datasets to a store
+# once, and workers open it in constant time and read them in place through the
+# page cache, which all processes share.
+#
+# Layout: header (magic, directory size), JSON directory, then 8-byte aligned
+# sections in native byte order (stores are only read on the machine writing them).
+# Strings are interned into pools (UTF-8 payload plus offsets), and string columns
+# are arrays of references into a pool.
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    overload,
+)
+
+from uniunihan_db.data.types import StringToStrings, WordTable
+
+MAGIC = b"UUHSTOR1"
+HEADER = struct.Struct("<8sQ")
+ALIGNMENT = 8
+# string reference standing for None
+NO_STRING = 0xFFFFFFFF
+
+# (offset, size in bytes, struct format) of a section
+Section = Tuple[int, int, str]
+
+
+class StringPool(Sequence[str]):
+    """Distinct strings stored as one UTF-8 payload, decoded on access"""
+
+    def __init__(self, offsets: memoryview, payload: memoryview):
+        self._offsets = offsets
+        self._payload = payload
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @overload
+    def __getitem__(self, index: int) -> str:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[str]:
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return str(
+            self._payload[self._offsets[index] : self._offsets[index + 1]], "utf-8"
+        )
+
+
+class StringColumn(Sequence[Optional[str]]):
+    """Column of strings (or None) stored as references into a StringPool"""
+
+    def __init__(self, pool: StringPool, refs: memoryview):
+        self._pool = pool
+        self._refs = refs
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    @overload
+    def __getitem__(self, index: int) -> Optional[str]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Optional[str]]:
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        ref = self._refs[index]
+        return None if ref == NO_STRING else self._pool[ref]
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        pool = self._pool
+        for ref in self._refs:
+            yield None if ref == NO_STRING else pool[ref]
+
+
+class StoredMultiMap(Mapping[str, Tuple[str, ...]]):
+    """Read-only {str -> (str, ...)} mapping, iterated in its original order. Keys
+    are looked up with a binary search over a sorted permutation of the keys."""
+
+    def __init__(
+        self,
+        keys: StringColumn,
+        order: memoryview,
+        ends: memoryview,
+        values: StringColumn,
+    ):
+        self._keys = keys
+        self._order = order
+        self._ends = ends
+        self._values = values
+
+    def _find(self, key: object) -> Optional[int]:
+        if not isinstance(key, str):
+            return None
+        low, high = 0, len(self._order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._keys[self._order[middle]] < key:  # type: ignore
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._order) and self._keys[self._order[low]] == key:
+            return self._order[low]
+        return None
+
+    def __getitem__(self, key: str) -> Tuple[str, ...]:
+        i = self._find(key)
+        if i is None:
+            raise KeyError(key)
+        start = self._ends[i - 1] if i else 0
+        values = self._values
+        return tuple(values[j] for j in range(start, self._ends[i]))  # type: ignore
+
+    def __contains__(self, key: object) -> bool:
+        return self._find(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class _Writer:
+    def __init__(self):
+        self.data = bytearray()
+
+    def add(self, values: Union[array, bytes]) -> Section:
+        self.data += bytes(-len(self.data) % ALIGNMENT)
+        offset = len(self.data)
+        if isinstance(values, array):
+            self.data += values.tobytes()
+            return offset, len(self.data) - offset, values.typecode
+        self.data += values
+        return offset, len(values), "B"
+
+    def add_pool(self, strings: Sequence[str]) -> Dict[str, Section]:
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = array("Q", [0])
+        for e in encoded:
+            offsets.append(offsets[-1] + len(e))
+        return {"offsets": self.add(offsets), "payload": self.add(b"".join(encoded))}
+
+
+def __intern(
+    strings: Sequence[Optional[str]], pool: Dict[str, int]
+) -> array:  # array of references
+    refs = array("I")
+    for s in strings:
+        refs.append(NO_STRING if s is None else pool.setdefault(s, len(pool)))
+    return refs
+
+
+def write_store(dest: Path, tables: Mapping[str, Union[WordTable, StringToStrings]]):
+    """Write the given word tables and {str -> strings} mappings to dest. Each table
+    gets its own string pool."""
+    writer = _Writer()
+    directory: Dict[str, Any] = {}
+    for name, table in tables.items():
+        pool: Dict[str, int] = {}
+        if isinstance(table, WordTable):
+            columns = {
+                column: writer.add(__intern(getattr(table, column), pool))
+                for column in ["_surfaces", "_id_prefixes", "_prons"]
+            }
+            if table._simplified is not None:
+                columns["_simplified"] = writer.add(__intern(table._simplified, pool))
+            for column in [
+                "_id_numbers",
+                "_frequencies",
+                "_english_starts",
+                "_english_ends",
+            ]:
+                numbers = getattr(table, column)
+                if not isinstance(numbers, array):
+                    numbers = array(numbers.format, numbers)
+                columns[column] = writer.add(numbers)
+            columns["_english"] = writer.add(bytes(table._english))
+            directory[name] = {"kind": "words", "columns": columns}
+        else:
+            keys = list(table.keys())
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            ends = array("Q")
+            values: List[str] = []
+            for key in keys:
+                # sets are stored sorted; other collections keep their order
+                key_values = table[key]
+                if isinstance(key_values, (set, frozenset)):
+                    key_values = sorted(key_values)
+                values.extend(key_values)
+                ends.append(len(values))
+            key_refs = __intern(keys, pool)
+            value_refs = __intern(values, pool)
+            columns = {
+                "keys": writer.add(key_refs),
+                "order": writer.add(array("I", order)),
+                "ends": writer.add(ends),
+                "values": writer.add(value_refs),
+            }
+            directory[name] = {"kind": "multimap", "columns": columns}
+        directory[name]["pool"] = writer.add_pool(list(pool))
+
+    header_json = json.dumps(directory).encode("utf-8")
+    start = HEADER.size + len(header_json)
+    padding = -start % ALIGNMENT
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(header_json) + padding))
+        f.write(header_json + b" " * padding)
+        f.write(writer.data)
+    os.replace(tmp, dest)
+
+
+class DatasetStore(Mapping[str, Any]):
+    """Read-only {name -> dataset} view of a store file. Word tables are returned as
+    WordTables whose columns are views over the file; mappings as StoredMultiMaps.
+    Pickling a store only pickles its path, so sending it to a worker process is
+    cheap."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, directory_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a dataset store")
+        self._start = HEADER.size + directory_size
+        self._directory = json.loads(self._mmap[HEADER.size : self._start])
+        self._view = memoryview(self._mmap)
+        self._tables: Dict[str, Any] = {}
+
+    def __reduce__(self):
+        return (self.__class__, (self.path,))
+
+    def _section(self, section: Section) -> memoryview:
+        offset, size, format = section
+        start = self._start + offset
+        return self._view[start : start + size].cast(format)
+
+    def __getitem__(self, name: str) -> Any:
+        if (table := self._tables.get(name)) is None:
+            entry = self._directory[name]
+            columns = {
+                column: self._section(section)
+                for column, section in entry["columns"].items()
+            }
+            pool = StringPool(
+                self._section(entry["pool"]["offsets"]),
+                self._section(entry["pool"]["payload"]),
+            )
+            if entry["kind"] == "words":
+                table = _StoredWordTable(self, name, columns, pool)
+            else:
+                table = StoredMultiMap(
+                    StringColumn(pool, columns["keys"]),
+                    columns["order"],
+                    columns["ends"],
+                    StringColumn(pool, columns["values"]),
+                )
+            self._tables[name] = table
+        return table
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._directory)
+
+    def __len__(self) -> int:
+        return len(self._directory)
+
+
+class _StoredWordTable(WordTable):
+    # WordTable over columns in a DatasetStore; the columns are read-only, and the
+    # table is pickled as a reference to the store
+
+    def __init__(
+        self,
+        store: DatasetStore,
+        name: str,
+        columns: Mapping[str, memoryview],
+        pool: StringPool,
+    ):
+        self.__dict__.update(
+            {
+                column: StringColumn(pool, view) if view.format == "I" else view
+                for column, view in columns.items()
+            }
+        )
+        self._simplified = self.__dict__.get("_simplified")
+        self._store = store
+        self._name = name
+
+    def __reduce__(self):
+        return (_stored_table, (self._store, self._name))
+
+
+def _stored_table(store: DatasetStore, name: str) -> WordTable:
+    return store[name]
@@ -1,5 +1,25 @@
-from dataclasses import dataclass
-from typing import Collection, Mapping, MutableMapping, MutableSequence, Optional
+import hashlib
+import re
+import sys
+from array import array
+from dataclasses import astuple, dataclass
+from itertools import accumulate
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Union,
+    overload,
+)
 
 
 @dataclass
@@ -27,7 +47,314 @@ class ZhWord(Word):
     simplified: Optional[str]
 
 
+# ids are stored as a shared prefix plus a number, e.g. "cedict-" and 12345
+_ID_PATTERN = re.compile(r"(.*?)([1-9][0-9]*|0)")
+# stored for ids without a numeric suffix
+_NO_ID_NUMBER = -1
+
+
+def _split_id(id: str):
+    # fast path for the usual "source-123" ids
+    prefix, separator, number = id.rpartition("-")
+    if separator and number.isascii() and number.isdigit() and number[0] != "0":
+        return sys.intern(prefix + separator), int(number)
+    if match := _ID_PATTERN.fullmatch(id):
+        return sys.intern(match[1]), int(match[2])
+    return sys.intern(id), _NO_ID_NUMBER
+
+
+class WordRow:
+    """Read-only view of one word in a WordTable, with the same attributes as Word
+    (or ZhWord, if the table contains simplified forms). Compares equal to the
+    equivalent Word."""
+
+    __slots__ = ("_table", "_index")
+
+    # like Word, rows are compared by value and are not hashable
+    __hash__ = None  # type: ignore
+
+    def __init__(self, table: "WordTable", index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def surface(self) -> str:
+        return self._table._surfaces[self._index]
+
+    @property
+    def id(self) -> str:
+        number = self._table._id_numbers[self._index]
+        prefix = self._table._id_prefixes[self._index]
+        return prefix if number == _NO_ID_NUMBER else f"{prefix}{number}"
+
+    @property
+    def pron(self) -> str:
+        return self._table._prons[self._index]
+
+    @property
+    def english(self) -> str:
+        table = self._table
+        start = table._english_starts[self._index]
+        end = table._english_ends[self._index]
+        # str() rather than .decode(), since stored tables use a memoryview
+        return str(table._english[start:end], "utf-8")
+
+    @property
+    def frequency(self) -> int:
+        return self._table._frequencies[self._index]
+
+    @property
+    def simplified(self) -> Optional[str]:
+        if (simplified := self._table._simplified) is None:
+            raise AttributeError("simplified")
+        return simplified[self._index]
+
+    def to_word(self) -> Word:
+        """Copy this row into a Word or ZhWord object"""
+        if self._table._simplified is None:
+            return Word(self.surface, self.id, self.pron, self.english, self.frequency)
+        return ZhWord(
+            self.surface,
+            self.id,
+            self.pron,
+            self.english,
+            self.frequency,
+            self.simplified,
+        )
+
+    def _asdict(self) -> Dict[str, Any]:
+        return vars(self.to_word())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, WordRow):
+            other = other.to_word()
+        if isinstance(other, Word):
+            return self.to_word() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self.to_word())
+
+    def __reduce__(self):
+        # pickle only this word, not the whole table
+        word = self.to_word()
+        return (word.__class__, astuple(word))
+
+
+class WordTable(Sequence[WordRow]):
+    """Read-only list of words stored column by column rather than as one object
+    per word, which takes a fraction of the memory for large dictionaries. English
+    glosses are stored as UTF-8 and only decoded when accessed. Indexing returns
+    WordRow views; the table contains simplified forms if its first word was a
+    ZhWord."""
+
+    def __init__(self, words: Iterable[Union[Word, WordRow]] = ()):
+        self._surfaces: List[str] = []
+        self._id_prefixes: List[str] = []
+        self._prons: List[str] = []
+        self._simplified: Optional[List[Optional[str]]] = None
+        id_numbers: List[int] = []
+        glosses: List[bytes] = []
+        frequencies: List[int] = []
+
+        for w in words:
+            if self._simplified is None and not self._surfaces:
+                if getattr(w, "simplified", False) is not False:
+                    self._simplified = []
+            # dictionaries repeat surfaces (e.g. CC-CEDICT's entries with several
+            # readings) and prons, so each distinct string is stored once
+            surface = sys.intern(w.surface)
+            self._surfaces.append(surface)
+            prefix, number = _split_id(w.id)
+            self._id_prefixes.append(prefix)
+            id_numbers.append(number)
+            self._prons.append(sys.intern(w.pron))
+            glosses.append(w.english.encode("utf-8"))
+            frequencies.append(w.frequency)
+            if self._simplified is not None:
+                simplified = getattr(w, "simplified", None)
+                if simplified is not None:
+                    simplified = sys.intern(simplified)
+                self._simplified.append(simplified)
+
+        self._id_numbers = array("q", id_numbers)
+        self._frequencies = array("q", frequencies)
+        self._english = b"".join(glosses)
+        self._english_ends = array("Q", accumulate(map(len, glosses)))
+        self._english_starts = array("Q", self._english_ends[:-1])
+        if glosses:
+            self._english_starts.insert(0, 0)
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    @overload
+    def __getitem__(self, index: int) -> WordRow:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[WordRow]:
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [WordRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("WordTable index out of range")
+        return WordRow(self, index)
+
+    def __iter__(self) -> Iterator[WordRow]:
+        return (WordRow(self, i) for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"<WordTable of {len(self)} words>"
+
+    @property
+    def surfaces(self) -> Sequence[str]:
+        """The surfaces of all words, without creating a row for each word"""
+        return self._surfaces
+
+    # columns reordered by sorted; _english is shared by all orders
+    _ROW_COLUMNS = (
+        "_surfaces",
+        "_id_prefixes",
+        "_id_numbers",
+        "_prons",
+        "_english_starts",
+        "_english_ends",
+        "_frequencies",
+        "_simplified",
+    )
+
+    def _copy(self) -> "WordTable":
+        # columns are never modified after construction, so they can be shared
+        table = WordTable.__new__(WordTable)
+        for name in self._ROW_COLUMNS + ("_english",):
+            setattr(table, name, getattr(self, name))
+        return table
+
+    def __getstate__(self):
+        # copies of tables in a DatasetStore share its read-only views, which are
+        # pickled as plain columns
+        state = dict(self.__dict__)
+        for name, column in state.items():
+            if isinstance(column, memoryview):
+                column = (
+                    bytes(column)
+                    if name == "_english"
+                    else array(column.format, column)
+                )
+            elif column is not None and not isinstance(column, (list, array, bytes)):
+                column = list(column)
+            state[name] = column
+        return state
+
+    def with_frequencies(self, frequencies: Iterable[int]) -> "WordTable":
+        """Return a copy of this table with the given word frequencies"""
+        table = self._copy()
+        table._frequencies = array("q", frequencies)
+        if len(table._frequencies) != len(self):
+            raise ValueError(
+                f"Expected {len(self)} frequencies; got {len(table._frequencies)}"
+            )
+        return table
+
+    def fingerprint(self) -> str:
+        """Hex digest of the table's contents, identifying it in cache keys"""
+        h = hashlib.blake2b(digest_size=16)
+        for column in [self._surfaces, self._id_prefixes, self._prons]:
+            h.update("\0".join(column).encode("utf-8"))
+            h.update(b"\1")
+        if self._simplified is not None:
+            h.update(
+                "\0".join(
+                    s if s is not None else "\1" for s in self._simplified
+                ).encode("utf-8")
+            )
+        h.update(b"\1")
+        h.update(self._english)
+        for column in [self._english_ends, self._id_numbers, self._frequencies]:
+            h.update(column.tobytes())
+        return h.hexdigest()
+
+    def sorted(self, key: Callable[[WordRow], Any]) -> "WordTable":
+        """Return a copy of this table sorted (stably) by key"""
+        order = sorted(range(len(self)), key=lambda i: key(WordRow(self, i)))
+        table = self._copy()
+        for name in self._ROW_COLUMNS:
+            column = getattr(self, name)
+            if column is not None:
+                reordered = [column[i] for i in order]
+                if isinstance(column, array):
+                    reordered = array(column.typecode, reordered)
+                elif isinstance(column, memoryview):
+                    reordered = array(column.format, reordered)
+                setattr(table, name, reordered)
+        return table
+
+
 # character -> {pronunciation-> [words that use that character with that pronunciation]}
-Char2Pron2Words = MutableMapping[str, MutableMapping[str, MutableSequence[Word]]]
+Char2Pron2Words = MutableMapping[
+    str, MutableMapping[str, MutableSequence[Union[Word, WordRow]]]
+]
 
 StringToStrings = Mapping[str, Collection[str]]
+
+
+class VocabIndex(Mapping[str, Mapping[str, List[WordRow]]]):
+    """Read-only {char -> {pron -> [words that use that character with that
+    pronunciation]}} index over a WordTable. Only the positions of the words in the
+    table are stored; word lists are built when a character is looked up. Chars,
+    prons and words are in the order they were first found in the table."""
+
+    def __init__(
+        self, words: WordTable, positions: Mapping[str, Mapping[str, Sequence[int]]]
+    ):
+        self.words = words
+        self._positions = positions
+
+    def __getitem__(self, char: str) -> Dict[str, List[WordRow]]:
+        words = self.words
+        return {
+            pron: [WordRow(words, i) for i in positions]
+            for pron, positions in self._positions[char].items()
+        }
+
+    def __contains__(self, char: object) -> bool:
+        return char in self._positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __repr__(self) -> str:
+        return f"<VocabIndex of {len(self)} chars over {self.words!r}>"
+
+    def prons(self, char: str) -> Collection[str]:
+        """The pronunciations found for char, without building its word lists"""
+        return self._positions.get(char, {}).keys()
+
+    def with_frequencies(
+        self, frequencies: Iterable[int], key: Callable[[WordRow], Any]
+    ) -> "VocabIndex":
+        """Return a copy of this index over a copy of its table with the given word
+        frequencies, with each word list sorted (stably) by key. The alignments of
+        the words are reused as is; neither this index nor its table is modified."""
+        words = self.words.with_frequencies(frequencies)
+        rank = array("q", bytes(8 * len(words)))
+        for r, i in enumerate(
+            sorted(range(len(words)), key=lambda i: key(WordRow(words, i)))
+        ):
+            rank[i] = r
+        positions = {
+            char: {
+                pron: array("I", sorted(positions, key=rank.__getitem__))
+                for pron, positions in pron_to_positions.items()
+            }
+            for char, pron_to_positions in self._positions.items()
+        }
+        return VocabIndex(words, positions)
@@ -0,0 +1,127 @@
+# Graph of character variants (simplified/traditional forms, semantic variants,
+# shinjitai, etc.) collected from several sources. Unihan and ytenx only list the
+# immediate variants of each character, so characters linked by any chain of
+# variant relations are grouped into components with a union-find, and each
+# component gets a canonical character. Equivalence checks and canonical lookups are
+# then single dictionary lookups.
+
+from collections import defaultdict
+from enum import IntFlag
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+
+class VariantType(IntFlag):
+    # the variant is the simplified form of the character
+    SIMPLIFIED = 1
+    # the variant is the traditional form of the character
+    TRADITIONAL = 2
+    # the two characters have (partially) the same meaning
+    SEMANTIC = 4
+    # the two characters are the same abstract character, differing only in glyph
+    Z = 8
+    # one of the characters is a Unicode compatibility ideograph of the other
+    COMPATIBILITY = 16
+    # the variant is the Japanese shinjitai form of the character
+    SHINJITAI = 32
+    # any other kind of variant
+    OTHER = 64
+
+
+# variants which are merely other forms of the same character, with the same
+# readings, as opposed to characters with related meanings
+FORM_VARIANTS = (
+    VariantType.SIMPLIFIED
+    | VariantType.TRADITIONAL
+    | VariantType.Z
+    | VariantType.COMPATIBILITY
+    | VariantType.SHINJITAI
+)
+
+Edge = Tuple[str, str, VariantType]
+
+
+def _find(parent: Dict[str, str], char: str) -> str:
+    # path halving
+    while (p := parent[char]) != char:
+        parent[char] = char = parent[p]
+    return char
+
+
+class VariantGraph:
+    """Character variant relations. Edges are directed as in the source data (char
+    -> variant, with the edge's type describing the variant); components ignore
+    edge direction and type."""
+
+    def __init__(self, edges: Iterable[Edge] = ()):
+        # char -> {variant -> types}
+        self._edges: Dict[str, Dict[str, VariantType]] = defaultdict(dict)
+        parent: Dict[str, str] = {}
+        for char, variant, type in edges:
+            # Unihan lists some characters as variants of themselves
+            if char == variant:
+                continue
+            variants = self._edges[char]
+            variants[variant] = variants.get(variant, VariantType(0)) | type
+            root_1 = _find(parent, parent.setdefault(char, char))
+            root_2 = _find(parent, parent.setdefault(variant, variant))
+            if root_1 != root_2:
+                parent[root_2] = root_1
+        self._edges = dict(self._edges)
+
+        root_to_members: Dict[str, List[str]] = defaultdict(list)
+        for char in parent:
+            root_to_members[_find(parent, char)].append(char)
+        self.__index_components(
+            "".join(sorted(members, key=ord)) for members in root_to_members.values()
+        )
+
+    def __index_components(self, components: Iterable[str]) -> None:
+        # char -> all characters in its component, sorted by codepoint; components
+        # are shared between their members
+        self._component: Dict[str, str] = {}
+        for component in components:
+            for char in component:
+                self._component[char] = component
+
+    def canonical(self, char: str) -> str:
+        """The representative of char's component (the character with the lowest
+        codepoint); characters without variants are their own representative"""
+        return self._component.get(char, char)[0]
+
+    def equivalent(self, char_1: str, char_2: str) -> bool:
+        """True if the characters are linked by any chain of variant relations"""
+        return char_1 == char_2 or self.canonical(char_1) == self.canonical(char_2)
+
+    def component(self, char: str) -> str:
+        """All characters equivalent to char (including char), sorted by codepoint"""
+        return self._component.get(char, char)
+
+    def variants(self, char: str) -> Mapping[str, VariantType]:
+        """The variants listed for char in the source data, with their types"""
+        return self._edges.get(char, {})
+
+    def components(self) -> List[str]:
+        """All components with more than one character"""
+        return list({id(c): c for c in self._component.values()}.values())
+
+    def __contains__(self, char: object) -> bool:
+        return char in self._component
+
+    def __len__(self) -> int:
+        """The number of characters with variants"""
+        return len(self._component)
+
+    def __getstate__(self):
+        # store each component once as a string instead of once per member
+        edges = {
+            char: {variant: int(types) for variant, types in variants.items()}
+            for char, variants in self._edges.items()
+        }
+        return {"edges": edges, "components": self.components()}
+
+    def __setstate__(self, state) -> None:
+        self._edges = {
+            char: {variant: VariantType(types) for variant, types in variants.items()}
+            for char, variants in state["edges"].items()
+        }
+        self.__index_components(state["components"])
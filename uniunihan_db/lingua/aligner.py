@@ -1,5 +1,7 @@
 import abc
-from typing import Set, Tuple
+import hashlib
+import inspect
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import jaconv
 
@@ -17,6 +19,49 @@ class Aligner(metaclass=abc.ABCMeta):
         language-dependent."""
         raise NotImplementedError
 
+    def align_many(
+        self, pairs: Iterable[Tuple[str, str]]
+    ) -> List[Tuple[Tuple[str, str], ...]]:
+        """Align each (surface, phonetic_spelling) pair. The alignments are returned
+        as sorted tuples, which have a stable order and are cheaper to send between
+        processes than sets."""
+        return [tuple(sorted(self.align(s, p))) for s, p in pairs]
+
+    def fingerprint(self) -> str:
+        """Hex digest of the aligner's code and configuration. Aligners with the same
+        fingerprint produce the same alignments, so it is used in cache keys."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.code_fingerprint().encode("utf-8"))
+        h.update(repr(self._config()).encode("utf-8"))
+        return h.hexdigest()
+
+    def code_fingerprint(self) -> str:
+        """Hex digest of the aligner's code only, ignoring its configuration"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{type(self).__module__}.{type(self).__qualname__}".encode("utf-8"))
+        h.update(inspect.getsource(type(self)).encode("utf-8"))
+        return h.hexdigest()
+
+    def _config(self) -> Any:
+        """Any configuration which affects the aligner's output"""
+        return None
+
+    def char_config(self, char: str) -> Any:
+        """The part of the configuration which affects the alignment of words
+        containing char, or None if there is none. The alignment of a word must only
+        depend on the aligner's code and the char_config of each char in its
+        surface, so that alignments can be reused when other chars' configuration
+        changes."""
+        return None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Aligner):
+            return NotImplemented
+        return type(self) is type(other) and self.fingerprint() == other.fingerprint()
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint())
+
 
 class ZhAligner(Aligner):
     """Align hanzi with space-separated syllabic pronunciations (i.e. pinyin).
@@ -98,73 +143,111 @@ class JpAligner(Aligner):
     def __init__(self, char_to_prons: StringToStrings):
         self.char_to_prons = char_to_prons
         self.sokuon = "ッ"
+        # char -> (whether char is kana, readings); built on first use
+        self.__readings_cache: Dict[str, Tuple[bool, _Readings]] = {}
+        self.__fingerprint: Optional[str] = None
 
     def align(self, surface: str, phonetic_spelling: str) -> Set[Tuple[str, str]]:
-        """Recursively construct a set of (char, pronunciation) mappings for the
-        characters in surface and the pronunciation in phonetic_spelling. All returned
+        """Construct a set of (char, pronunciation) mappings for the characters in
+        surface and the pronunciation in phonetic_spelling. All returned
         pronunciations are in katakana."""
 
         # Convert all hiragana to katakana for matching purposes
         alignable_surface = jaconv.hira2kata(surface)
         alignable_pron = jaconv.hira2kata(phonetic_spelling)
 
-        return self.__align(
-            alignable_surface,
-            alignable_pron,
-        )
-
-    def __align(self, surface, word_pron):
-        if surface:
-            char = surface[0]
+        return self.__align(alignable_surface, alignable_pron, 0, 0, set()) or set()
+
+    def fingerprint(self) -> str:
+        # like the readings cache, this assumes that char_to_prons is not modified
+        if self.__fingerprint is None:
+            self.__fingerprint = super().fingerprint()
+        return self.__fingerprint
+
+    def _config(self) -> Any:
+        return sorted((c, sorted(prons)) for c, prons in self.char_to_prons.items())
+
+    def char_config(self, char: str) -> Any:
+        # surfaces are converted to katakana before alignment, and katakana are
+        # aligned with themselves
+        char = jaconv.hira2kata(char)
+        if JpAligner.KATAKANA_LOW <= ord(char) <= JpAligner.KATAKANA_HIGH:
+            return None
+        return tuple(sorted(self.char_to_prons.get(char, []))) or None
+
+    def __readings(self, char: str) -> Tuple[bool, "_Readings"]:
+        """Returns whether char is kana, and its pronunciations in the order they
+        should be tried, each with the ways it can be spelled within a word"""
+        if not (entry := self.__readings_cache.get(char)):
             # if surface char is katakana, align with identical katakana in
-            # pronunciation; matching_kana will signal not to store the useless
+            # pronunciation; the kana flag will signal not to store the useless
             # alignment
             codepoint = ord(char)
             if JpAligner.KATAKANA_LOW <= codepoint <= JpAligner.KATAKANA_HIGH:
-                prons = [char]
-                matching_kana = True
+                entry = (True, ((char, self.__spellings(char)),))
             else:
                 # Otherwise, we have kanji. Go through the pronunciations we have for
-                # the character, in reverse order to get dakuon spellings first,
+                # the character in reverse order to get dakuon spellings first,
                 # providing more exact pronunciations for characters with matching
-                # pronunciations with and without dakuon (e.g. a character with listed
-                # pronunciations ハン and バン)
+                # pronunciations with and without dakuon (e.g. a character with
+                # listed pronunciations ハン and バン)
                 prons = sorted(self.char_to_prons.get(char, []), reverse=True)
-                matching_kana = False
-            for pron in prons:
-                matched_pron = None
-                if word_pron.startswith(pron):
-                    matched_pron = pron
-                # test for sokuon, e.g. little っ
-                elif (
-                    word_pron.startswith(pron[:-1] + self.sokuon)
-                    and pron[-1] not in JpAligner.NO_SOKUON_ALLOWED
-                ):
-                    matched_pron = pron[:-1] + self.sokuon
-                # test for rendaku, e.g. added tenten
-                elif pron[0] in JpAligner.RENDAKU.keys() and word_pron.startswith(
-                    JpAligner.RENDAKU[pron[0]] + pron[1:]
-                ):
-                    matched_pron = JpAligner.RENDAKU[pron[0]] + pron[1:]
-                # test for renpandaku, e.g. added maru (I made that word up)
-                elif pron[0] in JpAligner.RENPANDAKU.keys() and word_pron.startswith(
-                    JpAligner.RENPANDAKU[pron[0]] + pron[1:]
-                ):
-                    matched_pron = JpAligner.RENPANDAKU[pron[0]] + pron[1:]
-                if matched_pron:
-                    # base case: this character must map to this pronunciation
-                    if len(word_pron) == len(matched_pron):
-                        if matching_kana:
-                            return set()
-                        return {(char, pron)}
-                    # recurse to see if this pronunciation gives a viable alignment
-                    if alignment := self.__align(
-                        surface[1:], word_pron.removeprefix(matched_pron)
-                    ):
-                        # if successful and match is a kanji, add this char->pron
-                        # mapping to the alignment and return it
-                        if not matching_kana:
-                            alignment.add((char, pron))
-                        return alignment
+                # an empty pronunciation cannot be aligned with anything
+                entry = (False, tuple((p, self.__spellings(p)) for p in prons if p))
+            self.__readings_cache[char] = entry
+        return entry
+
+    def __spellings(self, pron: str) -> Tuple[str, ...]:
+        """The ways pron can be spelled within a word, in order of preference; only
+        the first one found in the word is tried"""
+        spellings = [pron]
+        # sokuon, e.g. little っ
+        if pron[-1] not in JpAligner.NO_SOKUON_ALLOWED:
+            spellings.append(pron[:-1] + self.sokuon)
+        # rendaku, e.g. added tenten
+        if pron[0] in JpAligner.RENDAKU:
+            spellings.append(JpAligner.RENDAKU[pron[0]] + pron[1:])
+        # renpandaku, e.g. added maru (I made that word up)
+        if pron[0] in JpAligner.RENPANDAKU:
+            spellings.append(JpAligner.RENPANDAKU[pron[0]] + pron[1:])
+        return tuple(spellings)
+
+    def __align(
+        self, surface: str, word_pron: str, i: int, j: int, failed: Set[Tuple[int, int]]
+    ) -> Optional[Set[Tuple[str, str]]]:
+        """Align surface[i:] with word_pron[j:], taking the first alignment found
+        when trying the characters' pronunciations in order. Positions (i, j) which
+        could not be aligned are added to failed, so that no position is explored
+        twice."""
+        if i == len(surface):
+            return None
+        char = surface[i]
+        is_kana, readings = self.__readings(char)
+        for pron, spellings in readings:
+            for spelling in spellings:
+                if word_pron.startswith(spelling, j):
+                    break
+            else:
+                continue
+            end = j + len(spelling)
+            # base case: this character must map to this pronunciation
+            if end == len(word_pron):
+                if is_kana:
+                    return None
+                return {(char, pron)}
+            if (i + 1, end) in failed:
+                continue
+            # recurse to see if this pronunciation gives a viable alignment
+            if alignment := self.__align(surface, word_pron, i + 1, end, failed):
+                # if successful and match is a kanji, add this char->pron
+                # mapping to the alignment and return it
+                if not is_kana:
+                    alignment.add((char, pron))
+                return alignment
+            failed.add((i + 1, end))
         # No alignment could be found
-        return set()
+        return None
+
+
+# (pronunciation, spellings of the pronunciation) in the order they should be tried
+_Readings = Tuple[Tuple[str, Tuple[str, ...]], ...]
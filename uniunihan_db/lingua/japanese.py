@@ -2,9 +2,12 @@
 # languages into mono- or polymoraic morphemes.
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional
+from functools import cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+import jaconv
 
 
 class Romanization(Enum):
@@ -166,53 +169,127 @@ NIHONSIKI_COMPOUND.update(
 )
 
 
-def alpha_to_kana(word: str, romanization: Romanization = Romanization.HEPBURN) -> str:
-    """Convert romanized Japanese pronunciation into kana
-    Currently only supports hiragana and Hepburn romanization used in Unihan database"""
-    word = word.lower().strip()
-    for k, v in HEPBURN_DIGRAPHS.items():
-        word = word.replace(k, v)
-    for k, v in HEPBURN_50.items():
-        word = word.replace(k, v)
-    for k, v in HEPBURN_GLIDE.items():
-        word = word.replace(k, v)
-    for k, v in HEPBURN_SEMIVOWELS.items():
-        word = word.replace(k, v)
-    for k, v in VOWELS.items():
-        word = word.replace(k, v)
+class Transducer:
+    """Rewrites strings in one left-to-right pass: at each position, the longest key
+    of the table starting there is replaced with its value, and characters which do
+    not start any key are copied unchanged. The keys are compiled into a trie."""
+
+    def __init__(self, table: Mapping[str, str]):
+        # nested {char -> node}; a node's output, if a key ends there, is stored
+        # under None
+        self._root: Dict[Optional[str], Any] = {}
+        for key, value in table.items():
+            node = self._root
+            for c in key:
+                node = node.setdefault(c, {})
+            node[None] = value
+
+    def __call__(self, s: str) -> str:
+        root = self._root
+        out = []
+        i = 0
+        n = len(s)
+        while i < n:
+            node = root
+            end = i + 1
+            output = s[i]
+            j = i
+            while j < n and (node := node.get(s[j])) is not None:
+                j += 1
+                if None in node:
+                    end = j
+                    output = node[None]
+            out.append(output)
+            i = end
+        return "".join(out)
+
+
+# consonants which are doubled to spell a geminate (small tsu)
+GEMINATE_CONSONANTS = "kstph"
+
+
+@cache
+def __alpha_to_kana_transducer(romanization: Romanization) -> Transducer:
+    if romanization is Romanization.HEPBURN:
+        tables = [HEPBURN_DIGRAPHS, HEPBURN_50, HEPBURN_GLIDE, HEPBURN_SEMIVOWELS]
+    else:
+        tables = [NIHONSIKI_TRIGRAPH, NIHONSIKI_COMPOUND]
+    table = {}
+    for t in [*tables, VOWELS]:
+        for alpha, kana in t.items():
+            table.setdefault(alpha, kana)
     # other final nasal orthography
-    word = word.replace("n", "ん")
-    word = word.replace("m", "ん")
-    word = word.replace("'", "")
-    word = word.replace("-", "")
-    # geminates
-    word = word.replace("k", "っ")
-    word = word.replace("s", "っ")
-    word = word.replace("t", "っ")
-    word = word.replace("p", "っ")
-    word = word.replace("h", "っ")
-    return word
+    table.update({"n": "ん", "m": "ん", "'": "", "-": ""})
+    # geminates; a consonant which does not start a syllable
+    table.update({c: "っ" for c in GEMINATE_CONSONANTS})
+    return Transducer(table)
+
+
+@cache
+def __kana_to_alpha_transducer(romanization: Romanization) -> Transducer:
+    if romanization is Romanization.HEPBURN:
+        tables = [HEPBURN_DIGRAPHS, HEPBURN_GLIDE, HEPBURN_50, HEPBURN_SEMIVOWELS]
+    else:
+        tables = [NIHONSIKI_TRIGRAPH, NIHONSIKI_COMPOUND]
+    table: Dict[str, str] = {}
+    # where several spellings have the same kana, the first one is used
+    for t in [*tables, VOWELS]:
+        for alpha, kana in t.items():
+            table.setdefault(kana, alpha)
+    syllables = dict(table)
+    table["ん"] = "n"
+    for kana, alpha in syllables.items():
+        # Personally, I type "nn" in IME's, but "n'" is easier to read,
+        # so we'll go with that
+        if alpha[0] in "aiueoy":
+            table["ん" + kana] = "n'" + alpha
+        # geminates
+        if alpha[0] in GEMINATE_CONSONANTS:
+            table["っ" + kana] = alpha[0] + alpha
+        elif alpha.startswith("ch"):
+            table["っ" + kana] = "t" + alpha
+    return Transducer(table)
+
+
+def alpha_to_kana(word: str, romanization: Romanization = Romanization.HEPBURN) -> str:
+    """Convert romanized Japanese pronunciation (Hepburn as used in the Unihan
+    database, or IME) into hiragana"""
+    return __alpha_to_kana_transducer(romanization)(word.lower().strip())
 
 
 def kana_to_alpha(word: str, romanization: Romanization = Romanization.IME) -> str:
-    """Romanize kana input; currently only supports IME"""
-    for k, v in NIHONSIKI_TRIGRAPH.items():
-        word = word.replace(v, k)
-    for k, v in NIHONSIKI_COMPOUND.items():
-        word = word.replace(v, k)
-    for k, v in VOWELS.items():
-        word = word.replace(v, k)
-    # Personally, I type "nn" in IME's, but "n'" is easier to read,
-    # so we'll go with that
-    word = re.sub("ん(?=[aiueoy])", "n'", word)
-    word = word.replace("ん", "n")
-    # geminates
-    word = word.replace("っk", "kk")
-    word = word.replace("っs", "ss")
-    word = word.replace("っt", "tt")
-    word = word.replace("っp", "pp")
-    word = word.replace("っh", "hh")
-    return word
+    """Romanize hiragana input (Hepburn without macrons, or IME)"""
+    return __kana_to_alpha_transducer(romanization)(word)
+
+
+def alpha_to_kana_many(
+    words: Iterable[str], romanization: Romanization = Romanization.HEPBURN
+) -> List[str]:
+    """alpha_to_kana for a whole list of words; repeated words are only converted
+    once"""
+    return __convert_many(words, alpha_to_kana, romanization)
+
+
+def kana_to_alpha_many(
+    words: Iterable[str], romanization: Romanization = Romanization.IME
+) -> List[str]:
+    """kana_to_alpha for a whole list of words; repeated words are only converted
+    once"""
+    return __convert_many(words, kana_to_alpha, romanization)
+
+
+def __convert_many(
+    words: Iterable[str],
+    convert: Callable[[str, Romanization], str],
+    romanization: Romanization,
+) -> List[str]:
+    converted: Dict[str, str] = {}
+    result = []
+    for w in words:
+        if (c := converted.get(w)) is None:
+            c = converted[w] = convert(w, romanization)
+        result.append(c)
+    return result
 
 
 def alpha_to_alpha(
@@ -226,18 +303,23 @@ def alpha_to_alpha(
     return kana_to_alpha(kana, romanization=output_romanization)
 
 
-@dataclass
+@dataclass(frozen=True)
 class HanSyllable:
+    # instances are shared between callers of parse_han_syllable, so they are
+    # immutable
     surface: str
     onset: str
     semivowel: str
     vowel: str
     coda: str
     epenthetic_vowel: str
+    nucleus: str = field(init=False)
+    rhyme: str = field(init=False)
 
     def __post_init__(self) -> None:
-        self.nucleus = self.semivowel + self.vowel
-        self.rhyme = self.nucleus + self.coda
+        nucleus = self.semivowel + self.vowel
+        object.__setattr__(self, "nucleus", nucleus)
+        object.__setattr__(self, "rhyme", nucleus + self.coda)
         # TODO: provide morae count (1,2 or 3)
 
 
@@ -248,11 +330,53 @@ HAN_SYLLABLE_RE = (
 )
 
 
+# on'yomi are built from these parts; combined, they produce all common on'yomi
+# (and many nonexistent ones, which are harmless)
+HAN_ONSETS = ["", *"kgsztdnhpbmr"]
+HAN_SEMIVOWELS = ["", "y", "w"]
+HAN_VOWELS = ["a", "i", "u", "e", "o", "ai", "ui", "ei", "ou", "uu"]
+HAN_CODAS = ["", "n", "ku", "ki", "tu", "ti"]
+
+
 def parse_han_syllable(s: str) -> Optional[HanSyllable]:
     """Parse an IME-romanized han syllable on'yomi into its constituent parts.
     This does not attempt to prevent any nonsense syllables from being parsed, but if
-    the input cannot be parsed then None will be returned."""
+    the input cannot be parsed then None will be returned. Parses of all common
+    on'yomi are precomputed, and the same HanSyllable is returned for each of them
+    every time."""
     s = s.strip().lower()
+    if (syllable := __parsed_han_syllables().get(s)) is not None:
+        return syllable
+    return __parse_han_syllable(s)
+
+
+def parse_han_syllables(syllables: Iterable[str]) -> Dict[str, Optional[HanSyllable]]:
+    """Parse many syllables at once, e.g. all on'yomi in a pipeline's char_data.
+    Returns {syllable -> parse}. Syllables may also be written in kana, in which case
+    they are romanized before parsing."""
+    parses: Dict[str, Optional[HanSyllable]] = {}
+    for s in syllables:
+        if s not in parses:
+            parses[s] = parse_han_syllable(kana_to_alpha(jaconv.kata2hira(s)))
+    return parses
+
+
+@cache
+def __parsed_han_syllables() -> Dict[str, HanSyllable]:
+    """{syllable -> parse} for every combination of the on'yomi parts"""
+    parses = {}
+    for onset in HAN_ONSETS:
+        for semivowel in HAN_SEMIVOWELS:
+            for vowel in HAN_VOWELS:
+                for coda in HAN_CODAS:
+                    s = onset + semivowel + vowel + coda
+                    if (syllable := __parse_han_syllable(s)) is not None:
+                        parses[s] = syllable
+    return parses
+
+
+def __parse_han_syllable(s: str) -> Optional[HanSyllable]:
+    # s is already stripped and lowercase
     match = re.match(HAN_SYLLABLE_RE, s)
     if match is None:
         return None
@@ -1,9 +1,11 @@
 import re
-from dataclasses import dataclass
-from typing import Optional, Tuple
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import cache
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
-@dataclass
+@dataclass(frozen=True)
 class Syllable:
     """
     The structure of this class follows the traditional classification of Mandarin
@@ -21,6 +23,7 @@ class Syllable:
     `tone`: an integer between 0 and 4
     `tone_stripped`: same as the original spelling but with the tone diacritic removed
     `rhyme`: phonetic transcription of the glide, nucleus and final
+    Instances are shared between callers of parse_syllable, so they are immutable.
     """
 
     surface: str
@@ -30,20 +33,33 @@ class Syllable:
     final: str
     tone: int
     tone_stripped: str
+    rhyme: str = field(init=False)
 
     def __post_init__(self):
-        self.rhyme = self.glide + self.nucleus + self.final
+        object.__setattr__(self, "rhyme", self.glide + self.nucleus + self.final)
+
+
+class ToneFormat(Enum):
+    """How the tones of pinyin syllables are written"""
+
+    # diacritics on the vowels, e.g. hǎo
+    MARKS = "marks"
+    # a number after each syllable, e.g. hao3
+    NUMBERS = "numbers"
+
+
+PINYIN_VOWELS = [
+    "aāáǎà",
+    "eēéěè",
+    "iīíǐì",
+    "oōóǒò",
+    "uūúǔù",
+    "üǖǘǚǜ",
+]
 
 
 def __setup_pinyin_parsing():
-    pinyin_vowels = [
-        "aāáǎà",
-        "eēéěè",
-        "iīíǐì",
-        "oōóǒò",
-        "uūúǔù",
-        "üǖǘǚǜ",
-    ]
+    pinyin_vowels = PINYIN_VOWELS
     vowel_list = "".join(pinyin_vowels)
     # integer tone to [chars with diacritic]
     tone_matchers = {}
@@ -68,21 +84,69 @@ SYLLABLE_RE = (
 )
 
 
+# diacritic vowel -> tone
+__TONE_MARK_TONES = {
+    vowels[tone]: tone for vowels in PINYIN_VOWELS for tone in range(1, 5)
+}
+# str.translate table replacing diacritic vowels with plain ones
+__STRIP_TONE_MARKS = str.maketrans(
+    {vowels[tone]: vowels[0] for vowels in PINYIN_VOWELS for tone in range(1, 5)}
+)
+
+
 def strip_tone(s: str) -> Tuple[str, int]:
-    tone = 0
-    for t, matcher in TONE_MATCHERS.items():
-        if re.search(matcher, s):
-            tone = t
-    for no_tone, with_tone in TONE_REMOVERS.items():
-        s = re.sub(with_tone, no_tone, s)
-    return s, tone
+    """Remove the tone marks from s. Returns the result and the tone of s (0 if it
+    has no marks, or the highest tone marked if it has several)."""
+    stripped = s.translate(__STRIP_TONE_MARKS)
+    if stripped == s:
+        return s, 0
+    return stripped, max(__TONE_MARK_TONES.get(c, 0) for c in s)
 
 
 def parse_syllable(s: str) -> Optional[Syllable]:
     """Parse a pinyin-romanized syllable into its constituent parts. This does not
     attempt to prevent any nonsense syllables from being parsed, but if the input
-    cannot be parsed then None will be returned."""
+    cannot be parsed then None will be returned. Parses of all standard syllables
+    are precomputed, and the same Syllable is returned for each of them every
+    time."""
     s = s.strip().lower()
+    if (syllable := __parsed_syllables().get(s)) is not None:
+        return syllable
+    return __parse_syllable(s)
+
+
+def parse_syllables(
+    syllables: Iterable[str], tone_format: ToneFormat = ToneFormat.MARKS
+) -> Dict[str, Optional[Syllable]]:
+    """Parse many syllables at once, e.g. all pronunciations in a pipeline's
+    char_data. Returns {syllable -> parse}; with ToneFormat.NUMBERS, the syllables
+    are numbered pinyin and are converted to tone marks before parsing."""
+    parses: Dict[str, Optional[Syllable]] = {}
+    for s in syllables:
+        if s not in parses:
+            if tone_format is ToneFormat.NUMBERS:
+                # CC-CEDICT spells ü as u:
+                marked = pinyin_numbers_to_tone_marks(s.replace("u:", "ü"))
+                parses[s] = parse_syllable(marked)
+            else:
+                parses[s] = parse_syllable(s)
+    return parses
+
+
+@cache
+def __parsed_syllables() -> Dict[str, Syllable]:
+    """{syllable -> parse} for every lowercase syllable in the conversion tables, in
+    every tone"""
+    to_marks, _ = __syllable_tables()
+    parses = {}
+    for s in set(to_marks.values()):
+        if (syllable := __parse_syllable(s)) is not None:
+            parses[s] = syllable
+    return parses
+
+
+def __parse_syllable(s: str) -> Optional[Syllable]:
+    # s is already stripped and lowercase
     surface = s
 
     # determine the tone and strip the diacritic first to simplify later processing
@@ -140,14 +204,15 @@ def parse_syllable(s: str) -> Optional[Syllable]:
     )
 
 
+def __tone_marks_to_number(syllable: str) -> str:
+    s, tone = strip_tone(syllable)
+    return f"{s}{'' if tone == 0 else tone}"
+
+
 def pinyin_tone_marks_to_numbers(s: str) -> str:
     """Converts shén to shen2, etc."""
-    words = s.split()
-    new_words = []
-    for w in words:
-        s, tone = strip_tone(w)
-        new_words.append(f"{s}{'' if tone == 0 else tone}")
-    return " ".join(new_words)
+    _, table = __syllable_tables()
+    return " ".join([table.get(w) or __tone_marks_to_number(w) for w in s.split()])
 
 
 # Courtesy of https://stackoverflow.com/a/21488584/474819
@@ -180,11 +245,56 @@ def __convertPinyinCallback(m: re.Match[str]) -> str:
     return r + m.group(2)
 
 
+__NUMBERED_VOWELS = re.compile(r"([aeiouüvÜ]{1,3})(n?g?r?)([012345])", re.IGNORECASE)
+
+
+def __tone_numbers_to_marks(s: str) -> str:
+    return __NUMBERED_VOWELS.sub(__convertPinyinCallback, s)
+
+
 def pinyin_numbers_to_tone_marks(s: str) -> str:
     """Converts shen2 to shén, etc."""
-    return re.sub(
-        r"([aeiouüvÜ]{1,3})(n?g?r?)([012345])",
-        __convertPinyinCallback,
-        s,
-        flags=re.IGNORECASE,
-    )
+    table, _ = __syllable_tables()
+    # anything that is not a lowercase syllable from the table (capitalized names,
+    # punctuation, v for ü) is converted with the regular expression
+    return " ".join([table.get(w) or __tone_numbers_to_marks(w) for w in s.split(" ")])
+
+
+# pinyin finals as spelled after an onset; combined with every onset and with no
+# onset, they produce all valid syllables (and many invalid ones, which are harmless)
+FINALS = (
+    "a ai an ang ao e ei en eng er i ia ian iang iao ie in ing iong iu o ong ou "
+    "u ua uai uan uang ue ui un uo ü üan üe ün"
+).split()
+
+
+@cache
+def __syllable_tables() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """({numbered syllable -> marked syllable}, {marked syllable -> numbered
+    syllable}) for every lowercase syllable, including erhua syllables"""
+    to_marks = {}
+    to_numbers = {}
+    for onset in ["", "zh", "ch", "sh", *ONSETS]:
+        for final in FINALS:
+            for syllable in [onset + final, onset + final + "r"]:
+                for tone in range(6):
+                    marked = __tone_numbers_to_marks(f"{syllable}{tone}")
+                    to_marks[f"{syllable}{tone}"] = marked
+                    to_numbers[marked] = __tone_marks_to_number(marked)
+    return to_marks, to_numbers
+
+
+def convert_many(pinyin: Iterable[str], to: ToneFormat) -> List[str]:
+    """Convert each space-separated pinyin string to the given tone format. Repeated
+    strings are only converted once."""
+    if to is ToneFormat.MARKS:
+        convert = pinyin_numbers_to_tone_marks
+    else:
+        convert = pinyin_tone_marks_to_numbers
+    converted: Dict[str, str] = {}
+    result = []
+    for s in pinyin:
+        if (c := converted.get(s)) is None:
+            c = converted[s] = convert(s)
+        result.append(c)
+    return result
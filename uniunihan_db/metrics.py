@@ -0,0 +1,376 @@
+# Performance metrics of pipeline runs. The runner, collate and build_book record
+# the wall time, CPU time, peak memory and number of items in and out of each
+# pipeline stage, dataset loader and render step, and write them to
+# data/generated/metrics/<run>.json. Running this module compares the latest run
+# with the stored baseline of the same command and arguments, and reports the steps
+# which got slower or used more memory:
+#
+#     python -m uniunihan_db.metrics [--threshold 0.1] [--save-baseline]
+#
+# Peak RSS is the high-water mark of the process when the step ended, so it only
+# grows during a run; it is only compared for the run as a whole, since an increase
+# in one step would show in all the later ones. The tracemalloc peak of each step is
+# only recorded when tracemalloc is tracing (e.g. `python -X tracemalloc -m ...`),
+# since tracing slows everything down.
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+from collections.abc import Sized
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from loguru import logger
+
+from uniunihan_db import profiling
+from uniunihan_db.data.paths import METRICS_DIR
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# steps whose differences are smaller than these are never regressions
+MIN_SECONDS = 0.05
+MIN_BYTES = 1 << 20
+
+
+@dataclass
+class Step:
+    name: str
+    # "run", "stage", "checkpoint", "dataset", "alignment", "collate" or "render"
+    kind: str
+    # seconds
+    wall: float = 0.0
+    # seconds of CPU time used by the process
+    cpu: float = 0.0
+    # seconds of CPU time used by child processes which finished during the step
+    # (e.g. alignment workers); the steps of pipelines run in worker processes are
+    # also recorded separately
+    child_cpu: float = 0.0
+    # bytes
+    peak_rss: Optional[int] = None
+    peak_traced: Optional[int] = None
+    items_in: Optional[int] = None
+    items_out: Optional[int] = None
+
+
+# steps recorded in this process, or None when not recording
+__steps: Optional[List[Step]] = None
+# running tracemalloc peaks of the enclosing steps
+__traced_peaks: List[int] = []
+
+
+def __child_cpu_time() -> float:
+    if resource is None:
+        return 0.0
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return children.ru_utime + children.ru_stime
+
+
+def __peak_rss() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count(items: Any) -> Optional[int]:
+    """len(items), or None if items has no length"""
+    return len(items) if isinstance(items, Sized) else None
+
+
+def start_recording() -> None:
+    """Record the steps measured in this process from now on"""
+    global __steps
+    __steps = []
+
+
+def stop_recording() -> None:
+    global __steps
+    __steps = None
+
+
+def is_recording() -> bool:
+    return __steps is not None
+
+
+def take_steps() -> List[Step]:
+    """Return the steps recorded so far and forget them"""
+    if __steps is None:
+        return []
+    steps = list(__steps)
+    __steps.clear()
+    return steps
+
+
+def add_steps(steps: Iterable[Step]) -> None:
+    """Record steps measured in another process"""
+    if __steps is not None:
+        __steps.extend(steps)
+
+
+@contextmanager
+def measure(name: str, kind: str, items_in: Optional[int] = None) -> Iterator[Step]:
+    """Measure the enclosed code as a step. The step is yielded so that its
+    items_out can be set; it is only recorded if the code does not raise and
+    recording has been started. Steps are also profiled if profiling is enabled
+    (see uniunihan_db.profiling)."""
+    step = Step(name, kind, items_in=items_in)
+    if __steps is None and not profiling.is_profiled(kind):
+        yield step
+        return
+
+    with profiling.profile(name, kind):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if __traced_peaks:
+                __traced_peaks[-1] = max(
+                    __traced_peaks[-1], tracemalloc.get_traced_memory()[1]
+                )
+            __traced_peaks.append(0)
+            tracemalloc.reset_peak()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        child_cpu_start = __child_cpu_time()
+        try:
+            yield step
+        finally:
+            step.wall = time.perf_counter() - start
+            step.cpu = time.process_time() - cpu_start
+            step.child_cpu = __child_cpu_time() - child_cpu_start
+            step.peak_rss = __peak_rss()
+            if tracing:
+                peak = __traced_peaks.pop()
+                if tracemalloc.is_tracing():
+                    peak = max(peak, tracemalloc.get_traced_memory()[1])
+                step.peak_traced = peak
+                if __traced_peaks:
+                    __traced_peaks[-1] = max(__traced_peaks[-1], peak)
+    if __steps is not None:
+        __steps.append(step)
+
+
+def measured(kind: str, name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator measuring each call of the function as a step, named after the
+    function by default; the step's items_out is the length of the result"""
+
+    def decorator(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with measure(name or fn.__name__, kind) as step:
+                result = fn(*args, **kwargs)
+                step.items_out = count(result)
+            return result
+
+        return wrapper  # type: ignore
+
+    return decorator
+
+
+def write_run(command: str, steps: Iterable[Step], started: datetime) -> Path:
+    """Write the steps of a run of command to the metrics directory"""
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    # microseconds, so that runs started in the same second are kept apart
+    path = METRICS_DIR / f"{started:%Y%m%d-%H%M%S-%f}-{command}.json"
+    run = {
+        "command": command,
+        "argv": sys.argv[1:],
+        "started": started.isoformat(timespec="seconds"),
+        "pid": os.getpid(),
+        "steps": [asdict(s) for s in steps],
+    }
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    return path
+
+
+@contextmanager
+def recording(command: str) -> Iterator[None]:
+    """Record the steps of the enclosed code as a run of command, measured as a
+    whole by a step of kind "run", and write them when it finishes"""
+    started = datetime.now()
+    start_recording()
+    try:
+        with measure(command, "run"):
+            yield
+        path = write_run(command, take_steps(), started)
+    finally:
+        stop_recording()
+    logger.info(f"Wrote performance metrics to {path}")
+
+
+class Regression(NamedTuple):
+    step: str
+    metric: str
+    baseline: float
+    latest: float
+
+    @property
+    def change(self) -> float:
+        return self.latest / self.baseline - 1 if self.baseline else float("inf")
+
+
+# metric -> minimum difference to report
+COMPARED_METRICS = {
+    "wall": MIN_SECONDS,
+    "cpu": MIN_SECONDS,
+    "child_cpu": MIN_SECONDS,
+    "peak_rss": MIN_BYTES,
+    "peak_traced": MIN_BYTES,
+}
+
+
+def baseline_path(command: str, argv: Sequence[str]) -> Path:
+    """Path of the baseline of runs of command with the arguments argv; runs with
+    other arguments (e.g. other languages) do not measure the same steps"""
+    digest = hashlib.blake2b(json.dumps(list(argv)).encode(), digest_size=4)
+    return METRICS_DIR / f"baseline-{command}-{digest.hexdigest()}.json"
+
+
+def latest_run(command: Optional[str] = None) -> Optional[Path]:
+    """Path of the most recent run (of command, if given)"""
+    runs = sorted(
+        p
+        for p in METRICS_DIR.glob("*.json")
+        if not p.name.startswith("baseline-")
+        and (command is None or p.stem.endswith(f"-{command}"))
+    )
+    return runs[-1] if runs else None
+
+
+def summarize(steps: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """{step name -> {metric -> value}}; steps with the same name (e.g. a dataset
+    loaded with different arguments) are combined, adding up their times and taking
+    the highest peaks. Peak RSS is only kept for steps of kind "run"."""
+    summary: Dict[str, Dict[str, float]] = {}
+    for step in steps:
+        totals = summary.setdefault(step["name"], {})
+        for metric in COMPARED_METRICS:
+            if (value := step.get(metric)) is None:
+                continue
+            if metric == "peak_rss" and step.get("kind") != "run":
+                continue
+            if metric.startswith("peak"):
+                totals[metric] = max(totals.get(metric, 0), value)
+            else:
+                totals[metric] = totals.get(metric, 0) + value
+    return summary
+
+
+def find_regressions(
+    baseline: Iterable[Dict[str, Any]],
+    latest: Iterable[Dict[str, Any]],
+    threshold: float,
+) -> List[Regression]:
+    """Metrics of steps in both runs which grew by more than threshold (a fraction
+    of the baseline's value) and by more than the metric's minimum difference"""
+    old = summarize(baseline)
+    regressions = []
+    for name, metrics in summarize(latest).items():
+        for metric, value in metrics.items():
+            if (old_value := old.get(name, {}).get(metric)) is None:
+                continue
+            if value - old_value > COMPARED_METRICS[metric] and value > old_value * (
+                1 + threshold
+            ):
+                regressions.append(Regression(name, metric, old_value, value))
+    return regressions
+
+
+def __format_value(metric: str, value: float) -> str:
+    if metric.startswith("peak"):
+        return f"{value / 2**20:.1f} MiB"
+    return f"{value:.3f}s"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare the performance metrics of the latest run with a baseline"
+    )
+    parser.add_argument(
+        "run", nargs="?", type=Path, help="metrics file (default: the latest run)"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="metrics file to compare with (default: the stored baseline of the "
+        "run's command and arguments)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="report metrics which grew by more than this fraction (default: 0.1)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the run as the baseline of its command and arguments",
+    )
+    args = parser.parse_args()
+
+    if (run_file := args.run or latest_run()) is None:
+        print(f"No runs recorded in {METRICS_DIR}", file=sys.stderr)
+        return 1
+    with open(run_file) as f:
+        run = json.load(f)
+    command, argv = run["command"], run.get("argv", [])
+    description = " ".join([command, *argv])
+
+    if args.save_baseline:
+        shutil.copyfile(run_file, baseline_path(command, argv))
+        print(f"Stored {run_file.name} as the baseline of {description}")
+        return 0
+
+    baseline_file = args.baseline or baseline_path(command, argv)
+    if not baseline_file.exists():
+        print(
+            f"No baseline for {description}; store one with --save-baseline",
+            file=sys.stderr,
+        )
+        return 1
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    if baseline.get("argv", []) != argv:
+        print(
+            f"{baseline_file.name} was run with other arguments than {run_file.name}",
+            file=sys.stderr,
+        )
+        return 1
+
+    print(f"Comparing {run_file.name} with {baseline_file.name}")
+    regressions = find_regressions(baseline["steps"], run["steps"], args.threshold)
+    for r in sorted(regressions, key=lambda r: r.change, reverse=True):
+        print(
+            f"{r.step:<40} {r.metric:<12} {__format_value(r.metric, r.baseline):>12}"
+            f" -> {__format_value(r.metric, r.latest):>12} ({r.change:+.0%})"
+        )
+    print(f"{len(regressions)} regressions above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
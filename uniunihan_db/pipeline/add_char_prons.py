@@ -2,12 +2,14 @@
 # Final structure: {char ->
 # {char data, 'prons': {pron1: {pron data}, pron2: {pron data}...}}}
 
-from typing import List
-
 from loguru import logger
 
-from uniunihan_db.data.datasets import get_cedict, get_unihan, index_vocab
-from uniunihan_db.data.types import ZhWord
+from uniunihan_db.data.datasets import (
+    UNIHAN_PIPELINE_FIELDS,
+    get_cedict,
+    get_unihan,
+    get_vocab_index,
+)
 from uniunihan_db.lingua.aligner import ZhAligner
 from uniunihan_db.lingua.mandarin import pinyin_tone_marks_to_numbers
 from uniunihan_db.util import format_json
@@ -45,27 +47,26 @@ def load_prons_zh(char_data):
     # pronunciation data. Supplement all pronunciations with with kHanyuPinlu
     # pronunciation frequency data.
 
-    word_list: List[ZhWord] = get_cedict()
-    char_to_pron_to_vocab = index_vocab(word_list, ZhAligner())
-    for c, pron_to_vocab in char_to_pron_to_vocab.items():
+    # the same index is used to find example vocabulary in select_vocab_zh
+    vocab_index = get_vocab_index(get_cedict(), ZhAligner())
+    for c in vocab_index:
         if c_data := char_data.get(c):
             prons = c_data.setdefault("prons", {})
-            for p, _ in pron_to_vocab.items():
+            vocab_prons = vocab_index.prons(c)
+            for p in vocab_prons:
                 # if p without its tone can be found among the other pronunciations,
                 # assume it's derivable and skip it. We could also try to find the
                 # full tones from another source, but during testing Unihan data did
                 # not yield anything.
-                if "5" in p and len(pron_to_vocab) > 1:
-                    other_p_no_tone = [
-                        pron[:-1] for pron in pron_to_vocab.keys() if pron != p
-                    ]
+                if "5" in p and len(vocab_prons) > 1:
+                    other_p_no_tone = [pron[:-1] for pron in vocab_prons if pron != p]
                     if p[:-1] in other_p_no_tone:
                         continue
                 prons[p] = {}
 
     # supplement with unihan pronunciations and pronunciation frequency
     # data where available
-    unihan = get_unihan()
+    unihan = get_unihan(fields=UNIHAN_PIPELINE_FIELDS)
     fallback_chars = set()
     no_pron_chars = set()
     for c, c_data in char_data.items():
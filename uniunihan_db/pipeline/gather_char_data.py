@@ -3,7 +3,12 @@
 
 from loguru import logger
 
-from uniunihan_db.data.datasets import get_historical_on_yomi, get_joyo, get_unihan
+from uniunihan_db.data.datasets import (
+    UNIHAN_PIPELINE_FIELDS,
+    get_historical_on_yomi,
+    get_joyo,
+    get_unihan,
+)
 from uniunihan_db.data.paths import CHUNOM_CHAR_FILE, KO_ED_CHARS_FILE
 from uniunihan_db.util import read_csv
 
@@ -22,7 +27,7 @@ def load_char_data_jp():
 
 
 def load_char_data_zh():
-    unihan = get_unihan()
+    unihan = get_unihan(fields=UNIHAN_PIPELINE_FIELDS)
     char_data = {}
     for char, info in unihan.items():
         if "kHKGlyph" in info:
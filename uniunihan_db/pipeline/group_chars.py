@@ -1,10 +1,18 @@
 # Step 3: Group characters based on their phonetic components,
 # and assign the resulting groups to larger groups based
 # on their pronunciation regularity.
+from functools import cache
+
 from loguru import logger
 
 from uniunihan_db.component.group import ComponentGroup
-from uniunihan_db.component.index import find_component_groups
+from uniunihan_db.component.index import (
+    CharToComponents,
+    ComponentGroupIndex,
+    GroupChanges,
+    find_component_groups,
+    index_components,
+)
 from uniunihan_db.data.datasets import get_phonetic_components
 
 # Note that 畑 was also invented independently
@@ -12,13 +20,19 @@ from uniunihan_db.data.datasets import get_phonetic_components
 KOKUJI = {"峠", "畑", "込", "匂", "枠"}
 
 
+@cache
+def __char_to_components() -> CharToComponents:
+    # shared by all languages
+    return index_components(get_phonetic_components())
+
+
 def group_chars_jp(char_data):
     comp_to_char = get_phonetic_components()
 
     char_to_prons = {c: c_data["prons"] for c, c_data in char_data.items()}
-    index = find_component_groups(char_to_prons, comp_to_char)
+    index = find_component_groups(char_to_prons, comp_to_char, __char_to_components())
     # 国字 do not have phonetic characters, but can be usefully learned together
-    index.groups.append(ComponentGroup("国字", {c: [] for c in KOKUJI}))
+    index.add_group(ComponentGroup("国字", {c: [] for c in KOKUJI}))
     index.no_comp_chars.difference_update(KOKUJI)
     index.log_diagnostics(logger)
 
@@ -29,12 +43,35 @@ def group_chars(char_data):
     comp_to_char = get_phonetic_components()
 
     char_to_prons = {c: c_data.get("prons", {}) for c, c_data in char_data.items()}
-    index = find_component_groups(char_to_prons, comp_to_char)
+    index = find_component_groups(char_to_prons, comp_to_char, __char_to_components())
     index.log_diagnostics(logger)
 
     return {"char_data": char_data, "group_index": index}
 
 
+def update_char_data(data, changes: GroupChanges):
+    """Update char_data after edits of the group index: removed characters are
+    deleted, and the other changed characters get the pronunciations of the index.
+    Unchanged pronunciations keep their data; new characters and pronunciations
+    start out empty, to be filled in by the later stages."""
+    index: ComponentGroupIndex = data["group_index"]
+    char_data = data["char_data"]
+
+    for c in changes.chars - index.char_to_prons.keys():
+        char_data.pop(c, None)
+    # in index order, so that new characters are added in the same order to both
+    for c, prons in index.char_to_prons.items():
+        if c not in changes.chars:
+            continue
+        c_data = char_data.setdefault(c, {})
+        old_prons = c_data.get("prons", {})
+        c_data["prons"] = {p: old_prons.get(p, {}) for p in prons}
+        # as after group_chars, the index shares the prons of char_data
+        index.char_to_prons[c] = c_data["prons"]
+
+    return data
+
+
 GROUP_CHARS = {
     "jp": group_chars_jp,
     "ko": group_chars,
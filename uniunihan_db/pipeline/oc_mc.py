@@ -1,55 +1,81 @@
 # Integrate Old and Middle Chinese data
 
+from typing import Any, Iterable, List, Mapping, Optional
+
 from loguru import logger
 
-from uniunihan_db.data.datasets import get_baxter_sagart, get_ytenx_rhymes
+from uniunihan_db.component.group import ComponentGroup
+from uniunihan_db.component.index import ComponentGroupIndex, GroupChanges
+from uniunihan_db.data.datasets import (
+    get_baxter_sagart,
+    get_variant_graph,
+    get_ytenx_rhymes,
+)
+from uniunihan_db.data.variants import FORM_VARIANTS, VariantGraph
 from uniunihan_db.util import format_json
 
 
-def integrate_historical_chinese(all_data):
-    """For now, we just add the historical data to the components to
-    illustrate the original pronunciations they signalled"""
+def __get_with_variants(
+    char: str, char_to_data: Mapping[str, List[Any]], variants: VariantGraph
+) -> List[Any]:
+    """Return the data for char, or if there is none, the data for the first of its
+    listed form variants (simplified, traditional, etc.) that has some. Semantic
+    and other variants can be pronounced differently, so they are not used."""
+    if data := char_to_data.get(char):
+        return data
+    for v, types in sorted(variants.variants(char).items()):
+        if types & FORM_VARIANTS and (data := char_to_data.get(v)):
+            logger.debug(f"  Using data for variant {v} of {char}")
+            return data
+    return []
+
+
+def __historical_data(component: str) -> Optional[List[Mapping[str, Any]]]:
+    """Old and Middle Chinese data for a component, or None if there is none"""
+    # Baxter/Sagart only lists one form of many characters, e.g. 從 but not 从
+    if bs_infos := __get_with_variants(
+        component, get_baxter_sagart(), get_variant_graph()
+    ):
+        return [
+            {
+                "source": "BS",  # Baxter/Sagart
+                "gloss": bs.gloss,
+                "OC": [bs.old_chinese],
+                "MC": bs.middle_chinese,
+                "LMC": None,
+            }
+            for bs in bs_infos
+        ]
+    elif ytenx_infos := get_ytenx_rhymes().get(component):
+        return [
+            {
+                # TODO: confirm it's Zheng/Zhang
+                "source": "ZZ",  # Zheng/Zhang
+                # TODO: get it from Unihan? (be sure to
+                # mark source in that case)
+                "gloss": "TODO: gloss",
+                "OC": yt.old_chinese,
+                "MC": yt.middle_chinese,
+                "LMC": yt.late_middle_chinese,
+            }
+            for yt in ytenx_infos
+        ]
+    return None
+
 
-    baxter_sagart_data = get_baxter_sagart()
-    ytenx_rhymes = get_ytenx_rhymes()
+def __add_historical_data(groups: Iterable[ComponentGroup]) -> None:
     missing_data_components = []
-    for g in all_data["group_index"].groups:
+    for g in groups:
         g.sup_info["historical"] = historical_data = []
 
-        component = g.component
         # Filter out groups that aren't based off of real components
-        if component in ["国字", "國字"]:
+        if g.component in ["国字", "國字"]:
             continue
 
-        bs_infos = baxter_sagart_data[component]
-        ytenx_infos = ytenx_rhymes[component]
-        if bs_infos := baxter_sagart_data[component]:
-            for bs in bs_infos:
-                historical_data.append(
-                    {
-                        "source": "BS",  # Baxter/Sagart
-                        "gloss": bs.gloss,
-                        "OC": [bs.old_chinese],
-                        "MC": bs.middle_chinese,
-                        "LMC": None,
-                    }
-                )
-        elif ytenx_infos := ytenx_rhymes[component]:
-            for yt in ytenx_infos:
-                historical_data.append(
-                    {
-                        # TODO: confirm it's Zheng/Zhang
-                        "source": "ZZ",  # Zheng/Zhang
-                        # TODO: get it from Unihan? (be sure to
-                        # mark source in that case)
-                        "gloss": "TODO: gloss",
-                        "OC": yt.old_chinese,
-                        "MC": yt.middle_chinese,
-                        "LMC": yt.late_middle_chinese,
-                    }
-                )
+        if (data := __historical_data(g.component)) is not None:
+            historical_data.extend(data)
         else:
-            missing_data_components.append(component)
+            missing_data_components.append(g.component)
 
     if missing_data_components:
         logger.warning(
@@ -57,6 +83,26 @@ def integrate_historical_chinese(all_data):
         )
         logger.debug(format_json(missing_data_components))
 
+
+def integrate_historical_chinese(all_data):
+    """For now, we just add the historical data to the components to
+    illustrate the original pronunciations they signalled"""
+    index: ComponentGroupIndex = all_data["group_index"]
+    # every group gets its historical data, so this is a scan of all groups rather
+    # than lookups in the index's secondary indexes
+    __add_historical_data(index.groups)
+    return all_data
+
+
+def update_historical_chinese(all_data, changes: GroupChanges):
+    """Add the historical data to groups created by edits of the group index; other
+    groups keep theirs"""
+    index: ComponentGroupIndex = all_data["group_index"]
+    __add_historical_data(
+        g
+        for c in sorted(changes.components)
+        if (g := index.component_to_group.get(c)) and "historical" not in g.sup_info
+    )
     return all_data
 
 
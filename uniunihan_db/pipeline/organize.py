@@ -4,7 +4,7 @@
 
 
 from uniunihan_db.component.group import PurityType
-from uniunihan_db.component.index import ComponentGroupIndex
+from uniunihan_db.component.index import ComponentGroupIndex, GroupChanges
 
 
 def purity_group_comparator(purity):
@@ -23,12 +23,37 @@ def organize_data(data):
     return final_output
 
 
+def update_organized_data(organized, data, changes: GroupChanges):
+    """Update the output of organize_data after edits of the group index, creating
+    the data of the changed groups only. IDs have to be assigned again afterwards."""
+    index: ComponentGroupIndex = data["group_index"]
+    char_data = data["char_data"]
+
+    changed_purities = set()
+    for component in changes.components:
+        for p, purity_data in organized.items():
+            if purity_data["groups"].pop(component, None) is not None:
+                changed_purities.add(p)
+        if g := index.component_to_group.get(component):
+            organized[g.purity_type]["groups"][component] = __create_group_data(
+                g, char_data
+            )
+            changed_purities.add(g.purity_type)
+
+    for p in changed_purities:
+        organized[p]["groups"] = __sort_groups(organized[p]["groups"])
+
+    return organized
+
+
 def __organize_groups(char_data, index: ComponentGroupIndex, p: PurityType):
-    groups = [g for g in index.groups if g.purity_type == p]
+    groups = index.purity_to_groups[p]
     data = {g.component: __create_group_data(g, char_data) for g in groups}
-    data = {key: value for key, value in sorted(data.items(), key=__group_sort_key)}
+    return __sort_groups(data)
 
-    return data
+
+def __sort_groups(data):
+    return {key: value for key, value in sorted(data.items(), key=__group_sort_key)}
 
 
 def __group_sort_key(item):
@@ -1,8 +1,52 @@
 import argparse
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from loguru import logger as logger
 
-from uniunihan_db.data.paths import PIPELINE_OUTPUT_DIR
+from uniunihan_db import metrics, profiling
+from uniunihan_db.data import alignments, cache
+from uniunihan_db.data.archive import Source
+from uniunihan_db.data.datasets import (
+    BAXTER_SAGART_FILE,
+    CKIP_20K_FILE,
+    HISTORICAL_ON_YOMI_FILE,
+    JOYO_FILE,
+    attach_store,
+    get_baxter_sagart,
+    get_variant_graph,
+    get_ytenx_rhymes,
+    write_dataset_store,
+)
+from uniunihan_db.data.download import download_all
+from uniunihan_db.data.paths import (
+    CEDICT_ZIP,
+    CHUNOM_CHAR_FILE,
+    CHUNOM_VOCAB_FILE,
+    COMPONENT_OVERRIDE_FILE,
+    EDICT_FREQ_TARBALL,
+    JP_VOCAB_OVERRIDE,
+    KO_ED_CHARS_FILE,
+    PIPELINE_OUTPUT_DIR,
+    UNIHAN_FILE,
+    YTENX_ZIP_FILE,
+)
+from uniunihan_db.data.store import DatasetStore
 from uniunihan_db.util import configure_logging, format_json
 
 from .add_char_prons import ADD_PRONUNCIATIONS
@@ -15,6 +59,62 @@ from .select_vocab import SELECT_VOCAB
 
 LANGUAGES = ["zh", "jp", "ko", "vi"]
 
+# bump this to invalidate all stage checkpoints
+CHECKPOINT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    # language -> function taking the previous stage's output
+    functions: Mapping[str, Callable[[Any], Any]]
+    # language -> files read by the stage; the stage is run again when one changes
+    sources: Mapping[str, Sequence[Source]]
+    # languages for which the stage reads data that cannot be tracked (e.g. from the
+    # network), so that it is always run
+    untracked: Collection[str] = ()
+    # bump this when a change to something other than code changes the stage's
+    # output (the code of the stage's module and of the uniunihan_db modules it uses
+    # is already part of the fingerprint)
+    version: int = 1
+
+
+# the components and variants are read by group_chars and oc_mc for all languages
+_COMPONENT_SOURCES = (YTENX_ZIP_FILE, COMPONENT_OVERRIDE_FILE, UNIHAN_FILE, JOYO_FILE)
+
+STAGES = [
+    Stage(
+        "load_char_data",
+        LOAD_CHAR_DATA,
+        {
+            "jp": (JOYO_FILE, HISTORICAL_ON_YOMI_FILE),
+            "zh": (UNIHAN_FILE,),
+            "ko": (KO_ED_CHARS_FILE,),
+            "vi": (CHUNOM_CHAR_FILE,),
+        },
+    ),
+    Stage("add_prons", ADD_PRONUNCIATIONS, {"zh": (UNIHAN_FILE, CEDICT_ZIP)}),
+    Stage("group_chars", GROUP_CHARS, {lang: _COMPONENT_SOURCES for lang in LANGUAGES}),
+    Stage(
+        "oc_mc",
+        OC_MC,
+        {lang: (BAXTER_SAGART_FILE, *_COMPONENT_SOURCES) for lang in LANGUAGES},
+    ),
+    Stage(
+        "select_vocab",
+        SELECT_VOCAB,
+        {
+            "jp": (EDICT_FREQ_TARBALL, JP_VOCAB_OVERRIDE),
+            "zh": (CEDICT_ZIP, CKIP_20K_FILE),
+            "vi": (CHUNOM_VOCAB_FILE,),
+        },
+        # kengdic is fetched from the network on every run
+        untracked=("ko",),
+    ),
+    Stage("organize", ORGANIZE_DATA, {}),
+    Stage("assign_ids", ASSIGN_IDS, {}),
+]
+
 
 def main() -> None:
     configure_logging(__name__)
@@ -23,22 +123,162 @@ def main() -> None:
         "-l",
         "--language",
         default="jp",
-        choices=LANGUAGES,
-        help="",
+        type=parse_languages,
+        help=f"comma-separated list of languages ({','.join(LANGUAGES)})",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes; languages are run in parallel, and processes "
+        "left over align vocabulary",
+    )
+    parser.add_argument(
+        "--from-stage",
+        choices=[s.name for s in STAGES],
+        help="run this stage and the following ones even if they are unchanged",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="run all stages, ignoring checkpoints"
+    )
+    profiling.add_argument(parser)
     args = parser.parse_args()
-    run_pipeline(args.language)
+    profiling.enable(args.profile)
+    with metrics.recording("runner"):
+        run_pipelines(
+            args.language, args.jobs, from_stage=args.from_stage, force=args.force
+        )
+
+
+def parse_languages(value: str) -> List[str]:
+    languages = value.split(",")
+    for language in languages:
+        if language not in LANGUAGES:
+            raise argparse.ArgumentTypeError(
+                f"invalid language {language!r} (choose from {', '.join(LANGUAGES)})"
+            )
+    return languages
+
+
+def checkpoint_path(language: str, position: int, stage: Stage) -> Path:
+    return (
+        PIPELINE_OUTPUT_DIR
+        / language
+        / "checkpoints"
+        / f"{position}-{stage.name}.pickle"
+    )
+
+
+def stage_fingerprint(language: str, stage: Stage, previous: str) -> str:
+    """Fingerprint of a stage's inputs: the previous stage's fingerprint, the files
+    the stage reads and the code of the stage and of the uniunihan_db modules it
+    uses"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{previous}:{stage.name}:{stage.version}:{CHECKPOINT_VERSION}".encode())
+    h.update(cache.code_digest(stage.functions[language].__module__).encode())
+    for source in stage.sources.get(language, ()):
+        try:
+            digest = cache.source_digest(source)
+        except FileNotFoundError:
+            # not downloaded yet
+            digest = "missing"
+        h.update(f"{source}={digest}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def __read_fingerprint(path: Path) -> Optional[str]:
+    # the fingerprint is pickled before the output, so that it can be read alone
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
 
 
-def run_pipeline(language):
+def __read_output(path: Path) -> Any:
+    with open(path, "rb") as f:
+        pickle.load(f)
+        return pickle.load(f)
+
+
+def __write_checkpoint(path: Path, fingerprint: str, output: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = pickle.dumps(fingerprint) + pickle.dumps(output, pickle.HIGHEST_PROTOCOL)
+    cache.atomic_write(path, data)
+
+
+def count_chars(data: Any) -> Optional[int]:
+    """Number of characters in the input or output of a stage, for the metrics"""
+    if isinstance(data, Mapping):
+        if "char_data" in data:
+            return len(data["char_data"])
+        if data and all(
+            isinstance(pg, Mapping) and "groups" in pg for pg in data.values()
+        ):
+            # organized by purity group, component group and cluster
+            return sum(
+                len(cluster)
+                for pg in data.values()
+                for group in pg["groups"].values()
+                for cluster in group["clusters"]
+            )
+    return metrics.count(data)
+
+
+def run_stages(
+    language: str, from_stage: Optional[str] = None, force: bool = False
+) -> Any:
+    """Run the pipeline stages for language, resuming from the checkpoint of the last
+    stage before the first one whose fingerprint changed, and return the output of
+    the last stage.
+    from_stage: run this stage and the following ones even if they are unchanged
+    force: run all stages"""
+    names = [s.name for s in STAGES]
+    first = 0 if force else len(STAGES)
+    if from_stage is not None:
+        first = min(first, names.index(from_stage))
+
+    # find the first stage which has to be run; previous is the fingerprint of the
+    # stage before it
+    previous = ""
+    for i, stage in enumerate(STAGES[:first]):
+        fingerprint = stage_fingerprint(language, stage, previous)
+        if (
+            language in stage.untracked
+            or __read_fingerprint(checkpoint_path(language, i, stage)) != fingerprint
+        ):
+            first = i
+            break
+        previous = fingerprint
+
+    data: Any = None
+    if first > 0:
+        stage = STAGES[first - 1]
+        logger.info(f"Resuming from checkpoint of stage {stage.name}")
+        with metrics.measure(f"{stage.name}.{language}", "checkpoint") as step:
+            data = __read_output(checkpoint_path(language, first - 1, stage))
+            step.items_out = count_chars(data)
+
+    for i, stage in enumerate(STAGES[first:], first):
+        logger.info(f"Running stage {stage.name}")
+        function = stage.functions[language]
+        items_in = None if i == 0 else count_chars(data)
+        with metrics.measure(f"{stage.name}.{language}", "stage", items_in) as step:
+            data = function() if i == 0 else function(data)
+            step.items_out = count_chars(data)
+        # computed afterwards, since the stage may have downloaded its sources
+        previous = stage_fingerprint(language, stage, previous)
+        __write_checkpoint(checkpoint_path(language, i, stage), previous, data)
+
+    return data
+
+
+def run_pipeline(
+    language, from_stage: Optional[str] = None, force: bool = False
+) -> Dict[str, Any]:
     logger.info(f"Running {language} pipeline")
-    char_data = LOAD_CHAR_DATA[language]()
-    char_data = ADD_PRONUNCIATIONS[language](char_data)
-    all_data = GROUP_CHARS[language](char_data)
-    all_data = OC_MC[language](all_data)
-    all_data = SELECT_VOCAB[language](all_data)
-    all_data = ORGANIZE_DATA[language](all_data)
-    all_data = ASSIGN_IDS[language](all_data)
+    all_data = run_stages(language, from_stage, force)
 
     out_dir = PIPELINE_OUTPUT_DIR / language
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -50,5 +290,81 @@ def run_pipeline(language):
     return all_data
 
 
+# datasets which worker processes read from a shared DatasetStore, by language
+STORED_DATASETS = {
+    "jp": ["edict_freq"],
+    "zh": ["cedict"],
+    "ko": [],
+    "vi": ["chunom_org_vocab"],
+}
+# used by all languages
+SHARED_STORED_DATASETS = ["phonetic_components"]
+
+
+def preload_shared_datasets(languages: Sequence[str], store_path: Path) -> DatasetStore:
+    """Write the components and dictionaries used by the pipelines of the given
+    languages to a dataset store, which worker processes attach to instead of each
+    loading their own copy. Other datasets which all languages use are loaded
+    here, so that forked workers inherit them (with other start methods, they load
+    them from the persistent cache)."""
+    names = SHARED_STORED_DATASETS + [
+        n for lang in languages for n in STORED_DATASETS[lang]
+    ]
+    store = write_dataset_store(store_path, names)
+    logger.info("Loading shared datasets...")
+    get_variant_graph()
+    get_ytenx_rhymes()
+    get_baxter_sagart()
+    return store
+
+
+def __run_pipeline_in_worker(
+    language: str, record: bool, align_workers: int, kwargs: Mapping[str, Any]
+) -> Tuple[Dict[str, Any], List[metrics.Step]]:
+    # the steps measured in the worker are returned to be recorded by the parent
+    if record:
+        metrics.start_recording()
+    alignments.set_workers(align_workers)
+    return run_pipeline(language, **kwargs), metrics.take_steps()
+
+
+def run_pipelines(
+    languages: Sequence[str], jobs: int = 1, **kwargs: Any
+) -> Dict[str, Dict[str, Any]]:
+    """Run the pipelines of the given languages, in up to jobs processes, and return
+    {language -> output}. Processes which are not needed to run one language each
+    are used to align vocabulary. kwargs are passed to run_pipeline."""
+    if jobs <= 1 or len(languages) <= 1:
+        alignments.set_workers(jobs)
+        return {lang: run_pipeline(lang, **kwargs) for lang in languages}
+
+    # the workers would otherwise race to download the same files on demand
+    download_all()
+    store_path = cache.CACHE_DIR / f"datasets-{os.getpid()}.store"
+    try:
+        store = preload_shared_datasets(languages, store_path)
+        workers = min(jobs, len(languages))
+        with ProcessPoolExecutor(
+            workers, initializer=attach_store, initargs=(store,)
+        ) as executor:
+            futures = {
+                lang: executor.submit(
+                    __run_pipeline_in_worker,
+                    lang,
+                    metrics.is_recording(),
+                    jobs // workers,
+                    kwargs,
+                )
+                for lang in languages
+            }
+            outputs = {}
+            for lang, future in futures.items():
+                outputs[lang], steps = future.result()
+                metrics.add_steps(steps)
+            return outputs
+    finally:
+        store_path.unlink(missing_ok=True)
+
+
 if __name__ == "__main__":
     main()
@@ -11,11 +11,11 @@ from uniunihan_db.data.datasets import (
     get_ckip_20k,
     get_edict_freq,
     get_kengdic,
+    get_vocab_index,
     get_vocab_override,
-    index_vocab,
 )
 from uniunihan_db.data.paths import JP_VOCAB_OVERRIDE
-from uniunihan_db.data.types import Char2Pron2Words, Word, ZhWord
+from uniunihan_db.data.types import Char2Pron2Words, WordTable
 from uniunihan_db.lingua.aligner import JpAligner, KoAligner, ZhAligner
 from uniunihan_db.util import format_json
 
@@ -30,9 +30,8 @@ def select_vocab_jp(data):
         new_c = c_data["new"]
         new_char_to_prons[new_c] = c_data["prons"]
 
-    word_list: List[Word] = get_edict_freq()
     aligner = JpAligner(new_char_to_prons)
-    char_to_pron_to_vocab: Char2Pron2Words = index_vocab(word_list, aligner)
+    char_to_pron_to_vocab = get_vocab_index(get_edict_freq(), aligner)
     # Some words have to be specified manually instead of extracted from our
     # downloaded dictionary
     vocab_override: Char2Pron2Words = get_vocab_override(JP_VOCAB_OVERRIDE)
@@ -79,9 +78,14 @@ def __order_vocab(words, used):
 
 def select_vocab_zh(data):
     char_data = data["char_data"]
-    word_list: List[ZhWord] = get_cedict()
-    _incorporate_ckip_freq_data(word_list)
-    char_to_pron_to_vocab = index_vocab(word_list, ZhAligner())
+    # the same index is used to find the pronunciations in load_prons_zh; here, the
+    # words are re-ranked with CKIP frequencies
+    word_list: WordTable = get_cedict()
+    char_to_pron_to_vocab = get_vocab_index(word_list, ZhAligner()).with_frequencies(
+        _ckip_frequencies(word_list),
+        # sort words descending by frequency and then orthographically
+        key=lambda w: (-w.frequency, w.surface),
+    )
 
     duplicate_used = set()
     used_vocab = set()
@@ -104,22 +108,25 @@ def select_vocab_zh(data):
     return data
 
 
-def _incorporate_ckip_freq_data(words: List[ZhWord]) -> None:
+def _ckip_frequencies(words: WordTable) -> List[int]:
+    """Frequencies of the words according to CKIP, falling back to the frequencies
+    they already have"""
     ckip20k_entries = get_ckip_20k()
+    frequencies = []
     for w in words:
         if w_with_freq := ckip20k_entries.get(w.surface):
             # use first entry (highest frequency)
-            w.frequency = w_with_freq[0]["freq"]
-    # sort words descending by frequency and then orthographically
-    words.sort(key=lambda w: (-w.frequency, w.surface))
+            frequencies.append(w_with_freq[0]["freq"])
+        else:
+            frequencies.append(w.frequency)
+    return frequencies
 
 
 def select_vocab_ko(data):
     char_data = data["char_data"]
 
     # TODO: Kengdic needs a ton of cleaning for this to work okay
-    word_list: List[Word] = get_kengdic()
-    char_to_pron_to_vocab = index_vocab(word_list, KoAligner())
+    char_to_pron_to_vocab = get_vocab_index(get_kengdic(), KoAligner())
 
     duplicate_used = set()
     used_vocab = set()
@@ -144,8 +151,7 @@ def select_vocab_ko(data):
 
 def select_vocab_vi(data):
     char_data = data["char_data"]
-    word_list: List[Word] = get_chunom_org_vocab()
-    char_to_pron_to_vocab = index_vocab(word_list, ZhAligner())
+    char_to_pron_to_vocab = get_vocab_index(get_chunom_org_vocab(), ZhAligner())
 
     duplicate_used = set()
     used_vocab = set()
@@ -0,0 +1,226 @@
+# Opt-in profiling of the named steps measured by uniunihan_db.metrics. With
+# `--profile cpu|mem` (or UNIUNIHAN_PROFILE=cpu|mem in the environment), each
+# pipeline stage, collate step and render step (e.g. select_vocab.jp, render.zh-8)
+# is profiled on its own, and the results are written next to the debug logs:
+#
+# cpu: profile-<step>.pstats (cProfile stats, for pstats or snakeviz) and
+#     profile-<step>.collapsed (collapsed stacks weighted by microseconds)
+# mem: profile-<step>.tracemalloc (tracemalloc snapshot of the memory still
+#     allocated at the end of the step) and profile-<step>.mem.collapsed (its
+#     collapsed allocation stacks weighted by bytes)
+#
+# The collapsed stacks can be turned into flamegraphs with flamegraph.pl or
+# speedscope. Dataset loads are part of the profile of the step loading them, since
+# profiles cannot be nested. When profiling is disabled, steps only check a global.
+
+import argparse
+import cProfile
+import os
+import pstats
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from uniunihan_db.data.paths import GENERATED_DATA_DIR
+
+PROFILE_ENV_VAR = "UNIUNIHAN_PROFILE"
+MODES = ("cpu", "mem")
+PROFILE_DIR = GENERATED_DATA_DIR
+# kinds of metrics steps which are profiled
+PROFILED_KINDS = {"stage", "collate", "render"}
+# number of frames stored per allocation in mem mode
+MEM_FRAMES = 64
+# call paths taking less than this fraction of a profile's time are left out of its
+# collapsed stacks; this keeps the number of paths visited in check
+MIN_STACK_FRACTION = 1e-4
+
+# (filename, line number, function name), as in pstats
+Function = Tuple[str, int, str]
+
+
+def __mode_from_env() -> Optional[str]:
+    mode = os.environ.get(PROFILE_ENV_VAR) or None
+    if mode is not None and mode not in MODES:
+        logger.warning(f"Ignoring unknown {PROFILE_ENV_VAR} mode {mode!r}")
+        return None
+    return mode
+
+
+# profiling mode, or None when disabled; read from the environment so that worker
+# processes started with spawn inherit it
+__mode: Optional[str] = __mode_from_env()
+# True while a step is being profiled
+__active = False
+
+
+def add_argument(parser: argparse.ArgumentParser) -> None:
+    """Add the --profile option to parser (see enable)"""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="cpu",
+        choices=MODES,
+        help=f"profile each step and write the results next to the debug logs "
+        f"(default: cpu; also set with {PROFILE_ENV_VAR})",
+    )
+
+
+def enable(mode: Optional[str]) -> None:
+    """Profile the steps measured from now on in the given mode, in this process
+    and in its child processes. Does nothing if mode is None, so that the result of
+    the --profile option can be passed directly."""
+    global __mode
+    if mode is None:
+        return
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode {mode!r}")
+    __mode = mode
+    os.environ[PROFILE_ENV_VAR] = mode
+
+
+def disable() -> None:
+    global __mode
+    __mode = None
+    os.environ.pop(PROFILE_ENV_VAR, None)
+
+
+def mode() -> Optional[str]:
+    return __mode
+
+
+def is_profiled(kind: str) -> bool:
+    """True if steps of this kind are profiled"""
+    return __mode is not None and kind in PROFILED_KINDS
+
+
+def profile_path(name: str, suffix: str) -> Path:
+    return PROFILE_DIR / f"profile-{name}{suffix}"
+
+
+@contextmanager
+def profile(name: str, kind: str) -> Iterator[None]:
+    """Profile the enclosed code as the step name, if steps of this kind are profiled
+    and no other step is being profiled"""
+    global __active
+    if not is_profiled(kind) or __active:
+        yield
+        return
+
+    __active = True
+    try:
+        if __mode == "cpu":
+            with __profile_cpu(name):
+                yield
+        else:
+            with __profile_memory(name):
+                yield
+    finally:
+        __active = False
+
+
+@contextmanager
+def __profile_cpu(name: str) -> Iterator[None]:
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(profile_path(name, ".pstats"))
+        write_collapsed(
+            profile_path(name, ".collapsed"), collapsed_stacks(stats), scale=1e6
+        )
+        logger.info(f"Wrote CPU profile of {name} to {profile_path(name, '.*')}")
+
+
+@contextmanager
+def __profile_memory(name: str) -> Iterator[None]:
+    # with `python -X tracemalloc`, tracing is already on and stays on
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(MEM_FRAMES)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ]
+        )
+        if started:
+            tracemalloc.stop()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        snapshot.dump(str(profile_path(name, ".tracemalloc")))
+        write_collapsed(profile_path(name, ".mem.collapsed"), memory_stacks(snapshot))
+        logger.info(f"Wrote memory profile of {name} to {profile_path(name, '.*')}")
+
+
+def __label(function: Function) -> str:
+    filename, line, name = function
+    if filename == "~":
+        # built-in
+        return name
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+def collapsed_stacks(stats: pstats.Stats) -> Dict[str, float]:
+    """{call stack -> seconds spent in its last function}, with the functions in each
+    stack separated by semicolons. cProfile only records callers, not whole stacks,
+    so the time of a function is split between its call paths in proportion to the
+    time of its calls from each caller. Recursive calls are folded into the first
+    call of the function on the path."""
+    raw = stats.stats  # type: ignore
+    children: Dict[Function, List[Tuple[Function, float]]] = defaultdict(list)
+    roots = []
+    for function, (_, _, _, _, callers) in raw.items():
+        if not callers:
+            roots.append(function)
+        for caller, (_, _, _, cumulative) in callers.items():
+            children[caller].append((function, cumulative))
+    total = sum(raw[root][3] for root in roots)
+    min_time = total * MIN_STACK_FRACTION
+
+    stacks: Dict[str, float] = defaultdict(float)
+
+    def visit(function: Function, time: float, path: str, on_path: Set[Function]):
+        _, _, own, cumulative, _ = raw[function]
+        fraction = time / cumulative if cumulative else 0
+        path = f"{path};{__label(function)}" if path else __label(function)
+        stacks[path] += own * fraction
+        on_path.add(function)
+        for child, child_time in children.get(function, ()):
+            if child not in on_path and child_time * fraction >= min_time:
+                visit(child, child_time * fraction, path, on_path)
+        on_path.remove(function)
+
+    for root in roots:
+        if raw[root][3] >= min_time:
+            visit(root, raw[root][3], "", set())
+    return dict(stacks)
+
+
+def memory_stacks(snapshot: tracemalloc.Snapshot) -> Dict[str, float]:
+    """{allocation stack -> bytes allocated there}, oldest frame first"""
+    stacks: Dict[str, float] = defaultdict(float)
+    for stat in snapshot.statistics("traceback"):
+        path = ";".join(f"{frame.filename}:{frame.lineno}" for frame in stat.traceback)
+        stacks[path] += stat.size
+    return dict(stacks)
+
+
+def write_collapsed(path: Path, stacks: Dict[str, float], scale: float = 1) -> None:
+    """Write stacks in the collapsed format read by flamegraph.pl: one
+    `frame;frame;... count` line per stack, with counts in microseconds for times and
+    bytes for memory"""
+    with open(path, "w") as f:
+        for stack, value in sorted(stacks.items()):
+            if (count := round(value * scale)) > 0:
+                f.write(f"{stack} {count}\n")
@@ -39,8 +39,10 @@ def filter_keys(d: Mapping[T, U], s: Collection[T]) -> MutableMapping[T, U]:
 
 
 class ExtendedJsonEncoder(JSONEncoder):
-    """Serializes sets as sorted lists, and any other objects not handled by
-    the default JSON decoder as dictionaries with their fields as the keys."""
+    """Serializes sets as sorted lists, objects with an _asdict method (such as
+    WordTable rows) as the dictionaries it returns, and any other objects not
+    handled by the default JSON decoder as dictionaries with their fields as the
+    keys."""
 
     def default(self, obj: Any) -> object:
         try:
@@ -48,6 +50,8 @@ class ExtendedJsonEncoder(JSONEncoder):
         except TypeError:
             if isinstance(obj, set):
                 return sorted(list(obj))
+            elif hasattr(obj, "_asdict"):
+                return obj._asdict()
             else:
                 return vars(obj)
 